@@ -0,0 +1,96 @@
+"""Benchmark of `clustering._merge_close_clusters` against the pure Python version.
+
+Usage:
+    python -m benchmarks.merge_close_clusters [--points 1000000] [--clusters 100]
+"""
+
+import argparse
+import math
+import os
+import time
+from collections import Counter, defaultdict
+
+import django
+import numpy as np
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "replant.settings")
+django.setup()
+
+from replant import clustering  # noqa: E402
+
+
+def merge_close_clusters_python(clusters, labels, counter, min_distance):
+    """The original implementation, kept as the reference for speed and output."""
+    label_by_cluster = {id(cluster): i for i, cluster in enumerate(clusters)}
+    merged_clusters = []
+    new_labels = list(labels)
+    new_counter = defaultdict(int)
+    while clusters:
+        cluster = clusters[len(clusters) - 1]
+        to_merge = []
+        for i in reversed(range(len(clusters))):
+            other_cluster = clusters[i]
+            if _distance(cluster, other_cluster) < min_distance:
+                clusters.pop(i)
+                label = label_by_cluster[id(other_cluster)]
+                for k in range(len(new_labels)):
+                    if new_labels[k] == label:
+                        new_labels[k] = -len(merged_clusters) - 1
+                weight = counter[label]
+                if weight:
+                    to_merge.append((other_cluster, weight))
+                    new_counter[len(merged_clusters)] += weight
+
+        if to_merge:
+            cluster = clustering._merge_clusters(to_merge)
+            merged_clusters.append(cluster)
+    return merged_clusters, new_labels, new_counter
+
+
+def _distance(p1, p2):
+    return math.sqrt(
+        (p2[0] - p1[0]) * (p2[0] - p1[0]) + (p2[1] - p1[1]) * (p2[1] - p1[1])
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--min-distance", type=float, default=25)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centroids = np.column_stack(
+        (rng.uniform(-60, 70, args.clusters), rng.uniform(-180, 180, args.clusters))
+    )
+    labels = rng.integers(0, args.clusters, args.points)
+
+    t0 = time.perf_counter()
+    expected = merge_close_clusters_python(
+        list(centroids),
+        list(labels),
+        Counter(sorted(labels)),
+        min_distance=args.min_distance,
+    )
+    t1 = time.perf_counter()
+    result = clustering._merge_close_clusters(
+        centroids,
+        labels,
+        np.bincount(labels, minlength=args.clusters),
+        min_distance=args.min_distance,
+    )
+    t2 = time.perf_counter()
+
+    assert result[0] == expected[0]
+    assert result[1].tolist() == expected[1]
+    assert result[2] == dict(expected[2])
+
+    print(f"{args.points} points, {args.clusters} clusters")
+    print(f"python:     {t1 - t0:.3f}s")
+    print(f"vectorized: {t2 - t1:.3f}s")
+    print(f"speedup:    {(t1 - t0) / (t2 - t1):.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,50 @@ MINT_FOREVER_HEALTHCHECK_FILE_PATH: Final[str] = os.getenv(
 MINT_FOREVER_SLEEP_TIME_SECONDS: Final[int] = int(
     os.getenv("MINT_FOREVER_SLEEP_TIME_SECONDS", "60")
 )
+MINT_FOREVER_MIN_SLEEP_TIME_SECONDS: Final[int] = int(
+    os.getenv("MINT_FOREVER_MIN_SLEEP_TIME_SECONDS", "1")
+)
+MINT_FOREVER_POLL_INTERVAL_SECONDS: Final[int] = int(
+    os.getenv("MINT_FOREVER_POLL_INTERVAL_SECONDS", "5")
+)
+
+TREE_TILES_MAX_AGE_SECONDS: Final[int] = int(
+    os.getenv("TREE_TILES_MAX_AGE_SECONDS", "3600")
+)
+
+FILE_UPLOAD_CONCURRENCY: Final[int] = int(os.getenv("FILE_UPLOAD_CONCURRENCY", "8"))
+
+# Pillow format of NFT images: PNG, WEBP or AVIF.
+NFT_IMAGE_FORMAT: Final[str] = os.getenv("NFT_IMAGE_FORMAT", "WEBP").upper()
+NFT_IMAGE_QUALITY: Final[int] = int(os.getenv("NFT_IMAGE_QUALITY", "80"))
+NFT_IMAGE_MAX_BYTES: Final[int] = int(os.getenv("NFT_IMAGE_MAX_BYTES", "100000"))
+# Upload metadata of a round of trees as one IPFS directory.
+NFT_METADATA_AS_DIRECTORY: Final[bool] = (
+    os.getenv("NFT_METADATA_AS_DIRECTORY", "false") == "true"
+)
+
+MINT_LEASE_SECONDS: Final[int] = int(os.getenv("MINT_LEASE_SECONDS", "600"))
+
+MINT_RECEIPT_POLL_INTERVAL_SECONDS: Final[int] = int(
+    os.getenv("MINT_RECEIPT_POLL_INTERVAL_SECONDS", "2")
+)
+MINT_RECEIPT_TIMEOUT_SECONDS: Final[int] = int(
+    os.getenv("MINT_RECEIPT_TIMEOUT_SECONDS", "600")
+)
+
+REPORT_JOBS_POLL_INTERVAL_SECONDS: Final[int] = int(
+    os.getenv("REPORT_JOBS_POLL_INTERVAL_SECONDS", "5")
+)
+# A running report job not making progress for this long is claimed again.
+REPORT_JOB_TIMEOUT_SECONDS: Final[int] = int(
+    os.getenv("REPORT_JOB_TIMEOUT_SECONDS", "900")
+)
+# A job abandoned by its worker this many times is failed instead of claimed again.
+REPORT_JOB_MAX_ATTEMPTS: Final[int] = int(os.getenv("REPORT_JOB_MAX_ATTEMPTS", "3"))
+# Finished report jobs and their files are deleted after this many days.
+REPORT_JOB_RETENTION_DAYS: Final[int] = int(os.getenv("REPORT_JOB_RETENTION_DAYS", "7"))
+# Exports of more trees are queued as report jobs instead of streamed by the view.
+REPORT_SYNC_MAX_TREES: Final[int] = int(os.getenv("REPORT_SYNC_MAX_TREES", "10000"))
 
 
 # SEI configuration (testnet defaults)
@@ -40,6 +84,13 @@ SEI_NFT_ADDRESS: Final[str] = os.getenv(
     "SEI_NFT_ADDRESS", "sei13hxtue98v4vzs25r8j5l0n3wukj6h05k73syguy8gs49jexhx2hqxslrx6"
 )
 NFT_MULTI_CODE_ID: Final[int] = int(os.getenv("NFT_MULTI_CODE_ID", "5649"))
+# Simulated when 0.
+SEI_MINT_GAS_PER_TOKEN: Final[int | None] = (
+    int(os.getenv("SEI_MINT_GAS_PER_TOKEN", "0")) or None
+)
+# Gas of a mint transaction besides its tokens, used with SEI_MINT_GAS_PER_TOKEN.
+SEI_MINT_BASE_GAS: Final[int] = int(os.getenv("SEI_MINT_BASE_GAS", "0"))
+SEI_BLOCK_GAS_LIMIT: Final[int] = int(os.getenv("SEI_BLOCK_GAS_LIMIT", "10000000"))
 
 # Storages
 
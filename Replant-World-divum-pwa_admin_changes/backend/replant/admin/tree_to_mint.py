@@ -7,6 +7,7 @@ from django.contrib import admin, messages
 from django.db import models
 from django.http.request import HttpRequest
 
+from replant import mint_notifications
 from replant.models import TreeToMint
 
 from .tree import TreeAdmin
@@ -38,10 +39,11 @@ class TreeToMintAdmin(TreeAdmin):
         trees_to_mint = queryset.filter(sponsor__isnull=False)
         if trees_to_mint.exists():
             trees_to_mint.update(minting_state=TreeToMint.MintingState.TO_BE_MINTED)
+            mint_notifications.notify_trees_to_mint()
             messages.success(
                 request, 
                 f"Marked {trees_to_mint.count()} trees to be minted as NFTs. "
-                "The mint_forever background process will handle the actual minting."
+                "The mint_forever background process will start minting them shortly."
             )
             
             # Check if mint_forever service is running
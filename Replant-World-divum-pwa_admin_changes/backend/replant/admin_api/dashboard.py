@@ -4,7 +4,7 @@ from django.db.models import Count, Avg, Sum
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from replant.models import Sponsor, User, PlantingOrganization, Tree, Species  # Assuming `User` model exists
+from replant.models import Sponsor, User, PlantingOrganization, Tree, TreeStats, Species  # Assuming `User` model exists
 from replant.response import success, failure
 
 from replant.models import AssignedSpecies
@@ -29,20 +29,16 @@ class AdminDashboardView(APIView):
                 "user_count": user_count,
             }
         else :
-            trees_to_review_count = Tree.objects.filter(review_state="PENDING").count()
-            approved_trees_count = Tree.objects.filter(review_state="APPROVED").count()
-            rejected_trees_count = Tree.objects.filter(review_state="REJECTED").count()
-            minted_trees_count = Tree.objects.filter(sponsor_id__isnull=False).count()
-            total_trees = Tree.objects.count()
+            tree_stats = TreeStats.objects.get_statistics()
             species_count = Species.objects.count()
 
             data = {
-                "trees_to_review": trees_to_review_count,
-                "approved_trees": approved_trees_count,
-                "rejected_trees": rejected_trees_count,
+                "trees_to_review": tree_stats["pending"],
+                "approved_trees": tree_stats["approved"],
+                "rejected_trees": tree_stats["rejected"],
                 "species_count" : species_count,
-                "total_trees" : total_trees,
-                "minted_trees" : minted_trees_count
+                "total_trees" : tree_stats["total"],
+                "minted_trees" : tree_stats["sponsored"]
             }
 
         return success("Dashboard data retrieved successfully", data)
@@ -53,14 +49,14 @@ class AdminStatisticsView(APIView):
 
     def get(self,request):
 
-        total_trees = Tree.objects.count() or 1
+        tree_stats = TreeStats.objects.get_statistics()
+        total_trees = tree_stats["total"] or 1
 
         # Approved trees
-        approved_trees_count = Tree.objects.filter(review_state="APPROVED").count()
-        approved_percentage = round((approved_trees_count / total_trees) * 100, 2)
+        approved_percentage = round((tree_stats["approved"] / total_trees) * 100, 2)
 
         # Planted trees
-        planted_trees = Tree.objects.filter(minting_state="MINTED").count()
+        planted_trees = tree_stats["minted"]
 
         # Average planting cost
         # avg_cost = Tree.objects.aggregate(avg=Avg("planting_cost_usd"))["avg"] or Decimal("0.00")
@@ -80,9 +76,7 @@ class AdminStatisticsView(APIView):
         total_cost = round(total_cost, 2)
 
         # Total NFT value
-        total_nft_usd = Tree.objects.filter(minting_state="MINTED").aggregate(
-            total=Sum("planting_cost_usd")
-        )["total"] or Decimal("0.00")
+        total_nft_usd = tree_stats["minted_cost_usd"] or Decimal("0.00")
         total_nft_usd_str = f"${round(total_nft_usd / 1000, 2)}k"
 
         iucn_map = dict(Species.IucnStatus.choices)
@@ -96,7 +90,7 @@ class AdminStatisticsView(APIView):
         }
 
         # Species mix in trees (how many trees per species, %)
-        species_qs = Tree.objects.values("species__common_name").annotate(count=Count("id"))
+        species_qs = TreeStats.objects.values("species__common_name").annotate(count=Sum("number_of_trees"))
         total_tree_species = sum(item["count"] for item in species_qs) or 1
         species_mix = {
             item["species__common_name"]: round((item["count"] / total_tree_species) * 100, 2)
@@ -133,9 +127,15 @@ class AdminDashboardStatisticsView(APIView):
         iucn_id = request.GET.get("iucn_id")
 
         # --- Base queryset ---
-        tree_qs = Tree.objects.all().select_related(
-            "species", "planting_organization", "sponsor"
-        )
+        if planted_by:
+            # The rollup isn't broken down by planters, their trees are counted.
+            tree_qs = Tree.objects.filter(created_by_id=planted_by)
+            number_of_trees = Count("id")
+            day_field = "created_at__date"
+        else:
+            tree_qs = TreeStats.objects.all()
+            number_of_trees = Sum("number_of_trees")
+            day_field = "day"
 
         if species_id:
             tree_qs = tree_qs.filter(species_id=species_id)
@@ -144,12 +144,10 @@ class AdminDashboardStatisticsView(APIView):
             tree_qs = tree_qs.filter(planting_organization_id=organization_id)
         if sponsor_id:
             tree_qs = tree_qs.filter(sponsor_id=sponsor_id)
-        if planted_by:
-            tree_qs = tree_qs.filter(created_by_id=planted_by)
         if planted_from:
-            tree_qs = tree_qs.filter(created_at__date__gte=planted_from)
+            tree_qs = tree_qs.filter(**{f"{day_field}__gte": planted_from})
         if planted_to:
-            tree_qs = tree_qs.filter(created_at__date__lte=planted_to)
+            tree_qs = tree_qs.filter(**{f"{day_field}__lte": planted_to})
         if organization_name:
             tree_qs = tree_qs.filter(
                 planting_organization__name__icontains=organization_name
@@ -162,13 +160,13 @@ class AdminDashboardStatisticsView(APIView):
             tree_qs = tree_qs.filter(species__iucn_status=iucn_id)
 
         # --- Tree counts ---
-        total_trees = tree_qs.count()
+        tree_stats = tree_qs.get_statistics()
+        total_trees = tree_stats["total"]
 
         if total_trees > 0:
-            approved_trees_count = tree_qs.filter(review_state="APPROVED").count()
-            approved_percentage = round((approved_trees_count / total_trees) * 100, 2)
+            approved_percentage = round((tree_stats["approved"] / total_trees) * 100, 2)
 
-            planted_trees = tree_qs.filter(minting_state="MINTED").count()
+            planted_trees = tree_stats["minted"]
 
             # --- Planting cost ---
             org_ids = tree_qs.values_list("planting_organization_id", flat=True).distinct()
@@ -189,17 +187,12 @@ class AdminDashboardStatisticsView(APIView):
             )
             total_cost = round(total_cost, 2)
 
-            total_nft_usd = (
-                tree_qs.filter(minting_state="MINTED").aggregate(
-                    total=Sum("planting_cost_usd")
-                )["total"]
-                or Decimal("0.00")
-            )
+            total_nft_usd = tree_stats["minted_cost_usd"] or Decimal("0.00")
             total_nft_usd_str = f"${round(total_nft_usd / 1000, 2)}k"
 
             # --- IUCN distribution ---
             iucn_map = dict(Species.IucnStatus.choices)
-            iucn_qs = tree_qs.values("species__iucn_status").annotate(count=Count("species_id"))
+            iucn_qs = tree_qs.values("species__iucn_status").annotate(count=number_of_trees)
             total_species = sum(item["count"] for item in iucn_qs) or 1
             iucn_status = {
                 iucn_map.get(item["species__iucn_status"], item["species__iucn_status"]):
@@ -208,7 +201,7 @@ class AdminDashboardStatisticsView(APIView):
             }
 
             # --- Species mix ---
-            species_qs = tree_qs.values("species__common_name").annotate(count=Count("id"))
+            species_qs = tree_qs.values("species__common_name").annotate(count=number_of_trees)
             total_tree_species = sum(item["count"] for item in species_qs) or 1
             species_mix = {
                 item["species__common_name"]: round((item["count"] / total_tree_species) * 100, 2)
@@ -58,189 +58,176 @@
 
 
 import csv
-from django.http import HttpResponse, JsonResponse
+from decimal import Decimal
+from django.db.models import Count, Min, Q, Sum
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views import View
-from collections import Counter
-from replant.models import Tree
+from rest_framework.views import APIView
+import env
+from replant.admin_api.report_job import queue_report_job
+from replant.admin_api.streaming import Echo
+from replant.models import ReportJob, Species, Tree
+
+IUCN_STATUSES = ['DD', 'LC', 'NT', 'VU', 'EN', 'CR']
+
+REPORT_HEADER = [
+    "PLANTED", "PENDING", "APPROVED", "REJECTED", "VALUE",
+    "% NATIVE", "% NON NATIVE", "NO. OF SPECIES",
+    "% DATA DEFICIENT (DD)", "% LEAST CONCERN (LC)", "% NEAR THREATENED (NT)",
+    "% VULNERABLE (VU)", "% ENDANGERED (EN)", "% CRITICALLY ENDANGERED (CR)",
+    "COMMON NAME", "BOTANICAL NAME", "NATIVE / NON NATIVE",
+    "IUCN STATUS", "COST", "TOTAL VERIFIED"
+]
+
+
+def round_cost(cost):
+    # Sums are in cents like the planting costs, SQLite drops the trailing zeros.
+    return cost.quantize(Decimal("0.01")) if cost is not None else 0
+
+
+def get_report_summary(trees):
+    # All the summary values are computed in a single query.
+    return trees.aggregate(
+        total_planted=Count("id"),
+        pending=Count("id", filter=Q(review_state=Tree.ReviewState.PENDING)),
+        approved=Count("id", filter=Q(review_state=Tree.ReviewState.APPROVED)),
+        rejected=Count("id", filter=Q(review_state=Tree.ReviewState.REJECTED)),
+        native=Count("id", filter=Q(is_native=True)),
+        species_count=Count("species", distinct=True),
+        total_cost=Sum("planting_cost_usd"),
+        **{
+            f"iucn_{status}": Count("id", filter=Q(species__iucn_status=status))
+            for status in IUCN_STATUSES
+        },
+    )
+
+
+def get_species_breakdown(trees):
+    # Species are listed in the order of their first tree, like the trees are.
+    return (
+        trees.values(
+            "species_id",
+            "species__common_name",
+            "species__botanical_name",
+            "species__iucn_status",
+        )
+        .annotate(
+            native=Count("id", filter=Q(is_native=True)),
+            non_native=Count("id", filter=Q(is_native=False)),
+            cost=Sum("planting_cost_usd"),
+            verified=Count("id", filter=Q(review_state=Tree.ReviewState.APPROVED)),
+            first_tree_id=Min("id"),
+        )
+        .order_by("first_tree_id")
+    )
+
+
+def iter_report_lines(trees, summary):
+    """Yield lines of the report, species rows are fetched while iterating."""
+    total_planted = summary["total_planted"]
+
+    def percentage(count):
+        return round((count / total_planted) * 100, 2) if total_planted else 0
+
+    yield REPORT_HEADER
+
+    # Summary row
+    yield [
+        total_planted,
+        summary["pending"],
+        summary["approved"],
+        summary["rejected"],
+        round_cost(summary["total_cost"]),
+        percentage(summary["native"]),
+        percentage(total_planted - summary["native"]),
+        summary["species_count"],
+        *[percentage(summary[f"iucn_{status}"]) for status in IUCN_STATUSES],
+        "", "", "", "", "", ""
+    ]
+
+    # Per-species breakdown
+    iucn_map = dict(Species.IucnStatus.choices)
+    for row in get_species_breakdown(trees).iterator():
+        native_status = "Native" if row["native"] >= row["non_native"] else "Non Native"
+        iucn = iucn_map.get(row["species__iucn_status"], row["species__iucn_status"])
+        yield [
+            "", "", "", "", "", "", "", "", "", "", "", "", "", "",
+            row["species__common_name"], row["species__botanical_name"],
+            native_status, iucn, round_cost(row["cost"]), row["verified"]
+        ]
+
+
+def generate_report(trees, summary):
+    writer = csv.writer(Echo())
+    for line in iter_report_lines(trees, summary):
+        yield writer.writerow(line)
+
+
+def stream_report(trees, summary):
+    return StreamingHttpResponse(
+        generate_report(trees, summary),
+        content_type='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=tree_full_report.csv'},
+    )
+
 
 class ReportGenerationView(View):
     def get(self, request):
-        trees = Tree.objects.select_related('species').all()
-        total_planted = trees.count()
-        review_counter = Counter(trees.values_list('review_state', flat=True))
-        native_count = trees.filter(is_native=True).count()
-        non_native_count = total_planted - native_count
-        species_count = trees.values('species').distinct().count()  # New line
-
-        iucn_statuses = ['DD', 'LC', 'NT', 'VU', 'EN', 'CR']
-        iucn_counter = {status: 0 for status in iucn_statuses}
-        total_cost = sum(tree.planting_cost_usd or 0 for tree in trees)
-
-        # IUCN counting
-        for tree in trees:
-            if tree.species and tree.species.iucn_status in iucn_counter:
-                iucn_counter[tree.species.iucn_status] += 1
-
-        # Create HTTP response
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=tree_full_report.csv'
-        writer = csv.writer(response)
-
-        # Header row
-        writer.writerow([
-            "PLANTED", "PENDING", "APPROVED", "REJECTED", "VALUE",
-            "% NATIVE", "% NON NATIVE", "NO. OF SPECIES",  # New column added
-            "% DATA DEFICIENT (DD)", "% LEAST CONCERN (LC)", "% NEAR THREATENED (NT)",
-            "% VULNERABLE (VU)", "% ENDANGERED (EN)", "% CRITICALLY ENDANGERED (CR)",
-            "COMMON NAME", "BOTANICAL NAME", "NATIVE / NON NATIVE",
-            "IUCN STATUS", "COST", "TOTAL VERIFIED"
-        ])
-
-        # Summary row
-        writer.writerow([
-            total_planted,
-            review_counter.get('PENDING', 0),
-            review_counter.get('APPROVED', 0),
-            review_counter.get('REJECTED', 0),
-            total_cost,
-            round((native_count / total_planted) * 100, 2) if total_planted else 0,
-            round((non_native_count / total_planted) * 100, 2) if total_planted else 0,
-            species_count,  # New value added
-            *[round((iucn_counter[status] / total_planted) * 100, 2) if total_planted else 0 for status in iucn_statuses],
-            "", "", "", "", "", ""
-        ])
-
-        # Per-species breakdown
-        species_seen = set()
-        for tree in trees:
-            species = tree.species
-            if species and species.id not in species_seen:
-                species_seen.add(species.id)
-                species_trees = trees.filter(species=species)
-
-                common_name = species.common_name
-                botanical_name = species.botanical_name
-                native_status = "Native" if species_trees.filter(is_native=True).count() >= species_trees.filter(is_native=False).count() else "Non Native"
-                iucn = species.get_iucn_status_display() if hasattr(species, 'get_iucn_status_display') else species.iucn_status
-                species_cost = sum(t.planting_cost_usd or 0 for t in species_trees)
-                verified_count = species_trees.filter(review_state='APPROVED').count()
-
-                writer.writerow([
-                    "", "", "", "", "", "", "", "", "", "", "", "", "","",
-                    common_name, botanical_name, native_status, iucn, species_cost, verified_count
-                ])
-
-        return response
-
-
-class DashboardReportGenerationView(View):
+        trees = Tree.objects.all()
+        return stream_report(trees, get_report_summary(trees))
+
+
+def filter_report_trees(params):
+    """Trees of the dashboard report filtered by the request query `params`."""
+    species_id = params.get("species_id")
+    organization_id = params.get("organization_id")
+    sponsor_id = params.get("sponsor_id")
+    planted_by = params.get("planted_by")
+    planted_from = params.get("planted_from")
+    planted_to = params.get("planted_to")
+    organization_name = params.get("organisation_name")
+    minted_status = params.get("minted_status")
+    sponsor_type = params.get("sponsor_type")
+    iucn_id = params.get("iucn_id")
+
+    # --- Base queryset ---
+    trees = Tree.objects.all()
+
+    # --- Apply filters dynamically ---
+    if species_id:
+        trees = trees.filter(species_id=species_id)
+    if organization_id:
+        trees = trees.filter(planting_organization_id=organization_id)
+    if sponsor_id:
+        trees = trees.filter(sponsor_id=sponsor_id)
+    if planted_by:
+        trees = trees.filter(created_by_id=planted_by)
+    if planted_from:
+        trees = trees.filter(created_at__date__gte=planted_from)
+    if planted_to:
+        trees = trees.filter(created_at__date__lte=planted_to)
+    if organization_name:
+        trees = trees.filter(planting_organization__name__icontains=organization_name)
+    if minted_status:
+        trees = trees.filter(minting_state=minted_status.upper())
+    if sponsor_type:
+        trees = trees.filter(sponsor__type=sponsor_type)
+    if iucn_id:
+        trees = trees.filter(species__iucn_status=iucn_id)
+    return trees
+
+
+class DashboardReportGenerationView(APIView):
     def get(self, request):
-        # --- Extract filter params ---
-        species_id = request.GET.get("species_id")
-        organization_id = request.GET.get("organization_id")
-        sponsor_id = request.GET.get("sponsor_id")
-        planted_by = request.GET.get("planted_by")
-        planted_from = request.GET.get("planted_from")
-        planted_to = request.GET.get("planted_to")
-        organization_name = request.GET.get("organisation_name")
-        minted_status = request.GET.get("minted_status")
-        sponsor_type = request.GET.get("sponsor_type")
-        iucn_id = request.GET.get("iucn_id")
-
-        # --- Base queryset ---
-        trees = Tree.objects.select_related("species", "planting_organization", "sponsor").all()
-
-        # --- Apply filters dynamically ---
-        if species_id:
-            trees = trees.filter(species_id=species_id)
-        if organization_id:
-            trees = trees.filter(planting_organization_id=organization_id)
-        if sponsor_id:
-            trees = trees.filter(sponsor_id=sponsor_id)
-        if planted_by:
-            trees = trees.filter(created_by_id=planted_by)
-        if planted_from:
-            trees = trees.filter(created_at__date__gte=planted_from)
-        if planted_to:
-            trees = trees.filter(created_at__date__lte=planted_to)
-        if organization_name:
-            trees = trees.filter(planting_organization__name__icontains=organization_name)
-        if minted_status:
-            trees = trees.filter(minting_state=minted_status.upper())
-        if sponsor_type:
-            trees = trees.filter(sponsor__type=sponsor_type)
-        if iucn_id:
-            trees = trees.filter(species__iucn_status=iucn_id)
-
-        if not trees.exists():
+        trees = filter_report_trees(request.GET)
+
+        summary = get_report_summary(trees)
+        if not summary["total_planted"]:
             return JsonResponse(
                 {"message": "No data found to generate report" , "error_code":400},
                 status=400
             )
+        if summary["total_planted"] > env.REPORT_SYNC_MAX_TREES:
+            return queue_report_job(request, ReportJob.Kind.DASHBOARD)
 
-        # --- Existing report generation logic (works whether filters applied or not) ---
-        total_planted = trees.count()
-        review_counter = Counter(trees.values_list('review_state', flat=True))
-        native_count = trees.filter(is_native=True).count()
-        non_native_count = total_planted - native_count
-        species_count = trees.values('species').distinct().count()
-
-        iucn_statuses = ['DD', 'LC', 'NT', 'VU', 'EN', 'CR']
-        iucn_counter = {status: 0 for status in iucn_statuses}
-        total_cost = sum(tree.planting_cost_usd or 0 for tree in trees)
-
-        # IUCN counting
-        for tree in trees:
-            if tree.species and tree.species.iucn_status in iucn_counter:
-                iucn_counter[tree.species.iucn_status] += 1
-
-        # Create HTTP response
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=tree_full_report.csv'
-        writer = csv.writer(response)
-
-        # Header row
-        writer.writerow([
-            "PLANTED", "PENDING", "APPROVED", "REJECTED", "VALUE",
-            "% NATIVE", "% NON NATIVE", "NO. OF SPECIES",
-            "% DATA DEFICIENT (DD)", "% LEAST CONCERN (LC)", "% NEAR THREATENED (NT)",
-            "% VULNERABLE (VU)", "% ENDANGERED (EN)", "% CRITICALLY ENDANGERED (CR)",
-            "COMMON NAME", "BOTANICAL NAME", "NATIVE / NON NATIVE",
-            "IUCN STATUS", "COST", "TOTAL VERIFIED"
-        ])
-
-        # Summary row
-        writer.writerow([
-            total_planted,
-            review_counter.get('PENDING', 0),
-            review_counter.get('APPROVED', 0),
-            review_counter.get('REJECTED', 0),
-            total_cost,
-            round((native_count / total_planted) * 100, 2) if total_planted else 0,
-            round((non_native_count / total_planted) * 100, 2) if total_planted else 0,
-            species_count,
-            *[round((iucn_counter[status] / total_planted) * 100, 2) if total_planted else 0 for status in iucn_statuses],
-            "", "", "", "", "", ""
-        ])
-
-        # Per-species breakdown
-        species_seen = set()
-        for tree in trees:
-            species = tree.species
-            if species and species.id not in species_seen:
-                species_seen.add(species.id)
-                species_trees = trees.filter(species=species)
-
-                common_name = species.common_name
-                botanical_name = species.botanical_name
-                native_status = "Native" if species_trees.filter(is_native=True).count() >= species_trees.filter(is_native=False).count() else "Non Native"
-                iucn = species.get_iucn_status_display() if hasattr(species, 'get_iucn_status_display') else species.iucn_status
-                species_cost = sum(t.planting_cost_usd or 0 for t in species_trees)
-                verified_count = species_trees.filter(review_state='APPROVED').count()
-
-                writer.writerow([
-                    "", "", "", "", "", "", "", "", "", "", "", "", "", "",
-                    common_name, botanical_name, native_status, iucn, species_cost, verified_count
-                ])
-
-        return response
+        return stream_report(trees, summary)
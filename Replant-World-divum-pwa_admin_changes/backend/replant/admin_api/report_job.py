@@ -0,0 +1,132 @@
+from rest_framework import serializers, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+import env
+from replant.admin_api.tree import filter_listing_trees
+from replant.models import ReportJob
+from replant.response import failure, success
+
+# Query parameters of the synchronous exports which aren't filters of the report.
+EXPORT_ONLY_PARAMS = {"report", "page", "per_page"}
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    params = serializers.DictField(child=serializers.CharField(), required=False)
+    progress = serializers.FloatField(read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            "id",
+            "kind",
+            "format",
+            "params",
+            "state",
+            "rows_written",
+            "total_rows",
+            "progress",
+            "error",
+            "download_url",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = [
+            "state",
+            "rows_written",
+            "total_rows",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+
+    def validate(self, data):
+        if data["kind"] == ReportJob.Kind.TREES:
+            try:
+                filter_listing_trees(data.get("params", {}))
+            except ValueError as err:
+                raise serializers.ValidationError({"params": [str(err)]})
+        return data
+
+    def get_download_url(self, obj):
+        if obj.state != ReportJob.State.FINISHED or not obj.file:
+            return None
+        return self.context["request"].build_absolute_uri(obj.file.url)
+
+
+def queue_report_job(request, kind: ReportJob.Kind):
+    """Queue the report of a synchronous export too large to stream in the request.
+
+    The job is generated with the query parameters of the export, the response is
+    202 with the job to poll at `ReportJobDetailView`.
+    """
+    if not request.user.is_authenticated:
+        return failure(
+            f"Reports of more than {env.REPORT_SYNC_MAX_TREES} trees are generated "
+            "in the background, log in to request them",
+            error_code=status.HTTP_403_FORBIDDEN,
+            status_code=status.HTTP_403_FORBIDDEN,
+        )
+    job = ReportJob.objects.create(
+        kind=kind,
+        params={
+            key: value
+            for key, value in request.GET.items()
+            if key not in EXPORT_ONLY_PARAMS
+        },
+        created_by=request.user,
+        base_url=request.build_absolute_uri("/"),
+    )
+    return success(
+        "The report is too large to download, it's generated in the background",
+        ReportJobSerializer(job, context={"request": request}).data,
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+
+class ReportJobView(APIView):
+    """Queue reports of `DashboardReportGenerationView` or `TreeListingView`.
+
+    Reports are generated by the `run_report_jobs` command, poll
+    `ReportJobDetailView` for the progress and the download URL.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        jobs = ReportJob.objects.filter(created_by=request.user).order_by(
+            "-created_at"
+        )[:20]
+        serializer = ReportJobSerializer(jobs, many=True, context={"request": request})
+        return success("Report jobs fetched successfully", serializer.data)
+
+    def post(self, request):
+        serializer = ReportJobSerializer(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(
+            created_by=request.user, base_url=request.build_absolute_uri("/")
+        )
+        return success(
+            "Report job queued successfully",
+            ReportJobSerializer(job, context={"request": request}).data,
+            status_code=status.HTTP_201_CREATED,
+        )
+
+
+class ReportJobDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = ReportJob.objects.filter(id=job_id, created_by=request.user).first()
+        if not job:
+            return failure(
+                "Report job not found.", status_code=status.HTTP_404_NOT_FOUND
+            )
+
+        serializer = ReportJobSerializer(job, context={"request": request})
+        return success("Report job fetched successfully", serializer.data)
@@ -17,7 +17,7 @@ from rest_framework.permissions import IsAuthenticated
 from replant.models import Tree
 from replant.response import failure
 
-from replant import sdk
+from replant import mint_notifications, sdk
 
 from replant.models import PlantingOrganization
 
@@ -697,6 +697,7 @@ class MintNFTView(APIView):
 
             if trees_to_mint.exists():
                 trees_to_mint.update(minting_state=TreeToMint.MintingState.TO_BE_MINTED)
+                mint_notifications.notify_trees_to_mint()
 
                 # Send a success message
                 return success(f"Marked {trees_to_mint.count()} trees to be minted as NFTs.",{})
@@ -0,0 +1,5 @@
+class Echo:
+    """File-like object returning what is written, to stream rows of `csv.writer`."""
+
+    def write(self, value):
+        return value
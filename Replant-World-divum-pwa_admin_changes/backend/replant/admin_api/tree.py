@@ -4,14 +4,109 @@ from django.utils.dateparse import parse_datetime
 from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
-from replant.models import Tree
+import env
+from replant.models import ReportJob, Tree
 from replant.response import success, failure
 from replant import settings
 from replant.models import Species
 from replant.logging import logger
 from replant.models import AssignedSpecies
 import csv
-from django.http import HttpResponse
+from urllib.parse import urljoin
+from django.http import StreamingHttpResponse
+from replant.admin_api.streaming import Echo
+
+REPORT_CHUNK_SIZE = 2000
+
+REPORT_VALUES = (
+    "id", "species__common_name", "species__botanical_name", "species__iucn_status",
+    "planting_organization__name", "created_by__username", "created_by_id",
+    "created_at", "updated_at", "minting_state", "review_state", "nft_id",
+    "sponsor__name", "image", "latitude", "longitude", "rejection_reason",
+)
+
+
+def iter_report_rows(base_url, trees, tree_type, with_iucn_status=False):
+    """Yield report rows of the trees, fetched in chunks as plain values."""
+    # Absolute image URLs are resolved against `base_url` once, not per tree.
+    image_storage = Tree._meta.get_field("image").storage
+
+    def get_image_url(tree):
+        return urljoin(base_url, image_storage.url(tree["image"])) if tree["image"] else None
+
+    for tree in trees.values(*REPORT_VALUES).iterator(chunk_size=REPORT_CHUNK_SIZE):
+        row = {
+            "tree_id": tree["id"],
+            "species_name": tree["species__common_name"],
+            "botanical_name": tree["species__botanical_name"],
+            "organisation_name": tree["planting_organization__name"],
+            "planted_by": tree["created_by__username"],
+            "user_id": tree["created_by_id"],
+            "planted_on": tree["created_at"].isoformat() if tree["created_at"] else None,
+            "minting_state": tree["minting_state"].lower() if tree["minting_state"] else None,
+            "review_state": tree["review_state"].lower() if tree["review_state"] else None,
+            "nft_id": tree["nft_id"] or None,
+            "sponsor": tree["sponsor__name"],
+        }
+        if with_iucn_status:
+            row["iucn_status"] = tree["species__iucn_status"] or None
+
+        if tree_type == "pending":
+            row["image_url"] = get_image_url(tree)
+            row["location"] = f"{tree['latitude']}, {tree['longitude']}"
+        elif tree_type == "approved":
+            row.update({
+                "minting_state": tree["minting_state"].lower(),
+                "nft_id": tree["nft_id"] or None,
+                "review_state": tree["updated_at"].isoformat() if tree["updated_at"] else None,
+                "approved_on": tree["updated_at"].isoformat() if tree["created_at"] else None,
+                "comments": tree["rejection_reason"] or None,
+                "image_url": get_image_url(tree),
+            })
+        elif tree_type == "rejected":
+            row["rejected_on"] = tree["updated_at"].isoformat() if tree["updated_at"] else None
+            row["image_url"] = get_image_url(tree)
+            row["comments"] = tree["rejection_reason"] or None
+        elif tree_type == "to_mint":
+            row.update({
+                "minting_state": tree["minting_state"].lower(),
+                "approved_on": tree["updated_at"].isoformat() if tree["created_at"] else None,
+            })
+
+        yield row
+
+
+def iter_report_lines(rows):
+    for i, row in enumerate(rows):
+        if i == 0:
+            # Format columns → Uppercase + replace underscores with spaces
+            yield [col.upper().replace("_", " ") for col in row]
+        yield list(row.values())
+
+
+def generate_report_csv(rows):
+    writer = csv.writer(Echo())
+    for line in iter_report_lines(rows):
+        yield writer.writerow(line)
+
+
+def stream_tree_report(request, trees, tree_type, with_iucn_status=False):
+    # The job module imports the filters of this one.
+    from replant.admin_api.report_job import queue_report_job
+
+    total_trees = trees.count()
+    if not total_trees:
+        return failure("No data found to generate report")
+    if total_trees > env.REPORT_SYNC_MAX_TREES:
+        return queue_report_job(request, ReportJob.Kind.TREES)
+
+    return StreamingHttpResponse(
+        generate_report_csv(
+            iter_report_rows(request.build_absolute_uri("/"), trees, tree_type, with_iucn_status)
+        ),
+        content_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="trees_report.csv"'},
+    )
 
 
 class TreeListView(APIView):
@@ -82,11 +177,11 @@ class TreeListView(APIView):
         trees = trees.order_by("-created_at")
 
         if report_flag == "1":
-            paginated_trees = trees  # full queryset without slicing
-        else:
-            paginator = PageNumberPagination()
-            paginator.page_size = per_page
-            paginated_trees = paginator.paginate_queryset(trees, request)
+            return stream_tree_report(request, trees, tree_type)
+
+        paginator = PageNumberPagination()
+        paginator.page_size = per_page
+        paginated_trees = paginator.paginate_queryset(trees, request)
 
         def get_image_url(tree):
             return request.build_absolute_uri(tree.image.url) if tree.image else None
@@ -138,27 +233,6 @@ class TreeListView(APIView):
 
             serialized_data.append(base_data)
 
-        if report_flag == "1":
-            if not serialized_data:
-                return failure("No data found to generate report")
-
-            # Format columns → Uppercase + replace underscores with spaces
-            fieldnames = [col.upper().replace("_", " ") for col in serialized_data[0].keys()]
-
-            # Create CSV response
-            response = HttpResponse(content_type="text/csv")
-            response['Content-Disposition'] = 'attachment; filename="trees_report.csv"'
-
-            writer = csv.DictWriter(response, fieldnames=fieldnames)
-            writer.writeheader()
-
-            for row in serialized_data:
-                # Map the original keys to the formatted fieldnames
-                formatted_row = {col.upper().replace("_", " "): value for col, value in row.items()}
-                writer.writerow(formatted_row)
-
-            return response
-
         message = {
             "pending": "Trees to review fetched successfully",
             "approved": "Approved trees fetched successfully",
@@ -197,6 +271,75 @@ class TreeListView(APIView):
 
         return success(message, response_data)
 
+
+def filter_listing_trees(params):
+    """Trees of `TreeListingView` filtered by the request query `params`.
+
+    Returns the trees for the dashboard counts and the listed trees, which are
+    also filtered by the `type` and organisation name.
+    """
+    tree_type = params.get("type", "all").lower()
+    species_id = params.get("species_id")
+    organization_id = params.get("organization_id")
+    sponsor_id = params.get("sponsor_id")
+    planted_by = params.get("planted_by")
+    planted_from = params.get("planted_from")
+    planted_to = params.get("planted_to")
+    organization_name = params.get("organisation_name")
+    minted_status = params.get("minted_status")
+    sponsor_type = params.get("sponsor_type")
+    iucn_id = params.get("iucn_id")
+
+    # Base queryset
+    base_qs = Tree.objects.all().select_related(
+        "created_by", "species", "planting_organization", "sponsor"
+    )
+
+    # ---------- Apply common filters (for both listing & dashboard) ----------
+    # if organization_name:
+    #     base_qs = base_qs.filter(planting_organization__name__icontains=organization_name)
+    if planted_from:
+        base_qs = base_qs.filter(created_at__date__gte=planted_from)
+    if planted_to:
+        base_qs = base_qs.filter(created_at__date__lte=planted_to)
+    if species_id:
+        base_qs = base_qs.filter(species_id=species_id)
+    if organization_id:
+        base_qs = base_qs.filter(planting_organization_id=organization_id)
+    if sponsor_id:
+        base_qs = base_qs.filter(sponsor_id=sponsor_id)
+    if planted_by:
+        base_qs = base_qs.filter(created_by_id=planted_by)
+    if minted_status:
+        base_qs = base_qs.filter(minting_state=minted_status.upper())
+    if sponsor_type:
+        base_qs = base_qs.filter(sponsor__type=sponsor_type)
+    if iucn_id:   # 🔑 filter trees by species’ iucn_status
+        base_qs = base_qs.filter(species__iucn_status=iucn_id)
+
+    # ---------- Dashboard trees (NO type filter) ----------
+    dashboard_trees = base_qs
+
+    # ---------- Listing trees (with type filter if provided) ----------
+    trees = base_qs
+
+    if organization_name:
+        trees = trees.filter(planting_organization__name__icontains=organization_name)
+
+    if tree_type == "pending":
+        trees = trees.filter(review_state="PENDING")
+    elif tree_type == "approved":
+        trees = trees.filter(review_state="APPROVED")
+    elif tree_type == "rejected":
+        trees = trees.filter(review_state="REJECTED")
+    elif tree_type == "to_mint":
+        trees = trees.filter(sponsor_id__isnull=False)
+    elif tree_type and tree_type not in ["pending", "approved", "rejected", "to_mint", "all"]:
+        raise ValueError("Invalid tree type parameter")
+
+    return dashboard_trees, trees.order_by("-created_at")
+
+
 class TreeListingView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -212,67 +355,22 @@ class TreeListingView(APIView):
         planted_by = request.GET.get("planted_by")
         planted_from = request.GET.get("planted_from")
         planted_to = request.GET.get("planted_to")
-        organization_name = request.GET.get("organisation_name")
         minted_status = request.GET.get("minted_status")
         sponsor_type = request.GET.get("sponsor_type")
         iucn_id = request.GET.get("iucn_id")   # 🔑 new param
 
-        # Base queryset
-        base_qs = Tree.objects.all().select_related(
-            "created_by", "species", "planting_organization", "sponsor"
-        )
-
-        # ---------- Apply common filters (for both listing & dashboard) ----------
-        # if organization_name:
-        #     base_qs = base_qs.filter(planting_organization__name__icontains=organization_name)
-        if planted_from:
-            base_qs = base_qs.filter(created_at__date__gte=planted_from)
-        if planted_to:
-            base_qs = base_qs.filter(created_at__date__lte=planted_to)
-        if species_id:
-            base_qs = base_qs.filter(species_id=species_id)
-        if organization_id:
-            base_qs = base_qs.filter(planting_organization_id=organization_id)
-        if sponsor_id:
-            base_qs = base_qs.filter(sponsor_id=sponsor_id)
-        if planted_by:
-            base_qs = base_qs.filter(created_by_id=planted_by)
-        if minted_status:
-            base_qs = base_qs.filter(minting_state=minted_status.upper())
-        if sponsor_type:
-            base_qs = base_qs.filter(sponsor__type=sponsor_type)
-        if iucn_id:   # 🔑 filter trees by species’ iucn_status
-            base_qs = base_qs.filter(species__iucn_status=iucn_id)
-
-        # ---------- Dashboard trees (NO type filter) ----------
-        dashboard_trees = base_qs
-
-        # ---------- Listing trees (with type filter if provided) ----------
-        trees = base_qs
-
-        if organization_name:
-            trees = trees.filter(planting_organization__name__icontains=organization_name)
-
-        if tree_type == "pending":
-            trees = trees.filter(review_state="PENDING")
-        elif tree_type == "approved":
-            trees = trees.filter(review_state="APPROVED")
-        elif tree_type == "rejected":
-            trees = trees.filter(review_state="REJECTED")
-        elif tree_type == "to_mint":
-            trees = trees.filter(sponsor_id__isnull=False)
-        elif tree_type and tree_type not in ["pending", "approved", "rejected", "to_mint", "all"]:
-            return failure("Invalid tree type parameter")
-
-        trees = trees.order_by("-created_at")
+        try:
+            dashboard_trees, trees = filter_listing_trees(request.GET)
+        except ValueError as err:
+            return failure(str(err))
 
         # ---------- Pagination / Report ----------
         if report_flag == "1":
-            paginated_trees = trees
-        else:
-            paginator = PageNumberPagination()
-            paginator.page_size = per_page
-            paginated_trees = paginator.paginate_queryset(trees, request)
+            return stream_tree_report(request, trees, tree_type, with_iucn_status=True)
+
+        paginator = PageNumberPagination()
+        paginator.page_size = per_page
+        paginated_trees = paginator.paginate_queryset(trees, request)
 
         def get_image_url(tree):
             return request.build_absolute_uri(tree.image.url) if tree.image else None
@@ -319,20 +417,6 @@ class TreeListingView(APIView):
 
             serialized_data.append(base_data)
 
-        # ---------- Report CSV ----------
-        if report_flag == "1":
-            if not serialized_data:
-                return failure("No data found to generate report")
-            fieldnames = [col.upper().replace("_", " ") for col in serialized_data[0].keys()]
-            response = HttpResponse(content_type="text/csv")
-            response['Content-Disposition'] = 'attachment; filename="trees_report.csv"'
-            writer = csv.DictWriter(response, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in serialized_data:
-                formatted_row = {col.upper().replace("_", " "): value for col, value in row.items()}
-                writer.writerow(formatted_row)
-            return response
-
         # ---------- Response message ----------
         message = {
             "pending": "Trees to review fetched successfully",
@@ -342,9 +426,9 @@ class TreeListingView(APIView):
         }.get(tree_type, "Tree list fetched successfully")
 
         response_data = {
-            "count": paginator.page.paginator.count if report_flag != "1" else trees.count(),
-            "next": paginator.get_next_link() if report_flag != "1" else None,
-            "previous": paginator.get_previous_link() if report_flag != "1" else None,
+            "count": paginator.page.paginator.count,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
             "data": serialized_data,
         }
 
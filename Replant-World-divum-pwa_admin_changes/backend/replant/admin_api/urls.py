@@ -50,6 +50,8 @@ from replant.admin_api.dashboard import AdminDashboardStatisticsView
 
 from replant.admin_api.report import DashboardReportGenerationView
 
+from replant.admin_api.report_job import ReportJobView, ReportJobDetailView
+
 v1_router = routers.SimpleRouter(trailing_slash=False)
 
 urlpatterns = [
@@ -110,4 +112,6 @@ urlpatterns = [
 
     # Report Generation API s
     path("v1/admin/report", DashboardReportGenerationView.as_view(), name="organization-counties"),
+    path("v1/admin/report-jobs", ReportJobView.as_view(), name="report-jobs"),
+    path("v1/admin/report-jobs/<int:job_id>", ReportJobDetailView.as_view(), name="report-job"),
 ]
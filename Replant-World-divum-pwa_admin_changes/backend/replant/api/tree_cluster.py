@@ -2,6 +2,7 @@ from django.db import models
 from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import exceptions, generics, serializers
 
+from replant import clustering
 from replant.models import TreesCluster
 
 
@@ -36,4 +37,8 @@ class TreeClustersView(generics.ListAPIView):
             index = int(self.request.query_params["index"])
         except (KeyError, ValueError):
             raise exceptions.ValidationError("zoom and index params must be provided")
-        return queryset.filter(zoom=zoom, tile_index=index)
+        try:
+            tile_index = clustering.get_tile_index_from_grid_index(index, zoom=zoom)
+        except ValueError as err:
+            raise exceptions.ValidationError(str(err))
+        return queryset.filter(zoom=zoom, tile_index=tile_index)
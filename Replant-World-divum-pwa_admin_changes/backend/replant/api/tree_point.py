@@ -2,6 +2,7 @@ from django.db import models
 from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import exceptions, generics, serializers
 
+from replant import clustering
 from replant.models import Nft
 
 
@@ -35,5 +36,11 @@ class TreePointsView(generics.ListAPIView):
             index = int(self.request.query_params["index"])
         except (KeyError, ValueError):
             raise exceptions.ValidationError("index param must be provided")
+        try:
+            tile_index = clustering.get_tile_index_from_grid_index(
+                index, zoom=clustering.TREE_ZOOM
+            )
+        except ValueError as err:
+            raise exceptions.ValidationError(str(err))
 
-        return queryset.filter(tile_index=index)
+        return queryset.filter(tile_index=tile_index)
@@ -0,0 +1,83 @@
+import gzip
+
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework import exceptions, views
+from rest_framework.request import Request
+
+import env
+from replant import clustering
+from replant.models import TreesTile
+
+KINDS = {
+    "clusters": TreesTile.Kind.CLUSTERS,
+    "points": TreesTile.Kind.POINTS,
+}
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether gzip has a non-zero quality in the Accept-Encoding header."""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+class TreeTileView(views.APIView):
+    """Serve a precomputed binary tile, see `replant.tree_tiles` for the format.
+
+    Tiles are addressed by the row-major index used by the other map endpoints.
+    Tiles that don't exist are served as empty ones. Tiles are rebuilt by the
+    clustering, so they can be cached until the next run.
+    """
+
+    @extend_schema(responses={(200, "application/octet-stream"): OpenApiTypes.BINARY})
+    def get(self, request: Request, kind: str, zoom: int, index: int):
+        if kind not in KINDS:
+            raise exceptions.NotFound()
+        try:
+            tile_index = clustering.get_tile_index_from_grid_index(index, zoom)
+        except ValueError as err:
+            raise exceptions.ValidationError(str(err))
+
+        tile = (
+            TreesTile.objects.filter(kind=KINDS[kind], zoom=zoom, tile_index=tile_index)
+            .only("data", "etag")
+            .first()
+        )
+        use_gzip = accepts_gzip(request.headers.get("Accept-Encoding", ""))
+        # Both encodings are different representations, so they need own ETags.
+        etag = f'"{tile.etag}{"-gz" if use_gzip else ""}"' if tile else None
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content_type="application/octet-stream")
+            if tile:
+                if use_gzip:
+                    response.content = tile.data
+                    response.headers["Content-Encoding"] = "gzip"
+                else:
+                    response.content = gzip.decompress(tile.data)
+
+        if etag:
+            response.headers["ETag"] = etag
+        patch_cache_control(
+            response, public=True, max_age=env.TREE_TILES_MAX_AGE_SECONDS
+        )
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
@@ -0,0 +1,73 @@
+from django.db import models
+from drf_spectacular.utils import extend_schema, inline_serializer
+from rest_framework import exceptions, serializers, views
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from replant import clustering
+from replant.models import Nft, TreesCluster
+
+from .tree_cluster import TreeClusterSerializer
+from .tree_point import TreesPointSerializer
+
+MAX_TILES = 1024
+
+
+class ViewportSerializer(serializers.Serializer):
+    zoom = serializers.IntegerField(min_value=1, max_value=clustering.TREE_ZOOM)
+    south = serializers.FloatField(min_value=-90, max_value=90)
+    west = serializers.FloatField(min_value=-180, max_value=180)
+    north = serializers.FloatField(min_value=-90, max_value=90)
+    east = serializers.FloatField(min_value=-180, max_value=180)
+
+    def validate(self, attrs):
+        if attrs["south"] > attrs["north"]:
+            raise exceptions.ValidationError("south must not be above north")
+        return attrs
+
+
+class TreeViewportView(views.APIView):
+    """Clusters and points of all the tiles covering a bounding box at once.
+
+    Clusters are returned for zooms below the tree zoom and points (minted trees)
+    for the tree zoom, the same as from the per tile endpoints.
+    """
+
+    @extend_schema(
+        parameters=[ViewportSerializer],
+        responses=inline_serializer(
+            "TreeViewport",
+            {
+                "clusters": TreeClusterSerializer(many=True),
+                "points": TreesPointSerializer(many=True),
+            },
+        ),
+    )
+    def get(self, request: Request):
+        serializer = ViewportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        zoom = serializer.validated_data["zoom"]
+
+        try:
+            tile_ranges = clustering.get_tile_index_ranges(
+                **serializer.validated_data, max_tiles=MAX_TILES
+            )
+        except ValueError:
+            raise exceptions.ValidationError("Too many tiles, zoom in")
+        in_tiles = models.Q()
+        for tile_range in tile_ranges:
+            in_tiles |= models.Q(tile_index__range=tile_range)
+
+        clusters = TreesCluster.objects.none()
+        points = Nft.objects.none()
+        if zoom < clustering.TREE_ZOOM:
+            clusters = TreesCluster.objects.filter(in_tiles, zoom=zoom)
+        else:
+            points = Nft.objects.filter(in_tiles)
+
+        return Response(
+            {
+                "clusters": TreeClusterSerializer(clusters, many=True).data,
+                "points": TreesPointSerializer(points, many=True).data,
+            }
+        )
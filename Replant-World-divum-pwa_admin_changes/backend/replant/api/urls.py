@@ -18,6 +18,8 @@ from .status import StatusView
 from .tree import TreeView
 from .tree_cluster import TreeClustersView
 from .tree_point import TreePointsView
+from .tree_tile import TreeTileView
+from .tree_viewport import TreeViewportView
 from .tree_summary import TreeSummaryView
 from .user import UserView
 from .user_history import UserHistoryView
@@ -47,6 +49,8 @@ urlpatterns = [
     path("trees/summary", TreeSummaryView.as_view()),
     path("tree-clusters", TreeClustersView.as_view()),
     path("tree-points", TreePointsView.as_view()),
+    path("tree-tiles/<str:kind>/<int:zoom>/<int:index>", TreeTileView.as_view()),
+    path("tree-viewport", TreeViewportView.as_view()),
     path("status", StatusView.as_view()),
     path("user", UserView.as_view()),
     path("user-history", UserHistoryView.as_view()),
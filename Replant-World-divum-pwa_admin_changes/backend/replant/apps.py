@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.core.exceptions import ImproperlyConfigured
+
+import env
+from replant import nft_images
+
+
+class ReplantConfig(AppConfig):
+    name = "replant"
+
+    def ready(self) -> None:
+        # Fail on startup rather than when the first trees are minted.
+        try:
+            nft_images.check_image_format(
+                nft_images.ImageFormat(name=env.NFT_IMAGE_FORMAT)
+            )
+        except ValueError as err:
+            raise ImproperlyConfigured(err) from err
@@ -1,17 +1,34 @@
+import contextlib
 import logging
 import math
 import time
-from collections import Counter, defaultdict
-
-from django.db import models
+from collections import defaultdict
+from concurrent import futures
+from typing import Mapping, Sequence
+
+import django
+import numpy as np
+from django.db import connection, models, transaction
+from django.utils import timezone
+from scipy import spatial as sci_spatial
+from scipy.spatial import distance as sci_distance
 from sklearn import cluster as sci_cluster
+from sklearn import neighbors as sci_neighbors
 
-from replant.models import Nft, TreesCluster
+from replant import tree_tiles
+from replant.models import ClusteringRun, Nft, TreesCluster
 
 logger = logging.getLogger(__name__)
 
 TREE_ZOOM = 9
 
+BULK_SIZE = 1000
+
+FETCH_CHUNK_SIZE = 10000
+
+# Key of the Postgres advisory lock held by a clustering run.
+CLUSTERING_LOCK_ID = 0x7265706C616E74
+
 Point = tuple[float, float]
 
 
@@ -21,17 +38,125 @@ def cluster_trees(
     expand_n_clusters=20,
     min_distance_multiplier=0.24,
     max_zoom=TREE_ZOOM - 1,
+    incremental=False,
+    workers=1,
+):
+    # A full run swaps in all clusters at its end, so clusters added by an
+    # incremental run in the meantime would be lost. Full runs wait for a running
+    # incremental one, incremental runs are skipped, the next one catches up.
+    if not _lock_clustering(wait=not incremental):
+        logger.info("Another clustering run is in progress, skipping.")
+        return
+    try:
+        _run_clustering(
+            initial_n_clusters=initial_n_clusters,
+            initial_min_distance=initial_min_distance,
+            expand_n_clusters=expand_n_clusters,
+            min_distance_multiplier=min_distance_multiplier,
+            max_zoom=max_zoom,
+            incremental=incremental,
+            workers=workers,
+        )
+    finally:
+        _unlock_clustering()
+
+
+def _lock_clustering(wait: bool) -> bool:
+    """Take the clustering lock, returns whether it was taken.
+
+    The lock is held by the database session, so it's released also when the
+    process dies. Other databases than Postgres are only used in development.
+    """
+    if connection.vendor != "postgresql":
+        return True
+    with connection.cursor() as cursor:
+        if wait:
+            cursor.execute("SELECT pg_advisory_lock(%s)", [CLUSTERING_LOCK_ID])
+            return True
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [CLUSTERING_LOCK_ID])
+        (locked,) = cursor.fetchone()
+        return locked
+
+
+def _unlock_clustering():
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", [CLUSTERING_LOCK_ID])
+
+
+def _run_clustering(
+    initial_n_clusters: int,
+    initial_min_distance: float,
+    expand_n_clusters: int,
+    min_distance_multiplier: float,
+    max_zoom: int,
+    incremental: bool,
+    workers: int,
 ):
     t0 = time.time()
 
-    logger.info("Clearing old clusters...")
-    TreesCluster.objects.all().delete()
+    last_run = ClusteringRun.objects.get_last_finished()
+    if incremental and not last_run:
+        logger.info("No finished clustering run yet, running a full rebuild.")
+        incremental = False
+
+    run = ClusteringRun.objects.create(
+        is_incremental=incremental, started_at=timezone.now()
+    )
+
+    if incremental:
+        assert last_run
+        run.number_of_trees = _cluster_new_trees(
+            minted_after=last_run.started_at,
+            minted_before=run.started_at,
+            initial_min_distance=initial_min_distance,
+            min_distance_multiplier=min_distance_multiplier,
+            max_zoom=max_zoom,
+        )
+    else:
+        run.number_of_trees = _cluster_all_trees(
+            minted_before=run.started_at,
+            initial_n_clusters=initial_n_clusters,
+            initial_min_distance=initial_min_distance,
+            expand_n_clusters=expand_n_clusters,
+            min_distance_multiplier=min_distance_multiplier,
+            max_zoom=max_zoom,
+            workers=workers,
+        )
+
+    run.finished_at = timezone.now()
+    run.save()
 
+    t1 = time.time()
+    logger.info(f"Done in {t1 - t0:.2f}s")
+
+
+def _cluster_all_trees(
+    minted_before,
+    initial_n_clusters: int,
+    initial_min_distance: float,
+    expand_n_clusters: int,
+    min_distance_multiplier: float,
+    max_zoom: int,
+    workers: int,
+) -> int:
     logger.info("Fetching trees data...")
-    items = fetch_trees_data()
-    if not items:
+    # Trees minted after the run started are left to the next incremental run.
+    items = _fetch_points(
+        fetch_trees_data().filter(
+            models.Q(minted_at__lte=minted_before) | models.Q(minted_at__isnull=True)
+        )
+    )
+    if not len(items):
         logger.warn("No trees data.")
-        return
+        _replace_all_clusters([])
+        _rebuild_all_tiles()
+        return 0
+
+    # Clusters are collected in memory and swapped in at the end, so the map is never
+    # empty or half-built while the clustering is running.
+    out: list[TreesCluster] = []
 
     logger.info("Finding initial clusters...")
     clusters, labels, counter = _cluster(
@@ -39,23 +164,165 @@ def cluster_trees(
         items=items,
         zoom=1,
         min_distance=initial_min_distance,
+        out=out,
     )
 
     logger.info("Expanding clusters...")
-    _expand_clusters(
-        clusters=clusters,
-        labels=labels,
-        items=items,
-        counter=counter,
-        zoom=2,
-        max_zoom=max_zoom,
-        min_distance=initial_min_distance * min_distance_multiplier,
-        min_distance_multiplier=min_distance_multiplier,
-        expand_n_clusters=expand_n_clusters,
+    # Subtrees of the top level clusters are independent, so they can be expanded in
+    # worker processes. Workers only compute clusters, the database is written here.
+    with contextlib.ExitStack() as stack:
+        executor = (
+            stack.enter_context(
+                futures.ProcessPoolExecutor(
+                    max_workers=workers, initializer=django.setup
+                )
+            )
+            if workers > 1
+            else None
+        )
+        _expand_clusters(
+            clusters=clusters,
+            labels=labels,
+            items=items,
+            counter=counter,
+            zoom=2,
+            max_zoom=max_zoom,
+            min_distance=initial_min_distance * min_distance_multiplier,
+            min_distance_multiplier=min_distance_multiplier,
+            expand_n_clusters=expand_n_clusters,
+            out=out,
+            executor=executor,
+        )
+
+    logger.info(f"Saving {len(out)} clusters...")
+    _replace_all_clusters(out)
+    _rebuild_all_tiles()
+    return len(items)
+
+
+def _replace_all_clusters(clusters: list[TreesCluster]):
+    with transaction.atomic():
+        TreesCluster.objects.all().delete()
+        TreesCluster.objects.bulk_create(clusters, batch_size=BULK_SIZE)
+
+
+def _rebuild_all_tiles():
+    logger.info("Building tiles...")
+    tree_tiles.rebuild_cluster_tiles()
+    tree_tiles.rebuild_point_tiles(zoom=TREE_ZOOM)
+
+
+def _cluster_new_trees(
+    minted_after,
+    minted_before,
+    initial_min_distance: float,
+    min_distance_multiplier: float,
+    max_zoom: int,
+) -> int:
+    """Add trees minted in the given time range to the existing clusters.
+
+    Each new tree joins the nearest cluster closer than the zoom's minimal distance
+    (moving its centroid) or starts a new cluster, which is the same rule used to
+    merge k-means centroids in a full run. Only tiles touched by the new trees are
+    read and written, so the cost scales with the number of new trees.
+    """
+    logger.info("Fetching new trees data...")
+    items = _fetch_points(
+        fetch_trees_data().filter(
+            minted_at__gt=minted_after, minted_at__lte=minted_before
+        )
+    )
+    if not len(items):
+        logger.info("No new trees.")
+        return 0
+
+    logger.info(f"Adding {len(items)} trees to clusters...")
+    for zoom in range(1, max_zoom + 1):
+        changed_tiles = _add_items_to_clusters(
+            items,
+            zoom=zoom,
+            min_distance=initial_min_distance * min_distance_multiplier ** (zoom - 1),
+        )
+        tree_tiles.rebuild_cluster_tiles(zoom=zoom, tile_indexes=changed_tiles)
+
+    tree_tiles.rebuild_point_tiles(
+        zoom=TREE_ZOOM,
+        tile_indexes={
+            get_tree_tile_index(latitude, longitude) for latitude, longitude in items
+        },
     )
+    return len(items)
+
+
+def _add_items_to_clusters(
+    items: np.ndarray, zoom: int, min_distance: float
+) -> set[int]:
+    """Add items to the clusters of a zoom and return indexes of the changed tiles."""
+    # Clusters of neighbouring tiles are candidates too, as the nearest cluster of an
+    # item close to a tile border can have its centroid on the other side.
+    candidate_tiles: set[int] = set()
+    for latitude, longitude in items:
+        candidate_tiles.update(_get_tile_neighbourhood(latitude, longitude, zoom))
+
+    clusters_by_tile: dict[int, list[TreesCluster]] = defaultdict(list)
+    for cluster in TreesCluster.objects.filter(
+        zoom=zoom, tile_index__in=candidate_tiles
+    ):
+        clusters_by_tile[cluster.tile_index].append(cluster)
+
+    changed: dict[int, TreesCluster] = {}
+    created: list[TreesCluster] = []
+    for item in items:
+        nearest: TreesCluster | None = None
+        nearest_distance = min_distance
+        for tile_index in _get_tile_neighbourhood(item[0], item[1], zoom):
+            for cluster in clusters_by_tile.get(tile_index, []):
+                d = _distance((cluster.latitude, cluster.longitude), item)
+                if d < nearest_distance:
+                    nearest = cluster
+                    nearest_distance = d
+
+        if nearest is None:
+            cluster = _make_cluster((item[0], item[1]), count=1, zoom=zoom)
+            clusters_by_tile[cluster.tile_index].append(cluster)
+            created.append(cluster)
+            continue
+
+        nearest.latitude, nearest.longitude = _merge_clusters(
+            [
+                ((nearest.latitude, nearest.longitude), nearest.number_of_trees),
+                (item, 1),
+            ]
+        )
+        nearest.number_of_trees += 1
+        changed[id(nearest)] = nearest
+
+    # Write the changes tile by tile so that every tile is swapped atomically.
+    # A centroid can drift over a tile border, so the tile index is recomputed.
+    to_update_by_tile: dict[int, list[TreesCluster]] = defaultdict(list)
+    to_create_by_tile: dict[int, list[TreesCluster]] = defaultdict(list)
+    changed_tiles = {cluster.tile_index for cluster in changed.values()}
+    for cluster in changed.values():
+        cluster.tile_index = _get_tile_index(
+            latitude=cluster.latitude, longitude=cluster.longitude, zoom=zoom
+        )
+        if cluster.pk:
+            to_update_by_tile[cluster.tile_index].append(cluster)
+        else:
+            to_create_by_tile[cluster.tile_index].append(cluster)
+    for cluster in created:
+        if id(cluster) not in changed:
+            to_create_by_tile[cluster.tile_index].append(cluster)
+
+    for tile_index in to_update_by_tile.keys() | to_create_by_tile.keys():
+        with transaction.atomic():
+            TreesCluster.objects.bulk_update(
+                to_update_by_tile[tile_index],
+                ["latitude", "longitude", "number_of_trees", "tile_index"],
+            )
+            TreesCluster.objects.bulk_create(to_create_by_tile[tile_index])
 
-    t1 = time.time()
-    logger.info(f"Done in {t1 - t0:.2f}s")
+    return changed_tiles | to_update_by_tile.keys() | to_create_by_tile.keys()
 
 
 def fetch_trees_data():
@@ -65,20 +332,39 @@ def fetch_trees_data():
     ).values_list("lat_float", "lon_float")
 
 
+def _fetch_points(queryset: models.QuerySet) -> np.ndarray:
+    """Stream `(latitude, longitude)` rows into a `(n, 2)` float array.
+
+    Rows are read in chunks (through a server-side cursor where the database supports
+    it) and copied straight into a preallocated array, so no list of tuples for all
+    the trees is ever held in memory.
+    """
+    points = np.empty((queryset.count(), 2), dtype=np.float64)
+    n = 0
+    for n, point in enumerate(queryset.iterator(chunk_size=FETCH_CHUNK_SIZE), 1):
+        if n > len(points):
+            # Trees minted since the count was taken.
+            points = np.resize(points, (max(n, 2 * len(points)), 2))
+        points[n - 1] = point
+    return points[:n]
+
+
 def _expand_clusters(
     clusters: list[Point],
-    labels: list[int],
-    items: list[Point],
+    labels: np.ndarray,
+    items: np.ndarray,
     counter: dict[int, int],
     zoom: int,
     max_zoom: int,
     min_distance: float,
     min_distance_multiplier: float,
     expand_n_clusters: int,
+    out: list[TreesCluster],
+    executor: futures.Executor | None = None,
 ):
-    if _get_max_distance(items) < min_distance:
+    if _is_within_distance(items, min_distance):
         # This is an optimization that let's up skip k-means clustering if all the items are close enough to each other. As trees are highly concentrated in a relatively few planting areas, this greatly reduces the time required to process all items.
-        _save_clusters_to_db(clusters, list(counter.values()), zoom=zoom)
+        _collect_clusters(clusters, list(counter.values()), zoom=zoom, out=out)
 
         if zoom < max_zoom:
             _expand_clusters(
@@ -91,54 +377,106 @@ def _expand_clusters(
                 min_distance=min_distance * min_distance_multiplier,
                 min_distance_multiplier=min_distance_multiplier,
                 expand_n_clusters=expand_n_clusters,
+                out=out,
+                executor=executor,
             )
         return
 
     # Recursively generate sub-clusters for each cluster until max_zoom is achieved.
-    for i in range(len(clusters)):
+    subtrees: list[futures.Future[list[TreesCluster]]] = []
+    for i, next_items in enumerate(_split_items_by_label(items, labels, len(clusters))):
+        if not len(next_items):
+            break
+
+        if executor:
+            subtrees.append(
+                executor.submit(
+                    _expand_cluster,
+                    next_items,
+                    zoom=zoom,
+                    max_zoom=max_zoom,
+                    min_distance=min_distance,
+                    min_distance_multiplier=min_distance_multiplier,
+                    expand_n_clusters=expand_n_clusters,
+                )
+            )
+            continue
+
         # Progress tracking for recursive algorithms can be quirky :(
         if zoom == 2:
             logger.info(f"Cluster {i + 1} / {len(clusters)}...")
 
-        next_items = _get_items_with_label(items, labels, label=-i - 1)
-
-        if not next_items:
-            return
-
-        next_clusters, next_labels, next_counter = _cluster(
-            n_clusters=min(expand_n_clusters, len(next_items)),
-            items=next_items,
-            zoom=zoom,
-            min_distance=min_distance,
-        )
-
-        if zoom < max_zoom:
-            _expand_clusters(
-                clusters=next_clusters,
-                labels=next_labels,
-                items=next_items,
-                counter=next_counter,
-                zoom=zoom + 1,
+        out.extend(
+            _expand_cluster(
+                next_items,
+                zoom=zoom,
                 max_zoom=max_zoom,
-                min_distance=min_distance * min_distance_multiplier,
+                min_distance=min_distance,
                 min_distance_multiplier=min_distance_multiplier,
                 expand_n_clusters=expand_n_clusters,
             )
+        )
 
+    for i, subtree in enumerate(subtrees):
+        out.extend(subtree.result())
+        logger.info(f"Cluster {i + 1} / {len(subtrees)} done")
 
-def _get_items_with_label(
-    items: list[Point],
-    labels: list[int],
-    label: int,
-):
-    return [items[i] for i, item_label in enumerate(labels) if item_label == label]
+
+def _expand_cluster(
+    items: np.ndarray,
+    zoom: int,
+    max_zoom: int,
+    min_distance: float,
+    min_distance_multiplier: float,
+    expand_n_clusters: int,
+) -> list[TreesCluster]:
+    out: list[TreesCluster] = []
+    clusters, labels, counter = _cluster(
+        n_clusters=min(expand_n_clusters, len(items)),
+        items=items,
+        zoom=zoom,
+        min_distance=min_distance,
+        out=out,
+    )
+
+    if zoom < max_zoom:
+        _expand_clusters(
+            clusters=clusters,
+            labels=labels,
+            items=items,
+            counter=counter,
+            zoom=zoom + 1,
+            max_zoom=max_zoom,
+            min_distance=min_distance * min_distance_multiplier,
+            min_distance_multiplier=min_distance_multiplier,
+            expand_n_clusters=expand_n_clusters,
+            out=out,
+        )
+    return out
+
+
+def _split_items_by_label(
+    items: np.ndarray, labels: np.ndarray, n_clusters: int
+) -> list[np.ndarray]:
+    """Split items into the merged clusters they belong to.
+
+    Items are reordered in place so that each cluster is a contiguous block and the
+    returned arrays are views of `items`, i-th of them holding the items labelled
+    `-i - 1`. Nested calls keep reordering the same buffer, so the recursion never
+    copies the points.
+    """
+    order = np.argsort(-labels, kind="stable")
+    items[:] = items[order]
+    counts = np.bincount(-labels - 1, minlength=n_clusters)
+    return np.split(items, np.cumsum(counts)[:-1])
 
 
 def _cluster(
     n_clusters: int,
-    items: list[Point],
+    items: np.ndarray,
     zoom: int,
     min_distance: float,
+    out: list[TreesCluster],
 ):
     # We try to achieve multiple goals with the algorithm:
     # - clusters can't overlap each other on the map
@@ -154,13 +492,12 @@ def _cluster(
     model = sci_cluster.MiniBatchKMeans(n_clusters=max(1, min(n_clusters, len(items))))
     model = model.fit(items)
 
-    clusters = list(model.cluster_centers_)
-    labels = list(model.labels_)
-    counter = Counter(sorted(model.labels_))
-
     # Second step.
     clusters, labels, counter = _merge_close_clusters(
-        clusters, labels, counter, min_distance=min_distance
+        model.cluster_centers_,
+        model.labels_,
+        np.bincount(model.labels_, minlength=len(model.cluster_centers_)),
+        min_distance=min_distance,
     )
 
     # Remove centroids with no items. It can happen with MiniBatchKMeans.
@@ -170,43 +507,58 @@ def _cluster(
             if i in counter:
                 del counter[i]
 
-    _save_clusters_to_db(clusters, list(counter.values()), zoom=zoom)
+    _collect_clusters(clusters, list(counter.values()), zoom=zoom, out=out)
 
     return clusters, labels, counter
 
 
 def _merge_close_clusters(
-    clusters: list[Point],
-    labels: list[int],
-    counter: dict[int, int],
+    clusters: Sequence[Point] | np.ndarray,
+    labels: Sequence[int] | np.ndarray,
+    counter: Mapping[int, int] | np.ndarray,
     min_distance: float,
-):
-    label_by_cluster = {id(cluster): i for i, cluster in enumerate(clusters)}
+) -> tuple[list[Point], np.ndarray, dict[int, int]]:
+    """Greedily merge clusters that are closer than `min_distance` to each other.
+
+    Starting from the cluster with the highest label, every still unmerged cluster
+    within `min_distance` of it is merged into a single weighted centroid. Items of
+    merged clusters get negative labels: `-i - 1` for the i-th merged cluster.
+    """
+    centroids = np.asarray(clusters, dtype=float).reshape(-1, 2)
+    labels = np.asarray(labels, dtype=int)
+    weights = np.array([counter[i] for i in range(len(centroids))], dtype=int)
+
+    # The radius is slightly enlarged as the tree computes distances differently.
+    # Neighbours are filtered with the exact `_distance` formula below.
+    tree = sci_neighbors.KDTree(centroids)
+    neighbours = tree.query_radius(centroids, r=min_distance * (1 + 1e-9))
+
     merged_clusters: list[Point] = []
-    new_labels = list(labels)
-    new_counter: dict[int, int] = defaultdict(int)
-    while clusters:
-        cluster = clusters[len(clusters) - 1]
-        to_merge = []
-        # TODO: Don't compare with self in first iteration
-        for i in reversed(range(len(clusters))):
-            other_cluster = clusters[i]
-            if _distance(cluster, other_cluster) < min_distance:
-                clusters.pop(i)
-                label = label_by_cluster[id(other_cluster)]
-                # Assign a new label to items. The label of merged clusters is negative to differentiate from the original clusters.
-                for k in range(len(new_labels)):
-                    if new_labels[k] == label:
-                        new_labels[k] = -len(merged_clusters) - 1
-                weight = counter[label]
-                if weight:
-                    to_merge.append((other_cluster, weight))
-                    new_counter[len(merged_clusters)] += weight
-
-        if to_merge:
-            cluster = _merge_clusters(to_merge)
-            merged_clusters.append(cluster)
-    return merged_clusters, new_labels, new_counter
+    new_counter: dict[int, int] = {}
+    new_label_by_label = np.empty(len(centroids), dtype=int)
+    is_merged = np.zeros(len(centroids), dtype=bool)
+    for i in reversed(range(len(centroids))):
+        if is_merged[i]:
+            continue
+
+        to_merge = neighbours[i][~is_merged[neighbours[i]]]
+        delta = centroids[to_merge] - centroids[i]
+        distances = np.sqrt(delta[:, 0] * delta[:, 0] + delta[:, 1] * delta[:, 1])
+        # Descending order keeps the floating point sums identical to a sequential scan.
+        to_merge = np.sort(to_merge[distances < min_distance])[::-1]
+
+        is_merged[to_merge] = True
+        new_label_by_label[to_merge] = -len(merged_clusters) - 1
+        weighted = [
+            (centroids[label], int(weights[label]))
+            for label in to_merge
+            if weights[label]
+        ]
+        if weighted:
+            new_counter[len(merged_clusters)] = sum(weight for _, weight in weighted)
+            merged_clusters.append(_merge_clusters(weighted))
+
+    return merged_clusters, new_label_by_label[labels], new_counter
 
 
 def _merge_clusters(clusters: list[tuple[Point, int]]) -> Point:
@@ -222,14 +574,32 @@ def _merge_clusters(clusters: list[tuple[Point, int]]) -> Point:
     return lat, lon
 
 
-def _get_max_distance(points: list[Point]):
-    p1 = points[0]
-    max_distance = 0.0
-    for p2 in points[1:]:
-        d = _distance(p1, p2)
-        if d > max_distance:
-            max_distance = d
-    return max_distance
+def _is_within_distance(points: np.ndarray, distance: float) -> bool:
+    """Check whether all pairs of points are closer than `distance` to each other."""
+    if len(points) < 2:
+        return True
+
+    # The diameter of the points is at least the longer side of their bounding box
+    # and at most its diagonal, which settles most cases without computing it.
+    extent = points.max(axis=0) - points.min(axis=0)
+    if extent.max() >= distance:
+        return False
+    if math.hypot(extent[0], extent[1]) < distance:
+        return True
+    return _get_diameter(points) < distance
+
+
+def _get_diameter(points: np.ndarray) -> float:
+    try:
+        hull = sci_spatial.ConvexHull(points)
+    except sci_spatial.QhullError:
+        # Fewer than three distinct or all collinear points, the diameter is then
+        # the diagonal of the bounding box.
+        extent = points.max(axis=0) - points.min(axis=0)
+        return math.hypot(extent[0], extent[1])
+
+    # The farthest pair of points is always a pair of hull vertices.
+    return float(sci_distance.pdist(points[hull.vertices]).max())
 
 
 def _distance(p1: Point, p2: Point) -> float:
@@ -238,35 +608,118 @@ def _distance(p1: Point, p2: Point) -> float:
     )
 
 
-def _save_clusters_to_db(
+def _collect_clusters(
     centroids: list[Point],
     counts: list[int],
     zoom: int,
+    out: list[TreesCluster],
 ):
     assert len(centroids) == len(counts)
-    clusters: list[TreesCluster] = []
     for centroid, count in zip(centroids, counts):
-        latitude = max(-90, min(90, centroid[0]))
-        longitude = max(-180, min(180, centroid[1]))
-        cluster = TreesCluster(
-            latitude=latitude,
-            longitude=longitude,
-            number_of_trees=count,
-            zoom=zoom,
-            tile_index=_get_tile_index(
-                latitude=latitude, longitude=longitude, zoom=zoom
-            ),
-        )
-        clusters.append(cluster)
-    TreesCluster.objects.bulk_create(clusters)
+        out.append(_make_cluster(centroid, count=count, zoom=zoom))
+
+
+def _make_cluster(centroid: Point, count: int, zoom: int) -> TreesCluster:
+    latitude = max(-90, min(90, centroid[0]))
+    longitude = max(-180, min(180, centroid[1]))
+    return TreesCluster(
+        latitude=latitude,
+        longitude=longitude,
+        number_of_trees=count,
+        zoom=zoom,
+        tile_index=_get_tile_index(latitude=latitude, longitude=longitude, zoom=zoom),
+    )
 
 
-def _get_tile_index(latitude: float, longitude: float, zoom: int) -> int:
+def _get_tile_xy(latitude: float, longitude: float, zoom: int) -> tuple[int, int]:
     grid_size = int(4 ** (max(0, zoom - 1)))
     tile_size = 360 / grid_size
     y = int((latitude + 90) / tile_size)
     x = int((longitude + 180) / tile_size)
-    return y * grid_size + x
+    return x, y
+
+
+def _get_tile_index_from_xy(x: int, y: int) -> int:
+    """Z-order (Morton) key of a tile, bits of x and y interleaved.
+
+    The 16 tiles of the next zoom covering a tile with key `k` have keys from
+    `16 * k` to `16 * k + 15`, so the tiles of any area are a few contiguous ranges.
+    """
+    index = 0
+    for bit in range(max(x, y).bit_length()):
+        index |= ((x >> bit) & 1) << (2 * bit)
+        index |= ((y >> bit) & 1) << (2 * bit + 1)
+    return index
+
+
+def _get_tile_index(latitude: float, longitude: float, zoom: int) -> int:
+    x, y = _get_tile_xy(latitude, longitude, zoom)
+    return _get_tile_index_from_xy(x, y)
+
+
+def _get_tile_neighbourhood(latitude: float, longitude: float, zoom: int) -> list[int]:
+    """Tile indexes of the item's tile and the 8 tiles around it."""
+    grid_size = int(4 ** (max(0, zoom - 1)))
+    x, y = _get_tile_xy(latitude, longitude, zoom)
+    return [
+        _get_tile_index_from_xy(x + dx, y + dy)
+        for dy in (-1, 0, 1)
+        for dx in (-1, 0, 1)
+        if 0 <= x + dx < grid_size and 0 <= y + dy <= grid_size // 2
+    ]
+
+
+def get_tile_index_from_grid_index(grid_index: int, zoom: int) -> int:
+    """Convert a row-major tile index (`y * grid_size + x`) used by the API.
+
+    Raises `ValueError` if the zoom or the index is outside of the tile grid.
+    """
+    if not 1 <= zoom <= TREE_ZOOM:
+        raise ValueError(f"zoom must be from 1 to {TREE_ZOOM}")
+    grid_size = int(4 ** (zoom - 1))
+    # Rows of tiles go from the south pole up to the north pole, which is in a
+    # row of its own, see `_get_tile_xy`.
+    if not 0 <= grid_index < grid_size * (grid_size // 2 + 1):
+        raise ValueError(f"index is outside of the tile grid of zoom {zoom}")
+    return _get_tile_index_from_xy(grid_index % grid_size, grid_index // grid_size)
+
+
+def get_tile_index_ranges(
+    south: float,
+    west: float,
+    north: float,
+    east: float,
+    zoom: int,
+    max_tiles: int,
+) -> list[tuple[int, int]]:
+    """Inclusive ranges of indexes of the tiles covering the bounding box.
+
+    A bounding box with `west > east` crosses the antimeridian. Raises `ValueError`
+    if the bounding box covers more than `max_tiles` tiles.
+    """
+    grid_size = int(4 ** (max(0, zoom - 1)))
+    x0, y0 = _get_tile_xy(south, west, zoom)
+    x1, y1 = _get_tile_xy(north, east, zoom)
+    y0, y1 = max(0, y0), min(y1, grid_size // 2)
+    x0, x1 = max(0, x0), min(x1, grid_size - 1)
+    xs = (
+        [*range(x0, x1 + 1)]
+        if west <= east
+        else [*range(x0, grid_size), *range(x1 + 1)]
+    )
+    if len(xs) * (y1 - y0 + 1) > max_tiles:
+        raise ValueError("Too many tiles")
+
+    indexes = sorted(
+        _get_tile_index_from_xy(x, y) for y in range(y0, y1 + 1) for x in xs
+    )
+    ranges = [(indexes[0], indexes[0])]
+    for index in indexes[1:]:
+        if index == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], index)
+        else:
+            ranges.append((index, index))
+    return ranges
 
 
 def get_tree_tile_index(latitude: float, longitude: float):
@@ -1,9 +1,12 @@
 import io
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field
 
 import boto3
 import requests
+from botocore.config import Config
 from pydantic import BaseModel, Field
+from requests.adapters import HTTPAdapter
 from retry import retry
 
 import env
@@ -27,18 +30,45 @@ class UploadResponse(BaseModel):
 class FileDto:
     file_name: str
     content: io.BytesIO
+    # Object metadata, {"import": "car"} imports the content of a CAR file to IPFS.
+    metadata: dict[str, str] = field(default_factory=dict)
+
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """Return the S3 client shared by all threads, creating it on first use.
+
+    Reusing the client reuses its pool of connections, which can serve all the
+    concurrent uploads. Using a client from many threads is safe, creating one
+    isn't, so the lock is only taken until the client exists.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = boto3.client(
+                    service_name="s3",
+                    endpoint_url=env.NFT_STORAGE_API_URL,
+                    aws_access_key_id=env.NFT_STORAGE_ACCESS_KEY,
+                    aws_secret_access_key=env.NFT_STORAGE_SECRET_ACCESS_KEY,
+                    config=Config(max_pool_connections=env.FILE_UPLOAD_CONCURRENCY),
+                )
+    return _s3_client
 
 
 @retry(delay=1, backoff=2, tries=3)
 def upload_to_bucket(dto: FileDto) -> UploadResponse:
-    s3 = boto3.client(
-        service_name="s3",
-        endpoint_url=env.NFT_STORAGE_API_URL,
-        aws_access_key_id=env.NFT_STORAGE_ACCESS_KEY,
-        aws_secret_access_key=env.NFT_STORAGE_SECRET_ACCESS_KEY,
-    )
+    s3 = get_s3_client()
+    # The stream is consumed by a failed attempt, every retry must start over.
+    dto.content.seek(0)
     upload_response = s3.put_object(
-        Body=dto.content, Bucket=env.NFT_STORAGE_BUCKET_NAME, Key=dto.file_name
+        Body=dto.content,
+        Bucket=env.NFT_STORAGE_BUCKET_NAME,
+        Key=dto.file_name,
+        Metadata=dto.metadata,
     )
     return UploadResponse.model_validate(upload_response)
 
@@ -53,9 +83,17 @@ class PinResponse(BaseModel):
     request_id: str = Field(alias="requestid")
 
 
+# Keeps the connections to the pinning service alive between requests.
+session = requests.Session()
+session.mount(
+    "https://",
+    HTTPAdapter(pool_maxsize=env.FILE_UPLOAD_CONCURRENCY),
+)
+
+
 @retry(delay=1, backoff=2, tries=3)
 def pin_file_to_ipfs(dto: PinObjectDto) -> PinResponse:
-    r = requests.post(
+    r = session.post(
         url=env.IPFS_PINNING_SERVICE_URL,
         headers={
             "Authorization": f"Bearer {env.FILEBASE_IPFS_PINNINGS_SERVICE_ACCESS_TOKEN}"
@@ -0,0 +1,119 @@
+"""Packing of files into an IPFS directory stored in a CAR file.
+
+Only what's needed for small files is implemented: every file is stored as one raw
+block (as by `ipfs add --cid-version=1`) and they're linked from a flat UnixFS
+directory. See https://ipld.io/specs/transport/car/carv1/ and
+https://github.com/ipfs/specs/blob/main/UNIXFS.md.
+"""
+
+import base64
+import hashlib
+from dataclasses import dataclass
+
+RAW_CODEC = 0x55
+DAG_PB_CODEC = 0x70
+SHA2_256 = 0x12
+
+UNIXFS_DIRECTORY = 1
+
+# Larger files would have to be split into more blocks.
+MAX_FILE_SIZE = 256 * 1024
+
+
+@dataclass(frozen=True)
+class Block:
+    cid: bytes
+    data: bytes
+
+
+def make_directory_car(files: dict[str, bytes]) -> tuple[str, bytes]:
+    """Pack files into a directory.
+
+    Args:
+        files: contents of the files by their names
+
+    Returns:
+        CID of the directory and the CAR file containing it
+    """
+    blocks = []
+    links = []
+    for name, content in sorted(files.items(), key=lambda item: item[0].encode()):
+        if len(content) > MAX_FILE_SIZE:
+            raise ValueError(f"File {name} is larger than {MAX_FILE_SIZE} bytes.")
+        block = _make_block(RAW_CODEC, content)
+        blocks.append(block)
+        links.append(_encode_link(block.cid, name, len(content)))
+
+    # Links of a dag-pb node are encoded before its data.
+    unixfs_data = _encode_field(1, UNIXFS_DIRECTORY)
+    directory = _make_block(
+        DAG_PB_CODEC,
+        b"".join(_encode_bytes_field(2, link) for link in links)
+        + _encode_bytes_field(1, unixfs_data),
+    )
+    blocks.insert(0, directory)
+    return encode_cid(directory.cid), _encode_car(directory.cid, blocks)
+
+
+def encode_cid(cid: bytes) -> str:
+    """Encode a binary CID v1 as a base32 string."""
+    return "b" + base64.b32encode(cid).decode().lower().rstrip("=")
+
+
+def _make_block(codec: int, data: bytes) -> Block:
+    digest = hashlib.sha256(data).digest()
+    multihash = _encode_varint(SHA2_256) + _encode_varint(len(digest)) + digest
+    return Block(cid=_encode_varint(1) + _encode_varint(codec) + multihash, data=data)
+
+
+def _encode_link(cid: bytes, name: str, size: int) -> bytes:
+    return (
+        _encode_bytes_field(1, cid)
+        + _encode_bytes_field(2, name.encode())
+        + _encode_field(3, size)
+    )
+
+
+def _encode_car(root: bytes, blocks: list[Block]) -> bytes:
+    # DAG-CBOR of {"roots": [root], "version": 1}, CIDs are tagged with 42.
+    cid_bytes = b"\x00" + root
+    header = (
+        b"\xa2"
+        + b"\x65roots"
+        + b"\x81\xd8\x2a"
+        + _encode_cbor_bytes_head(len(cid_bytes))
+        + cid_bytes
+        + b"\x67version"
+        + b"\x01"
+    )
+    sections = [_encode_varint(len(header)) + header]
+    for block in blocks:
+        sections.append(
+            _encode_varint(len(block.cid) + len(block.data)) + block.cid + block.data
+        )
+    return b"".join(sections)
+
+
+def _encode_cbor_bytes_head(length: int) -> bytes:
+    if length < 24:
+        return bytes([0x40 + length])
+    if length < 0x100:
+        return bytes([0x58, length])
+    return bytes([0x59]) + length.to_bytes(2, "big")
+
+
+def _encode_field(number: int, value: int) -> bytes:
+    return _encode_varint(number << 3) + _encode_varint(value)
+
+
+def _encode_bytes_field(number: int, value: bytes) -> bytes:
+    return _encode_varint(number << 3 | 2) + _encode_varint(len(value)) + value
+
+
+def _encode_varint(value: int) -> bytes:
+    encoded = bytearray()
+    while value >= 0x80:
+        encoded.append(value & 0x7F | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
@@ -1,8 +1,8 @@
 import djclick as click
 import logging
-from django.db import transaction
+import time
+from django.db import models, transaction
 from django.utils import timezone
-from django.db import models
 
 from replant.models import Tree
 from replant import nft
@@ -30,6 +30,7 @@ def auto_mint(tree_id, all):
     2. Generate NFT IDs
     3. Upload images and metadata to storage
     4. Mint NFTs on blockchain
+    5. Wait for the minting transactions to be confirmed
     """
     logger.info("🚀 Auto mint command started ")
     if tree_id:
@@ -39,87 +40,95 @@ def auto_mint(tree_id, all):
         trees = Tree.objects.filter(
             sponsor__isnull=False,
             review_state=Tree.ReviewState.APPROVED,
-        ).exclude(minting_state=Tree.MintingState.MINTED)
+        ).exclude(
+            minting_state__in=[Tree.MintingState.SUBMITTED, Tree.MintingState.MINTED]
+        )
     else:
         click.echo("Please specify --tree-id or --all")
         return
-    
+
     if not trees.exists():
         click.echo("No trees found to mint.")
         return
-    
+
     click.echo(f"Found {trees.count()} trees to process")
-    
+
     # Step 1: Mark trees for minting
     click.echo("\nStep 1: Marking trees for minting...")
-    trees.update(minting_state=Tree.MintingState.TO_BE_MINTED)
-    click.echo(f"  ✅ Marked {trees.count()} trees for minting")
-    
+    # Trees leased by a minting process are left to it. The others are leased to
+    # this process and only the leased trees are processed further, the minting
+    # stages save changes of trees only while their lease is held.
+    trees.filter(
+        models.Q(minting_lease_expires_at__isnull=True)
+        | models.Q(minting_lease_expires_at__lte=timezone.now())
+    ).update(minting_state=Tree.MintingState.TO_BE_MINTED)
+    leased_trees = nft._claim_trees(size=trees.count(), id__in=trees.values("id"))
+    click.echo(f"  ✅ Marked {len(leased_trees)} trees for minting")
+    try:
+        minted_trees = _process_trees(leased_trees)
+    finally:
+        nft._release_trees(leased_trees)
+    if minted_trees is None:
+        return
+
+    click.echo(f"\n🎉 Automated minting process completed!")
+    click.echo(f"Successfully processed {len(minted_trees)} trees")
+
+
+def _process_trees(leased_trees: list[Tree]) -> list[Tree] | None:
     # Step 2: Generate NFT IDs
     click.echo("\nStep 2: Generating NFT IDs...")
-    max_nft_id = Tree.objects.aggregate(models.Max("nft_id"))["nft_id__max"] or 0
-    for i, tree in enumerate(trees):
-        if not tree.nft_id:
-            tree.nft_id = max_nft_id + i + 1
-            tree.save()
-            click.echo(f"  Generated NFT ID {tree.nft_id} for tree {tree.id}")
-    
+    nft.reconcile_nft_ids()
+    trees_without_nft_id = [tree for tree in leased_trees if not tree.nft_id]
+    nft._generate_nft_id(trees_without_nft_id)
+    for tree in trees_without_nft_id:
+        click.echo(f"  Generated NFT ID {tree.nft_id} for tree {tree.id}")
+
     # Step 3: Upload images and metadata using the proper storage mechanism
     click.echo("\nStep 3: Uploading images and metadata...")
     try:
-        # Use the existing nft module's upload functions
-        trees_list = list(trees)
-        
         # Upload images
-        trees_no_image_cid = [tree for tree in trees_list if not tree.image_cid]
+        trees_no_image_cid = [tree for tree in leased_trees if not tree.image_cid]
         if trees_no_image_cid:
             click.echo(f"  Uploading {len(trees_no_image_cid)} images...")
-            nft._upload_images(trees_no_image_cid)
+            with nft._make_image_pool() as image_pool:
+                nft._upload_images(trees_no_image_cid, image_pool)
             click.echo("  ✅ Images uploaded successfully")
-        
+
         # Upload metadata
-        trees_no_metadata_cid = [tree for tree in trees_list if not tree.metadata_cid]
+        trees_no_metadata_cid = [
+            tree for tree in leased_trees if not tree.metadata_cid
+        ]
         if trees_no_metadata_cid:
             click.echo(f"  Uploading {len(trees_no_metadata_cid)} metadata files...")
             nft._upload_metadatas(trees_no_metadata_cid)
             click.echo("  ✅ Metadata uploaded successfully")
-            
+
     except Exception as e:
         click.echo(f"  ❌ Storage upload failed: {str(e)}")
         click.echo("  Please check your storage credentials in .env file")
-        return
-    
+        return None
+
     # Step 4: Mint NFTs
     click.echo("\nStep 4: Minting NFTs...")
-    for tree in trees_list:
-        click.echo(f"  Minting NFT {tree.nft_id} for tree {tree.id}...")
-        
-        try:
-            tx = nft.cw721.multi_mint(
-                admin=nft.admin,
-                owner=tree.sponsor.wallet_address,
-                tokens=[
-                    {
-                        "token_id": str(tree.nft_id),
-                        "token_uri": tree.ipfs_metadata_url,
-                    }
-                ],
-            )
-            
-            # Update tree status
-            tree.minting_state = Tree.MintingState.MINTED
-            tree.nft_mint_tx = tx.tx_hash
-            tree.minted_at = timezone.now()
-            tree.save()
-            
-            click.echo(f"  ✅ NFT {tree.nft_id} minted successfully!")
-            click.echo(f"  Transaction: {tx.tx_hash}")
-            click.echo(f"  Owner: {tree.sponsor.wallet_address}")
-            
-        except Exception as e:
-            click.echo(f"  ❌ Minting failed: {str(e)}")
-            tree.minting_state = Tree.MintingState.FAILED
-            tree.save()
-    
-    click.echo(f"\n🎉 Automated minting process completed!")
-    click.echo(f"Successfully processed {trees.count()} trees") 
\ No newline at end of file
+    # Trees whose lease expired during the uploads are minted by the process that
+    # claimed them.
+    with transaction.atomic():
+        trees_to_mint = nft._lock_leased(leased_trees)
+    results = nft._mint_round(trees_to_mint)
+    # Trees are submitted until their transaction is confirmed in a block.
+    nft._save_minting_results(results)
+    for _, trees, tx in results:
+        nft_ids = [tree.nft_id for tree in trees]
+        if isinstance(tx, Exception):
+            click.echo(f"  ❌ Minting NFTs {nft_ids} failed: {str(tx)}")
+        else:
+            click.echo(f"  ✅ NFTs {nft_ids} submitted, transaction: {tx.tx_hash}")
+
+    # Step 5: Wait for the transactions to be confirmed
+    click.echo("\nStep 5: Confirming minting transactions...")
+    while nft.confirm_submitted_nfts():
+        time.sleep(env.MINT_RECEIPT_POLL_INTERVAL_SECONDS)
+    click.echo("  ✅ Minting transactions confirmed")
+
+    return trees_to_mint
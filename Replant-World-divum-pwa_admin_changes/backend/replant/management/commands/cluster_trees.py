@@ -1,10 +1,19 @@
 import djclick as click
-from django.db import transaction
 
 from replant import clustering
 
 
 @click.command()
-@transaction.atomic
-def cluster_trees():
-    clustering.cluster_trees()
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only add trees minted since the last run to the existing clusters",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes used to expand the clusters in a full run",
+)
+def cluster_trees(incremental, workers):
+    clustering.cluster_trees(incremental=incremental, workers=workers)
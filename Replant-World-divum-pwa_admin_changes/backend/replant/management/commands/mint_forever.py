@@ -1,11 +1,13 @@
 import logging
+import threading
 import time
 from pathlib import Path
 
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections
 
 import env
-from replant import nft
+from replant import mint_notifications, nft
 
 logger = logging.getLogger(__name__)
 
@@ -13,11 +15,38 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         logger.info("🔄 Mint forever started")
+        nft.reconcile_nft_ids()
+        # Minting doesn't wait for transactions to be included in blocks.
+        threading.Thread(target=self.confirm_forever, daemon=True).start()
+
+        sleep_time = env.MINT_FOREVER_MIN_SLEEP_TIME_SECONDS
         while True:
+            found_work = False
             try:
-                nft.mint_scheduled_nfts()
+                mint_notifications.listen_for_trees_to_mint()
+                found_work = nft.mint_scheduled_nfts()
             except Exception as err:
                 logger.exception(err)
             finally:
                 Path(env.MINT_FOREVER_HEALTHCHECK_FILE_PATH).touch()
-                time.sleep(env.MINT_FOREVER_SLEEP_TIME_SECONDS)
+
+            # Back off while there is nothing to mint, scheduled trees wake us up.
+            if found_work:
+                sleep_time = env.MINT_FOREVER_MIN_SLEEP_TIME_SECONDS
+            else:
+                sleep_time = min(sleep_time * 2, env.MINT_FOREVER_SLEEP_TIME_SECONDS)
+            try:
+                if mint_notifications.wait_for_trees_to_mint(timeout=sleep_time):
+                    sleep_time = env.MINT_FOREVER_MIN_SLEEP_TIME_SECONDS
+            except Exception as err:
+                logger.exception(err)
+                time.sleep(sleep_time)
+
+    def confirm_forever(self):
+        while True:
+            try:
+                nft.confirm_submitted_nfts()
+            except Exception as err:
+                logger.exception(err)
+                close_old_connections()
+            time.sleep(env.MINT_RECEIPT_POLL_INTERVAL_SECONDS)
@@ -1,8 +1,14 @@
+import time
+
 import djclick as click
 
+import env
 from replant import nft
 
 
 @click.command()
 def mint_once():
+    nft.reconcile_nft_ids()
     nft.mint_scheduled_nfts()
+    while nft.confirm_submitted_nfts():
+        time.sleep(env.MINT_RECEIPT_POLL_INTERVAL_SECONDS)
@@ -0,0 +1,9 @@
+import djclick as click
+
+from replant.models import TreeStats
+
+
+@click.command()
+def rebuild_tree_stats():
+    TreeStats.objects.rebuild()
+    click.echo(f"Rebuilt {TreeStats.objects.count()} tree stats rows.")
@@ -0,0 +1,38 @@
+import logging
+import time
+
+import djclick as click
+from django.db import close_old_connections
+
+import env
+from replant import reports
+
+logger = logging.getLogger(__name__)
+
+
+@click.command()
+@click.option(
+    "--once",
+    is_flag=True,
+    help="Generate the queued reports and exit instead of waiting for new ones",
+)
+def run_report_jobs(once):
+    logger.info("📄 Report worker started")
+    while True:
+        try:
+            found_work = reports.run_next_report_job()
+        except Exception as err:
+            logger.exception(err)
+            close_old_connections()
+            found_work = False
+
+        if found_work:
+            continue
+        try:
+            reports.delete_expired_report_jobs()
+        except Exception as err:
+            logger.exception(err)
+            close_old_connections()
+        if once:
+            return
+        time.sleep(env.REPORT_JOBS_POLL_INTERVAL_SECONDS)
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("replant", "0033_clusteringrun"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TreesTile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("CLUSTERS", "Clusters"), ("POINTS", "Points")],
+                        max_length=16,
+                    ),
+                ),
+                ("zoom", models.PositiveIntegerField()),
+                ("tile_index", models.PositiveIntegerField()),
+                ("data", models.BinaryField()),
+                ("etag", models.CharField(max_length=32)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="treestile",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "zoom", "tile_index"),
+                name="unique_trees_tile_kind_zoom_tile_index",
+            ),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+TREE_ZOOM = 9
+
+BULK_SIZE = 1000
+
+
+def _grid_size(zoom: int) -> int:
+    return int(4 ** (max(0, zoom - 1)))
+
+
+def _to_morton(index: int, zoom: int) -> int:
+    x, y = index % _grid_size(zoom), index // _grid_size(zoom)
+    morton = 0
+    for bit in range(max(x, y).bit_length()):
+        morton |= ((x >> bit) & 1) << (2 * bit)
+        morton |= ((y >> bit) & 1) << (2 * bit + 1)
+    return morton
+
+
+def _from_morton(morton: int, zoom: int) -> int:
+    x = y = 0
+    for bit in range((morton.bit_length() + 1) // 2):
+        x |= ((morton >> (2 * bit)) & 1) << bit
+        y |= ((morton >> (2 * bit + 1)) & 1) << bit
+    return y * _grid_size(zoom) + x
+
+
+def _convert(apps, convert):
+    for model_name in ["Tree", "TreesCluster", "TreesTile"]:
+        model = apps.get_model("replant", model_name)
+        fields = ["tile_index"] if model_name == "Tree" else ["tile_index", "zoom"]
+
+        batch = []
+        for obj in model.objects.only(*fields).iterator(chunk_size=BULK_SIZE):
+            # Trees are indexed at the tree zoom and have no zoom field.
+            obj.tile_index = convert(obj.tile_index, getattr(obj, "zoom", TREE_ZOOM))
+            batch.append(obj)
+            if len(batch) == BULK_SIZE:
+                model.objects.bulk_update(batch, ["tile_index"])
+                batch = []
+        model.objects.bulk_update(batch, ["tile_index"])
+
+
+def set_morton_tile_index(apps, schema_editor):
+    _convert(apps, _to_morton)
+
+
+def set_row_major_tile_index(apps, schema_editor):
+    _convert(apps, _from_morton)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("replant", "0034_treestile"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="treescluster",
+            name="replant_tre_tile_in_13eb87_idx",
+        ),
+        migrations.AlterField(
+            model_name="tree",
+            name="tile_index",
+            field=models.PositiveBigIntegerField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name="treescluster",
+            name="tile_index",
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name="treestile",
+            name="tile_index",
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.AddIndex(
+            model_name="treescluster",
+            index=models.Index(
+                fields=["zoom", "tile_index"], name="replant_tre_zoom_095cf5_idx"
+            ),
+        ),
+        migrations.RunPython(set_morton_tile_index, set_row_major_tile_index),
+    ]
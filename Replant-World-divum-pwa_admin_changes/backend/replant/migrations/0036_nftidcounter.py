@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+def create_counter(apps, schema_editor):
+    NftIdCounter = apps.get_model("replant", "NftIdCounter")
+    Tree = apps.get_model("replant", "Tree")
+
+    last_nft_id = Tree.objects.aggregate(models.Max("nft_id"))["nft_id__max"] or 0
+    NftIdCounter.objects.create(last_nft_id=last_nft_id)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("replant", "0035_morton_tile_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NftIdCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last_nft_id", models.PositiveIntegerField(default=0)),
+                ("reconciled_at", models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.RunPython(create_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.14 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("replant", "0036_nftidcounter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tree",
+            name="minting_lease_expires_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="tree",
+            name="minting_lease_token",
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
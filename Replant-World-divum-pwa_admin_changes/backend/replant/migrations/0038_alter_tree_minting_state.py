@@ -0,0 +1,29 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:20
+
+import django_fsm
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("replant", "0037_tree_minting_lease"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="tree",
+            name="minting_state",
+            field=django_fsm.FSMField(
+                choices=[
+                    ("PENDING", "Pending"),
+                    ("TO_BE_MINTED", "To Be Minted"),
+                    ("SUBMITTED", "Submitted"),
+                    ("MINTED", "Minted"),
+                    ("FAILED", "Failed"),
+                ],
+                db_index=True,
+                default="PENDING",
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("replant", "0038_alter_tree_minting_state"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tree",
+            name="image_content_type",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+    ]
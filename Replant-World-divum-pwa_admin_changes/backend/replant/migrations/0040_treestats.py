@@ -0,0 +1,123 @@
+# Generated by Django 5.0.14 on 2026-10-18 13:09
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def fill_tree_stats(apps, schema_editor):
+    Tree = apps.get_model("replant", "Tree")
+    TreeStats = apps.get_model("replant", "TreeStats")
+
+    rows = (
+        Tree.objects.annotate(day=TruncDate("created_at"))
+        .values(
+            "day",
+            "planting_organization_id",
+            "species_id",
+            "sponsor_id",
+            "review_state",
+            "minting_state",
+        )
+        .annotate(
+            number_of_trees=models.Count("id"),
+            planting_cost_usd=models.Sum("planting_cost_usd"),
+        )
+        .order_by()
+    )
+    TreeStats.objects.bulk_create(
+        (TreeStats(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("replant", "0039_tree_image_content_type"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TreeStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("review_state", models.CharField(max_length=50)),
+                ("minting_state", models.CharField(max_length=50)),
+                ("number_of_trees", models.PositiveIntegerField(default=0)),
+                (
+                    "planting_cost_usd",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=16
+                    ),
+                ),
+                (
+                    "planting_organization",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="replant.plantingorganization",
+                    ),
+                ),
+                (
+                    "species",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="replant.species",
+                    ),
+                ),
+                (
+                    "sponsor",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="replant.sponsor",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "tree stats",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="treestats",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("sponsor__isnull", False)),
+                fields=(
+                    "day",
+                    "planting_organization",
+                    "species",
+                    "sponsor",
+                    "review_state",
+                    "minting_state",
+                ),
+                name="unique_tree_stats_key",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="treestats",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("sponsor__isnull", True)),
+                fields=(
+                    "day",
+                    "planting_organization",
+                    "species",
+                    "review_state",
+                    "minting_state",
+                ),
+                name="unique_tree_stats_key_without_sponsor",
+            ),
+        ),
+        migrations.RunPython(fill_tree_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("replant", "0041_reportjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportjob",
+            name="attempt",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("replant", "0042_reportjob_attempt"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="tree",
+            name="minted_at",
+            field=models.DateTimeField(db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,78 @@
+import logging
+import select
+import time
+
+from django.db import connection
+from django.utils import timezone
+
+import env
+from replant.models import Tree
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "replant_trees_to_mint"
+
+
+def notify_trees_to_mint():
+    """Wake up minting workers after trees were scheduled for minting.
+
+    On PostgreSQL the notification is delivered once the current transaction
+    commits. Other databases are polled by the workers instead.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"NOTIFY {CHANNEL}")
+
+
+def listen_for_trees_to_mint():
+    """Start receiving notifications, call it before looking for trees to mint.
+
+    Otherwise trees scheduled between the look and `wait_for_trees_to_mint` would
+    be noticed only after the timeout.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+
+
+def wait_for_trees_to_mint(timeout: float) -> bool:
+    """Wait until trees are scheduled for minting or the timeout passes.
+
+    Returns if trees were scheduled, waking up early is only a hint though, the
+    trees could've been taken by another worker already.
+    """
+    if connection.vendor == "postgresql":
+        return _wait_for_notification(timeout)
+    return _poll_for_trees_to_mint(timeout)
+
+
+def _wait_for_notification(timeout: float) -> bool:
+    listen_for_trees_to_mint()
+    pg_connection = connection.connection
+    deadline = time.monotonic() + timeout
+    while not pg_connection.notifies:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        select.select([pg_connection], [], [], remaining)
+        pg_connection.poll()
+
+    logger.info(f"Woken up by {len(pg_connection.notifies)} notifications")
+    pg_connection.notifies.clear()
+    return True
+
+
+def _poll_for_trees_to_mint(timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(env.MINT_FOREVER_POLL_INTERVAL_SECONDS, remaining))
+        # Trees leased by other workers aren't work for this one.
+        if (
+            Tree.objects.filter(minting_state=Tree.MintingState.TO_BE_MINTED)
+            .exclude(minting_lease_expires_at__gt=timezone.now())
+            .exists()
+        ):
+            return True
@@ -4,14 +4,19 @@ from .user import User
 
 # isort: on
 from .assigned_species import AssignedSpecies
+from .clustering_run import ClusteringRun
 from .history import History
 from .nft import Nft
+from .nft_id_counter import NftIdCounter
 from .passcode import Passcode
 from .planting_organization import PlantingOrganization
+from .report_job import ReportJob
 from .species import Species
 from .sponsor import Sponsor
 from .tree import Tree
+from .tree_stats import TreeStats
 from .tree_to_mint import TreeToMint
 from .tree_to_review import TreeToReview
 from .trees_cluster import TreesCluster
+from .trees_tile import TreesTile
 from .user_history import UserHistory
@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class ClusteringRunManager(models.Manager["ClusteringRun"]):
+    def get_last_finished(self):
+        return (
+            self.get_queryset()
+            .filter(finished_at__isnull=False)
+            .order_by("-started_at")
+            .first()
+        )
+
+
+class ClusteringRun(models.Model):
+    """Bookkeeping of tree clustering runs.
+
+    `started_at` of the last finished run is the watermark for incremental runs:
+    only trees minted after it need to be added to the clusters.
+    """
+
+    is_incremental = models.BooleanField(default=False)
+    number_of_trees = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True)
+
+    objects: ClusteringRunManager = ClusteringRunManager()
+
+    def __str__(self):
+        return f"{self.started_at} ({'incremental' if self.is_incremental else 'full'})"
@@ -0,0 +1,43 @@
+from django.db import connection, models
+from django.utils import timezone
+
+
+class NftIdCounterManager(models.Manager["NftIdCounter"]):
+    def allocate(self, count: int) -> range:
+        """Reserve `count` consecutive NFT IDs.
+
+        The counter is incremented and read in a single statement, so concurrent
+        callers always get disjoint blocks of IDs. The counter isn't created here,
+        starting it from 0 could reuse IDs of minted NFTs, see `reconcile`.
+        """
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET last_nft_id = last_nft_id + %s"
+                " RETURNING last_nft_id",
+                [count],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            raise self.model.DoesNotExist(
+                "NFT ID counter is missing, it's created by `reconcile_nft_ids`"
+            )
+        (last_nft_id,) = row
+        return range(last_nft_id - count + 1, last_nft_id + 1)
+
+    def reconcile(self, last_nft_id: int):
+        """Make sure IDs up to `last_nft_id` are never allocated."""
+        self.get_or_create()
+        self.update(
+            last_nft_id=models.functions.Greatest("last_nft_id", last_nft_id),
+            reconciled_at=timezone.now(),
+        )
+
+
+class NftIdCounter(models.Model):
+    """The last allocated NFT ID. The table has a single row."""
+
+    last_nft_id = models.PositiveIntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True)
+
+    objects: NftIdCounterManager = NftIdCounterManager()
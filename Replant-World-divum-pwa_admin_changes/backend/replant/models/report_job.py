@@ -0,0 +1,122 @@
+import uuid
+from datetime import timedelta
+from enum import auto
+
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+
+def report_upload_to(model: "ReportJob", filename: str) -> str:
+    return f"reports/{uuid.uuid4().hex}/{filename}"
+
+
+class ReportJobManager(models.Manager["ReportJob"]):
+    def claim_next(self, timeout: timedelta, max_attempts: int) -> "ReportJob | None":
+        """Mark the oldest queued job as running and return it.
+
+        Running jobs not updated for `timeout` are considered abandoned by a dead
+        worker and are claimed again, up to `max_attempts` claims in total. A job
+        abandoned more often likely kills its worker and is failed instead. Every
+        claim is a new attempt, so a worker that was only slow can't overwrite the
+        job, see `ReportJob.save_claimed`.
+        """
+        now = timezone.now()
+        abandoned = Q(state=ReportJob.State.RUNNING, updated_at__lt=now - timeout)
+        with transaction.atomic():
+            self.filter(abandoned, attempt__gte=max_attempts).update(
+                state=ReportJob.State.FAILED,
+                error=f"Generating the report was abandoned {max_attempts} times",
+                finished_at=now,
+                updated_at=now,
+            )
+            job = (
+                self.filter(Q(state=ReportJob.State.QUEUED) | abandoned)
+                .order_by("created_at")
+                .select_for_update(skip_locked=True)
+                .first()
+            )
+            if job:
+                job.state = ReportJob.State.RUNNING
+                job.attempt += 1
+                job.started_at = timezone.now()
+                job.rows_written = 0
+                job.save(
+                    update_fields=[
+                        "state",
+                        "attempt",
+                        "started_at",
+                        "rows_written",
+                        "updated_at",
+                    ]
+                )
+            return job
+
+
+class ReportJob(models.Model):
+    """Report generated in the background by the `run_report_jobs` command."""
+
+    class Kind(models.TextChoices):
+        DASHBOARD = auto()
+        TREES = auto()
+
+    class Format(models.TextChoices):
+        CSV = auto()
+        XLSX = auto()
+
+    class State(models.TextChoices):
+        QUEUED = auto()
+        RUNNING = auto()
+        FINISHED = auto()
+        FAILED = auto()
+
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    format = models.CharField(max_length=8, choices=Format.choices, default=Format.CSV)
+    # Query parameters of the report view the job replaces.
+    params = models.JSONField(default=dict, blank=True)
+    # Images in the report are linked relative to the URL the job was requested at.
+    base_url = models.URLField(max_length=256, blank=True)
+
+    state = models.CharField(
+        max_length=16, choices=State.choices, default=State.QUEUED, db_index=True
+    )
+    # Number of times the job was claimed by a worker.
+    attempt = models.PositiveIntegerField(default=0)
+    rows_written = models.PositiveIntegerField(default=0)
+    total_rows = models.PositiveIntegerField(null=True)
+    file = models.FileField(upload_to=report_upload_to, blank=True)
+    error = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(
+        "replant.User", on_delete=models.CASCADE, related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    objects: ReportJobManager = ReportJobManager()
+
+    def __str__(self):
+        return f"{self.kind} report {self.pk}"
+
+    def save_claimed(self, update_fields: list[str]) -> bool:
+        """Save fields of the job unless it was claimed again by another worker.
+
+        Returns whether the job was saved.
+        """
+        self.updated_at = timezone.now()
+        return bool(
+            ReportJob.objects.filter(pk=self.pk, attempt=self.attempt).update(
+                updated_at=self.updated_at,
+                **{field: getattr(self, field) for field in update_fields},
+            )
+        )
+
+    @property
+    def progress(self) -> float | None:
+        if self.state == ReportJob.State.FINISHED:
+            return 100.0
+        if not self.total_rows:
+            return None
+        return round(min(self.rows_written / self.total_rows, 1) * 100, 2)
@@ -1,21 +1,57 @@
 import uuid
 from enum import auto
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import Count
+from django.db import models, transaction
+from django.db.models import Count, Q, Sum
 from django_fsm import FSMField
 
 from replant.consts import FILEBASE_IPFS_STORAGE_URL, NFT_STORAGE_URL
 
+from .tree_stats import TREE_FIELDS, TreeStats, count_trees, get_tree_row
 from .utils import TrackableModel
 
 if TYPE_CHECKING:
     from .user import User
 
 
-class TreeManager(models.Manager):
+class TreeQuerySet(models.QuerySet["Tree"]):
+    def get_statistics(self) -> dict[str, Any]:
+        """Compute the dashboard metrics of the trees in a single query."""
+        minted = Q(minting_state=Tree.MintingState.MINTED)
+        return self.aggregate(
+            total=Count("id"),
+            pending=Count("id", filter=Q(review_state=Tree.ReviewState.PENDING)),
+            approved=Count("id", filter=Q(review_state=Tree.ReviewState.APPROVED)),
+            rejected=Count("id", filter=Q(review_state=Tree.ReviewState.REJECTED)),
+            sponsored=Count("id", filter=Q(sponsor__isnull=False)),
+            minted=Count("id", filter=minted),
+            minted_cost_usd=Sum("planting_cost_usd", filter=minted),
+        )
+
+    # Changes of the trees are applied to the `TreeStats` rollup, see `Tree.save`.
+
+    def update(self, **kwargs):
+        if TREE_FIELDS.isdisjoint(kwargs):
+            return super().update(**kwargs)
+        with TreeStats.objects.track(self, values=kwargs):
+            return super().update(**kwargs)
+
+    def delete(self):
+        with TreeStats.objects.track(self):
+            return super().delete()
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic():
+            created = super().bulk_create(objs, *args, **kwargs)
+            TreeStats.objects.apply_changes(
+                {}, count_trees(tree for tree in created if tree.pk is not None)
+            )
+        return created
+
+
+class TreeManager(models.Manager.from_queryset(TreeQuerySet)):  # type: ignore[misc]
     def get_review_state_count(self, user: "User"):
         return (
             self.get_queryset()
@@ -45,6 +81,7 @@ class Tree(TrackableModel):
     class MintingState(models.TextChoices):
         PENDING = auto()
         TO_BE_MINTED = auto()
+        SUBMITTED = auto()
         MINTED = auto()
         FAILED = auto()
 
@@ -64,6 +101,8 @@ class Tree(TrackableModel):
     image_cid = models.URLField(
         max_length=128, default="", blank=True, verbose_name="image CID"
     )
+    # Content type of the NFT image, empty for images uploaded as PNGs.
+    image_content_type = models.CharField(max_length=32, default="", blank=True)
     metadata_cid = models.URLField(
         max_length=128, default="", blank=True, verbose_name="metadata CID"
     )
@@ -73,7 +112,7 @@ class Tree(TrackableModel):
 
     latitude = models.DecimalField(max_digits=9, decimal_places=6)
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
-    tile_index = models.PositiveIntegerField(db_index=True)
+    tile_index = models.PositiveBigIntegerField(db_index=True)
     captured_at = models.DateTimeField()
 
     planting_organization = models.ForeignKey(
@@ -102,13 +141,47 @@ class Tree(TrackableModel):
         unique=True, null=True, blank=True, db_index=True, verbose_name="NFT ID"
     )
     nft_mint_tx = models.CharField(max_length=64, default="", blank=True)
-    minted_at = models.DateTimeField(null=True)
+    minted_at = models.DateTimeField(null=True, db_index=True)
+
+    # A minting worker processing the tree holds a lease on it until it's expired.
+    minting_lease_token = models.UUIDField(null=True, blank=True, editable=False)
+    minting_lease_expires_at = models.DateTimeField(
+        null=True, blank=True, editable=False
+    )
 
     objects: TreeManager = TreeManager()
 
     def __str__(self):
         return str(self.pk)
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and TREE_FIELDS.isdisjoint(update_fields):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            # The tree could've been changed by others since it was loaded, its row
+            # in the rollup is taken from the database under a lock.
+            before = None
+            if not self._state.adding:
+                saved = Tree.objects.select_for_update().filter(pk=self.pk).first()
+                before = get_tree_row(saved) if saved else None
+            super().save(*args, **kwargs)
+            # Deferred fields and fields not in `update_fields` aren't saved.
+            after = get_tree_row(self) if update_fields is None else None
+            if after is None:
+                after = get_tree_row(Tree.objects.get(pk=self.pk))
+            assert after
+            if after != before:
+                TreeStats.objects.apply_changes(
+                    {before[0]: (1, before[1])} if before else {},
+                    {after[0]: (1, after[1])},
+                )
+
+    def delete(self, *args, **kwargs):
+        with TreeStats.objects.track(Tree.objects.filter(pk=self.pk)):
+            return super().delete(*args, **kwargs)
+
     @property
     def ipfs_image_url(self) -> str:
         match self.storage_provider:
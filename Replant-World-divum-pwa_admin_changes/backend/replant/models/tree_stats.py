@@ -0,0 +1,297 @@
+import contextlib
+import itertools
+from collections import Counter
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+if TYPE_CHECKING:
+    from .tree import Tree
+
+KEY_FIELDS = (
+    "day",
+    "planting_organization_id",
+    "species_id",
+    "sponsor_id",
+    "review_state",
+    "minting_state",
+)
+
+# Tree fields changing the key or the value of its rollup row.
+TREE_FIELDS = {
+    "created_at",
+    "planting_organization",
+    "planting_organization_id",
+    "species",
+    "species_id",
+    "sponsor",
+    "sponsor_id",
+    "review_state",
+    "minting_state",
+    "planting_cost_usd",
+}
+
+BULK_SIZE = 1000
+
+CENT = Decimal("0.01")
+
+TreeCounts = dict[tuple, tuple[int, Decimal]]
+
+
+def get_tree_counts(trees: "models.QuerySet[Tree]") -> TreeCounts:
+    """Count trees and sum their planting cost per rollup key."""
+    rows = (
+        trees.annotate(day=TruncDate("created_at"))
+        .values(*KEY_FIELDS)
+        .annotate(
+            number_of_trees=Count("id"), planting_cost_usd=Sum("planting_cost_usd")
+        )
+        .order_by()
+    )
+    return {
+        tuple(row[field] for field in KEY_FIELDS): (
+            row["number_of_trees"],
+            row["planting_cost_usd"],
+        )
+        for row in rows
+    }
+
+
+def get_tree_row(tree: "Tree") -> tuple[tuple, Decimal] | None:
+    """Rollup key and planting cost of a tree, from the values of its fields.
+
+    None if a field isn't loaded, it's not queried just for the rollup.
+    """
+    if not TREE_FIELDS.isdisjoint(tree.get_deferred_fields()) or not tree.created_at:
+        return None
+    key = (
+        timezone.localdate(tree.created_at),
+        tree.planting_organization_id,
+        tree.species_id,
+        tree.sponsor_id,
+        tree.review_state,
+        tree.minting_state,
+    )
+    # Rounded as the database rounds it.
+    return key, Decimal(str(tree.planting_cost_usd)).quantize(CENT)
+
+
+def count_trees(trees: Iterable["Tree"]) -> TreeCounts:
+    """Same as `get_tree_counts`, from the values of fields of the trees."""
+    counts: TreeCounts = {}
+    for tree in trees:
+        row = get_tree_row(tree)
+        assert row
+        _add_count(counts, row[0], 1, row[1])
+    return counts
+
+
+def _get_updated_counts(counts: TreeCounts, values: dict[str, Any]) -> TreeCounts:
+    """Counts of trees after their fields were updated with the values."""
+    updated: TreeCounts = {}
+    for key, (number_of_trees, planting_cost_usd) in counts.items():
+        row = dict(zip(KEY_FIELDS, key))
+        for field, value in values.items():
+            if isinstance(value, models.Model):
+                value = value.pk
+            if field == "created_at":
+                row["day"] = timezone.localdate(value)
+            elif field == "planting_cost_usd":
+                planting_cost_usd = number_of_trees * Decimal(str(value)).quantize(CENT)
+            elif field in TREE_FIELDS:
+                row[field if field in KEY_FIELDS else f"{field}_id"] = value
+        _add_count(
+            updated,
+            tuple(row[field] for field in KEY_FIELDS),
+            number_of_trees,
+            planting_cost_usd,
+        )
+    return updated
+
+
+def _get_counts_by_ids(trees: "models.QuerySet[Tree]", tree_ids: list) -> TreeCounts:
+    counts: TreeCounts = {}
+    for batch in itertools.batched(tree_ids, BULK_SIZE):
+        batch_counts = get_tree_counts(trees.model.objects.filter(id__in=batch))
+        for key, (number_of_trees, planting_cost_usd) in batch_counts.items():
+            _add_count(counts, key, number_of_trees, planting_cost_usd)
+    return counts
+
+
+def _add_count(
+    counts: TreeCounts, key: tuple, number_of_trees: int, planting_cost_usd: Decimal
+):
+    counted_trees, counted_cost = counts.get(key, (0, Decimal(0)))
+    counts[key] = (counted_trees + number_of_trees, counted_cost + planting_cost_usd)
+
+
+def _sort_key(key: tuple) -> tuple:
+    # Trees without a sponsor have None in the key.
+    return tuple((value is not None, value) for value in key)
+
+
+class TreeStatsQuerySet(models.QuerySet["TreeStats"]):
+    def get_statistics(self) -> dict[str, Any]:
+        """Same metrics as `TreeQuerySet.get_statistics`, read from the rollup."""
+
+        def count(condition: Q | None = None):
+            return Coalesce(Sum("number_of_trees", filter=condition), 0)
+
+        minted = Q(minting_state="MINTED")
+        return self.aggregate(
+            total=count(),
+            pending=count(Q(review_state="PENDING")),
+            approved=count(Q(review_state="APPROVED")),
+            rejected=count(Q(review_state="REJECTED")),
+            sponsored=count(Q(sponsor__isnull=False)),
+            minted=count(minted),
+            minted_cost_usd=Sum("planting_cost_usd", filter=minted),
+        )
+
+
+class TreeStatsManager(models.Manager.from_queryset(TreeStatsQuerySet)):  # type: ignore[misc]
+    def rebuild(self):
+        from .tree import Tree  # Circular import.
+
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                (
+                    TreeStats(
+                        **dict(zip(KEY_FIELDS, key)),
+                        number_of_trees=number_of_trees,
+                        planting_cost_usd=planting_cost_usd,
+                    )
+                    for key, (number_of_trees, planting_cost_usd) in get_tree_counts(
+                        Tree.objects.all()
+                    ).items()
+                ),
+                batch_size=BULK_SIZE,
+            )
+
+    @contextlib.contextmanager
+    def track(
+        self, trees: "models.QuerySet[Tree]", values: dict[str, Any] | None = None
+    ) -> Iterator[None]:
+        """Apply changes of the trees made inside the block to the rollup.
+
+        The trees are deleted inside the block, or updated with `values`. They're
+        counted by their queryset, as IDs of many trees would be too many query
+        parameters, and the counts after an update are made from the counts before
+        it. Only trees updated by expressions are counted again, by batches of IDs.
+        """
+        with transaction.atomic():
+            before = get_tree_counts(trees)
+            if values is not None and any(
+                hasattr(value, "resolve_expression")
+                for field, value in values.items()
+                if field in TREE_FIELDS
+            ):
+                tree_ids = list(trees.values_list("id", flat=True))
+                yield
+                after = _get_counts_by_ids(trees, tree_ids)
+            else:
+                yield
+                after = {} if values is None else _get_updated_counts(before, values)
+            self.apply_changes(before, after)
+
+    def apply_changes(self, before: TreeCounts, after: TreeCounts):
+        changes: Counter[tuple] = Counter()
+        costs: Counter[tuple] = Counter()
+        for sign, counts in ((-1, before), (1, after)):
+            for key, (number_of_trees, planting_cost_usd) in counts.items():
+                changes[key] += sign * number_of_trees
+                costs[key] += sign * planting_cost_usd
+
+        # Rows are always updated in the same order, so concurrent transactions
+        # wait for each other instead of deadlocking.
+        for key in sorted(changes.keys() | costs.keys(), key=_sort_key):
+            if changes[key] or costs[key]:
+                self._add(key, changes[key], costs[key])
+
+    def _add(self, key: tuple, number_of_trees: int, planting_cost_usd: Decimal):
+        rows = self.filter(**dict(zip(KEY_FIELDS, key)))
+        values = {
+            "number_of_trees": F("number_of_trees") + number_of_trees,
+            "planting_cost_usd": F("planting_cost_usd") + planting_cost_usd,
+        }
+        if not rows.update(**values):
+            if number_of_trees < 0:
+                raise self.model.DoesNotExist(
+                    f"Tree stats row {key} is missing, they're rebuilt by "
+                    "`rebuild_tree_stats`"
+                )
+            try:
+                with transaction.atomic():
+                    self.create(
+                        **dict(zip(KEY_FIELDS, key)),
+                        number_of_trees=number_of_trees,
+                        planting_cost_usd=planting_cost_usd,
+                    )
+            except IntegrityError:
+                # A new row has no negative number of trees, only the unique
+                # constraints can fail. The row was created concurrently.
+                rows.update(**values)
+        if number_of_trees < 0:
+            rows.filter(number_of_trees=0).delete()
+
+
+class TreeStats(models.Model):
+    """Number of trees and their planting cost per day and state, see `TreeQuerySet`.
+
+    Rows are kept up to date by the `Tree` model and queryset, changes made by raw
+    SQL are only picked up by the `rebuild_tree_stats` command.
+    """
+
+    class Meta:
+        verbose_name_plural = "tree stats"
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "day",
+                    "planting_organization",
+                    "species",
+                    "sponsor",
+                    "review_state",
+                    "minting_state",
+                ],
+                condition=Q(sponsor__isnull=False),
+                name="unique_tree_stats_key",
+            ),
+            # NULLs are distinct in unique constraints, trees without a sponsor
+            # need their own constraint.
+            models.UniqueConstraint(
+                fields=[
+                    "day",
+                    "planting_organization",
+                    "species",
+                    "review_state",
+                    "minting_state",
+                ],
+                condition=Q(sponsor__isnull=True),
+                name="unique_tree_stats_key_without_sponsor",
+            ),
+        ]
+
+    day = models.DateField()
+    planting_organization = models.ForeignKey(
+        "replant.PlantingOrganization", on_delete=models.CASCADE, related_name="+"
+    )
+    species = models.ForeignKey(
+        "replant.Species", on_delete=models.CASCADE, related_name="+"
+    )
+    sponsor = models.ForeignKey(
+        "replant.Sponsor", null=True, on_delete=models.CASCADE, related_name="+"
+    )
+    review_state = models.CharField(max_length=50)
+    minting_state = models.CharField(max_length=50)
+    number_of_trees = models.PositiveIntegerField(default=0)
+    planting_cost_usd = models.DecimalField(
+        max_digits=16, decimal_places=2, default=Decimal("0.00")
+    )
+
+    objects: TreeStatsManager = TreeStatsManager()
@@ -8,7 +8,9 @@ class TreeToMintManager(models.Manager):
         return Tree.objects.filter(
             sponsor__isnull=False,
             review_state=Tree.ReviewState.APPROVED,
-        ).exclude(minting_state=Tree.MintingState.MINTED)
+        ).exclude(
+            minting_state__in=[Tree.MintingState.SUBMITTED, Tree.MintingState.MINTED]
+        )
 
 
 class TreeToMint(Tree):
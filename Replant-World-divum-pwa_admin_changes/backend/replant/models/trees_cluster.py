@@ -4,11 +4,11 @@ from django.db import models
 class TreesCluster(models.Model):
     class Meta:
         indexes = [
-            models.Index(fields=["tile_index", "zoom"]),
+            models.Index(fields=["zoom", "tile_index"]),
         ]
 
     longitude = models.FloatField()
     latitude = models.FloatField()
     zoom = models.PositiveIntegerField()
-    tile_index = models.PositiveIntegerField()
+    tile_index = models.PositiveBigIntegerField()
     number_of_trees = models.PositiveIntegerField()
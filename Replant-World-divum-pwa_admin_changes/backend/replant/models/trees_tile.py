@@ -0,0 +1,26 @@
+from enum import auto
+
+from django.db import models
+
+
+class TreesTile(models.Model):
+    """Precomputed binary tile of the trees map, see `replant.tree_tiles`."""
+
+    class Kind(models.TextChoices):
+        CLUSTERS = auto()
+        POINTS = auto()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "zoom", "tile_index"],
+                name="unique_trees_tile_kind_zoom_tile_index",
+            )
+        ]
+
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    zoom = models.PositiveIntegerField()
+    tile_index = models.PositiveBigIntegerField()
+    data = models.BinaryField()
+    etag = models.CharField(max_length=32)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -1,21 +1,35 @@
+import functools
 import io
 import itertools
 import json
 import logging
-import time
+import multiprocessing
 import traceback
+import uuid
+from concurrent import futures
+from datetime import timedelta
 from typing import Callable, Sequence, TypeVar
 
+from cosmpy.aerial.client import SubmittedTx
 from cosmpy.aerial.exceptions import BroadcastError
 from cosmpy.aerial.wallet import LocalWallet
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.db import models, transaction
 from django.utils import timezone
-from PIL import Image
 
 import env
-from replant.integrations import filebase
-from replant.models import History, Species, Tree
-from replant.sdk import CW721Client, MintInfo, get_sei_client
+from replant import mint_notifications, nft_images
+from replant.integrations import filebase, ipfs_car
+from replant.models import History, NftIdCounter, Species, Tree
+from replant.sdk import (
+    CW721Client,
+    MintInfo,
+    get_sei_client,
+    is_out_of_gas,
+    is_sequence_mismatch,
+    tx_receipts,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -26,95 +40,349 @@ FILE_UPLOAD_BATCH_SIZE = 100
 
 MINT_BATCH_SIZE = 500
 
-THUMBNAIL_SIZE = (512, 1024)
+# Cache of NFT images in the default storage.
+NFT_IMAGES_DIR = "nft-images"
+
+NFT_IMAGE_FORMAT = nft_images.ImageFormat(
+    name=env.NFT_IMAGE_FORMAT,
+    quality=env.NFT_IMAGE_QUALITY,
+    max_bytes=env.NFT_IMAGE_MAX_BYTES,
+)
 
 client = get_sei_client(env.SEI_CHAIN_ID, env.SEI_RPC)
-cw721 = CW721Client(client, env.SEI_NFT_ADDRESS)
+cw721 = CW721Client(
+    client,
+    env.SEI_NFT_ADDRESS,
+    gas_per_token=env.SEI_MINT_GAS_PER_TOKEN,
+    base_gas=env.SEI_MINT_BASE_GAS,
+)
 admin = LocalWallet.from_mnemonic(env.SEI_ADMIN_MNEMONIC, "sei")
 
 
 SIZE_PER_ROUND = 50
 
 
-@transaction.atomic
-def mint_scheduled_nfts():
+class UploadError(Exception):
+    """Uploading files of some trees failed, files of the other trees were uploaded."""
+
+    def __init__(self, errors: dict[Tree, Exception]):
+        super().__init__(
+            "\n".join(f"Tree {tree.id}: {err!r}" for tree, err in errors.items())
+        )
+        self.trees = list(errors)
+
+
+def mint_scheduled_nfts() -> bool:
+    """Mint all trees scheduled for minting and return if there were any.
+
+    A tree to be minted goes through stages given by what it already has: NFT ID
+    generation, image upload, metadata upload and minting. Every stage claims its
+    own round of trees from the database, so no transaction is open during network
+    I/O and a tree continues from the stage it stopped at. Minting of a round runs
+    in a background thread while the next round is being prepared, so the uploads
+    overlap with waiting for the chain.
+
+    Claimed trees are leased to the caller, so any number of minting processes can
+    run at once. Leases of a process that died expire and the trees are claimed
+    again.
+    """
     logger.info("📦 Mint scheduled NFTs function called")
-    trees = list(
+    found_work = False
+    with (
+        futures.ThreadPoolExecutor(max_workers=1) as minter,
+        _make_image_pool() as image_pool,
+    ):
+        while True:
+            trees_to_mint = _claim_trees(
+                size=_get_mint_batch_size(), metadata_cid__gt=""
+            )
+            minting = minter.submit(_mint_round, trees_to_mint)
+
+            prepared = _prepare_round(image_pool)
+
+            # Only the broadcasting runs in the background, the results are saved
+            # here so that the database is used from this thread only.
+            _save_minting_results(minting.result())
+            _release_trees(trees_to_mint)
+
+            if not trees_to_mint and not prepared:
+                return found_work
+            found_work = True
+
+
+def _claim_trees(size: int = SIZE_PER_ROUND, **filters) -> list[Tree]:
+    """Lease a round of trees to be minted that are in the stage given by filters.
+
+    Trees leased by another process are skipped until the lease expires, which must
+    be long enough for a stage to process its round. Rows are locked only while
+    claiming, so claims of concurrent processes don't wait for each other.
+    """
+    now = timezone.now()
+    token = uuid.uuid4()
+    with transaction.atomic():
+        trees = list(
+            Tree.objects.filter(minting_state=Tree.MintingState.TO_BE_MINTED, **filters)
+            .filter(
+                models.Q(minting_lease_expires_at__isnull=True)
+                | models.Q(minting_lease_expires_at__lte=now)
+            )
+            .select_related(
+                "species",
+                "planting_organization",
+                "country",
+                "created_by",
+                "sponsor",
+            )
+            .select_for_update(skip_locked=True, of=("self",))
+            .order_by("id")[:size]
+        )
+        for tree in trees:
+            tree.minting_lease_token = token
+            tree.minting_lease_expires_at = now + timedelta(
+                seconds=env.MINT_LEASE_SECONDS
+            )
+        Tree.objects.bulk_update(
+            trees, ["minting_lease_token", "minting_lease_expires_at"]
+        )
+    return trees
+
+
+def _release_trees(trees: Sequence[Tree]):
+    """Release leases of trees, so the next stage can claim them right away.
+
+    A lease that expired and was taken by another process is left alone.
+    """
+    tokens = {tree.minting_lease_token for tree in trees}
+    Tree.objects.filter(
+        id__in=[tree.id for tree in trees], minting_lease_token__in=tokens
+    ).update(minting_lease_token=None, minting_lease_expires_at=None)
+
+
+def _lock_leased(trees: Sequence[Tree]) -> list[Tree]:
+    """Lock and return the trees whose lease the caller still holds.
+
+    A lease can expire while a stage runs and the tree be claimed by another
+    process, whose state mustn't be overwritten. Writes after claiming go only to
+    the returned trees, in the transaction the locks were taken in.
+    """
+    leased_ids = set(
         Tree.objects.filter(
-            minting_state=Tree.MintingState.TO_BE_MINTED
-        ).select_related(
-            "species",
-            "planting_organization",
-            "country",
-            "created_by",
-            "sponsor",
-        )[
-            :SIZE_PER_ROUND
-        ]
+            id__in=[tree.pk for tree in trees],
+            minting_lease_token__in={tree.minting_lease_token for tree in trees},
+            minting_lease_expires_at__gt=timezone.now(),
+        )
+        .select_for_update()
+        .values_list("id", flat=True)
     )
+    lost_ids = [tree.pk for tree in trees if tree.pk not in leased_ids]
+    if lost_ids:
+        logger.warning(f"Lease of trees {lost_ids} expired, not saving their changes")
+    return [tree for tree in trees if tree.pk in leased_ids]
 
-    if len(trees) == 0:
-        return
-
-    logger.info(f"Found {len(trees)} NFTs to be minted")
 
+def _prepare_round(image_pool: futures.Executor) -> bool:
+    """Run a round of the stages before minting and return if there was any work."""
+    trees_no_nft_id = _claim_trees(nft_id__isnull=True)
+    logger.info(f"{len(trees_no_nft_id)} NFTs need ID")
     _batch_operation(
         action="Generating NFT IDs",
         func=_generate_nft_id,
-        trees_to_batch=trees,
-        all_trees=trees,
+        trees_to_batch=trees_no_nft_id,
         batch_size=GENERATE_ID_BATCH_SIZE,
     )
+    _release_trees(trees_no_nft_id)
 
-    # Upload images.
-    trees_no_image_cid = [tree for tree in trees if not tree.image_cid]
+    trees_no_image_cid = _claim_trees(nft_id__isnull=False, image_cid="")
     logger.info(f"{len(trees_no_image_cid)} NFTs need image upload")
     _batch_operation(
         action="Uploading images",
-        func=_upload_images,
+        func=functools.partial(_upload_images, pool=image_pool),
         trees_to_batch=trees_no_image_cid,
-        all_trees=trees,
         batch_size=FILE_UPLOAD_BATCH_SIZE,
     )
+    _release_trees(trees_no_image_cid)
 
-    # Upload metadata.
-    trees_no_metadata_cid = [tree for tree in trees if not tree.metadata_cid]
+    trees_no_metadata_cid = _claim_trees(image_cid__gt="", metadata_cid="")
     logger.info(f"{len(trees_no_metadata_cid)} NFTs need metadata upload")
     _batch_operation(
         action="Uploading metadata",
         func=_upload_metadatas,
         trees_to_batch=trees_no_metadata_cid,
-        all_trees=trees,
         batch_size=FILE_UPLOAD_BATCH_SIZE,
     )
+    _release_trees(trees_no_metadata_cid)
+
+    return bool(trees_no_nft_id or trees_no_image_cid or trees_no_metadata_cid)
+
+
+MintResult = tuple[str, Sequence[Tree], SubmittedTx | Exception]
+
 
-    # Mint tokens.
+def _mint_round(trees: Sequence[Tree]) -> list[MintResult]:
     logger.info(f"{len(trees)} NFTs need minting")
+    results: list[MintResult] = []
     sorted_trees = sorted(trees, key=lambda tree: tree.sponsor.id)
     trees_by_sponsor = itertools.groupby(sorted_trees, lambda tree: tree.sponsor)
     for sponsor, sponsor_trees in trees_by_sponsor:
-        for tx, minted_trees in _batch_operation(
-            action=f"Minting for sponsor {sponsor.name}",
-            func=_mint_nfts,
-            trees_to_batch=list(sponsor_trees),
-            batch_size=MINT_BATCH_SIZE,
-        ):
-            minted_tree_ids = [tree.id for tree in minted_trees]
-            minted_nft_ids = [tree.nft_id for tree in minted_trees]
-            details = [
-                f"TX: {tx}",
-                "\nMinted tree IDs:",
-                str(minted_tree_ids),
-                "\nMinted NFT IDs:",
-                str(minted_nft_ids),
-            ]
-            History.objects.create(
-                event_type=History.EventType.MINTING_SUCCEED,
-                message=f"Minted {len(minted_trees)} NFTs",
-                details="\n".join(details),
+        action = f"Minting for sponsor {sponsor.name}"
+        for batch in itertools.batched(sponsor_trees, _get_mint_batch_size()):
+            results.extend(_mint_batch(action, batch))
+    return results
+
+
+def _get_mint_batch_size() -> int:
+    """Most trees to mint by one transaction, so that it fits in a block.
+
+    Until the gas per token is simulated by the first transaction of more tokens,
+    batches are kept at the size of a round.
+    """
+    max_tokens = cw721.max_multi_mint_tokens(env.SEI_BLOCK_GAS_LIMIT)
+    if max_tokens is None:
+        return SIZE_PER_ROUND
+    return min(max_tokens, MINT_BATCH_SIZE)
+
+
+def _mint_batch(action: str, trees: Sequence[Tree]) -> list[MintResult]:
+    """Mint trees by one transaction, halving the batch if the chain rejects it.
+
+    Halving isolates trees that can't be minted, and fits batches whose gas was
+    underestimated.
+    """
+    try:
+        return [(action, trees, _mint_nfts(trees))]
+    except BroadcastError as err:
+        if len(trees) == 1 or is_sequence_mismatch(err):
+            logger.exception(err)
+            return [(action, trees, err)]
+        logger.warning(f"{action}: {len(trees)} NFTs rejected, splitting ({err})")
+        middle = len(trees) // 2
+        return _mint_batch(action, trees[:middle]) + _mint_batch(action, trees[middle:])
+    except Exception as err:
+        logger.exception(err)
+        return [(action, trees, err)]
+
+
+def _save_minting_results(results: list[MintResult]):
+    for action, minted_trees, tx in results:
+        if isinstance(tx, Exception):
+            _mark_failed(action, minted_trees, tx)
+            continue
+
+        # Minting is finished by `confirm_submitted_nfts` once the TX is in a block,
+        # until then `minted_at` is the time the TX was submitted.
+        with transaction.atomic():
+            leased = _lock_leased(minted_trees)
+            Tree.objects.filter(id__in=[tree.pk for tree in leased]).update(
+                minting_state=Tree.MintingState.SUBMITTED,
+                nft_mint_tx=tx.tx_hash,
+                minted_at=timezone.now(),
             )
 
 
+def confirm_submitted_nfts() -> int:
+    """Finish minting of trees whose transactions were included in a block.
+
+    Receipts of all the submitted transactions are queried concurrently, a
+    transaction not found until `MINT_RECEIPT_TIMEOUT_SECONDS` after it was
+    submitted is considered dropped. Returns the number of transactions still
+    pending.
+    """
+    submitted_txs = dict(
+        Tree.objects.filter(minting_state=Tree.MintingState.SUBMITTED)
+        .values_list("nft_mint_tx")
+        .annotate(models.Min("minted_at"))
+    )
+    if not submitted_txs:
+        return 0
+
+    receipts = tx_receipts.get_tx_receipts(
+        tx_receipts.get_rest_url(env.SEI_RPC), submitted_txs
+    )
+    timed_out_before = timezone.now() - timedelta(
+        seconds=env.MINT_RECEIPT_TIMEOUT_SECONDS
+    )
+    pending = 0
+    for tx_hash, submitted_at in submitted_txs.items():
+        if tx_hash not in receipts:
+            # Querying the transaction failed, it's tried again next time.
+            pending += 1
+            continue
+        receipt = receipts[tx_hash]
+        if receipt is None and submitted_at >= timed_out_before:
+            pending += 1
+            continue
+        _save_tx_receipt(tx_hash, receipt)
+    return pending
+
+
+@transaction.atomic
+def _save_tx_receipt(tx_hash: str, receipt: tx_receipts.TxReceipt | None):
+    # Filtering by the state makes it safe for more workers to save the receipt.
+    trees = list(
+        Tree.objects.filter(
+            minting_state=Tree.MintingState.SUBMITTED, nft_mint_tx=tx_hash
+        )
+        .select_related("sponsor")
+        .select_for_update(of=("self",))
+    )
+    if not trees:
+        return
+
+    action = f"Minting for sponsor {trees[0].sponsor.name}"
+    # Submitted trees aren't leased, they're locked above.
+    if receipt is None:
+        _save_failure(
+            action, trees, TimeoutError(f"TX {tx_hash} wasn't included in a block")
+        )
+        return
+    if not receipt.succeeded:
+        error = BroadcastError(tx_hash, receipt.raw_log)
+        if is_out_of_gas(error) and receipt.gas_wanted < env.SEI_BLOCK_GAS_LIMIT:
+            _reschedule_out_of_gas(trees, receipt)
+            return
+        _save_failure(action, trees, error)
+        return
+
+    tree_ids = [tree.pk for tree in trees]
+    # Incremental clustering picks up trees by the time they became minted.
+    Tree.objects.filter(id__in=tree_ids).update(
+        minting_state=Tree.MintingState.MINTED, minted_at=timezone.now()
+    )
+
+    minted_nft_ids = [tree.nft_id for tree in trees]
+    details = [
+        f"TX: {tx_hash}",
+        "\nMinted tree IDs:",
+        str(tree_ids),
+        "\nMinted NFT IDs:",
+        str(minted_nft_ids),
+    ]
+    History.objects.create(
+        event_type=History.EventType.MINTING_SUCCEED,
+        message=f"Minted {len(trees)} NFTs",
+        details="\n".join(details),
+    )
+
+
+def _reschedule_out_of_gas(trees: Sequence[Tree], receipt: tx_receipts.TxReceipt):
+    """Schedule trees whose transaction ran out of gas to be minted again.
+
+    A broadcast only checks a transaction before it's executed, running out of gas
+    shows up in its receipt. The gas estimate is raised, so the trees are minted
+    with more gas and batches limited by the block gas get smaller. A transaction
+    with the gas of a whole block can't get more, its trees fail.
+    """
+    logger.warning(
+        f"TX {receipt.tx_hash} ran out of gas ({receipt.gas_used} / "
+        f"{receipt.gas_wanted}), minting {len(trees)} NFTs again"
+    )
+    cw721.raise_gas_estimate(receipt.gas_wanted, receipt.gas_used)
+    Tree.objects.filter(id__in=[tree.pk for tree in trees]).update(
+        minting_state=Tree.MintingState.TO_BE_MINTED, nft_mint_tx="", minted_at=None
+    )
+    mint_notifications.notify_trees_to_mint()
+
+
 T = TypeVar("T")
 
 
@@ -137,108 +405,218 @@ def _batch_operation(
             result.append(func(trees_page))
         except Exception as err:
             logger.exception(err)
-            tree_ids = [p.id for p in trees_page]
-            Tree.objects.filter(id__in=tree_ids).update(
-                minting_state=Tree.MintingState.FAILED
-            )
-            message = f"{action} ({len(trees_page)} trees)"
-            if isinstance(err, BroadcastError):
-                message += " (out of gas?)"
-            History.objects.create(
-                event_type=History.EventType.MINTING_FAILED,
-                message=message,
-                details=f"Tree IDs:\n{tree_ids}\n\n{traceback.format_exc()}",
-            )
+            # Only some of the trees failed, the others can be processed further.
+            failed_trees = err.trees if isinstance(err, UploadError) else trees_page
+            _mark_failed(action, failed_trees, err)
             if all_trees:
                 # Exclude failed trees from further processing.
-                for tree in trees_page:
+                for tree in failed_trees:
                     all_trees.remove(tree)
     return result
 
 
-def _generate_nft_id(trees: Sequence[Tree]):
-    # Find the next available NFT ID by checking actual blockchain state
+def _mark_failed(action: str, trees: Sequence[Tree], err: Exception):
+    """Mark trees leased by the caller as failed."""
+    with transaction.atomic():
+        _save_failure(action, _lock_leased(trees), err)
+
+
+def _save_failure(action: str, trees: Sequence[Tree], err: Exception):
+    if not trees:
+        return
+    tree_ids = [p.id for p in trees]
+    Tree.objects.filter(id__in=tree_ids).update(minting_state=Tree.MintingState.FAILED)
+    message = f"{action} ({len(trees)} trees)"
+    if is_out_of_gas(err):
+        message += " (out of gas)"
+    elif isinstance(err, BroadcastError):
+        message += f": {err}"
+    History.objects.create(
+        event_type=History.EventType.MINTING_FAILED,
+        message=message,
+        details=f"Tree IDs:\n{tree_ids}\n\n{''.join(traceback.format_exception(err))}",
+    )
+
+
+def reconcile_nft_ids():
+    """Make sure NFT IDs used in the database or on chain are never allocated again.
+
+    Run once when a minting process starts, tokens could've been minted with IDs
+    that aren't in the database (e.g. after the database was restored).
+    """
+    last_id_in_db = Tree.objects.aggregate(models.Max("nft_id"))["nft_id__max"] or 0
     try:
-        # Check a wide range to find the highest existing NFT ID
+        highest_nft_id = _get_highest_nft_id_on_chain(known_nft_id=last_id_in_db)
+    except Exception as e:
+        logger.warning(
+            f"Could not query blockchain for NFT IDs, using database only: {e}"
+        )
         highest_nft_id = 0
 
-        # Check ranges where NFTs might exist
-        ranges_to_check = [range(1, 100), range(100, 200)]
+    logger.info(
+        f"NFT ID reconciliation: highest_on_chain={highest_nft_id}, "
+        f"db={last_id_in_db}"
+    )
+    NftIdCounter.objects.reconcile(max(highest_nft_id, last_id_in_db))
 
-        for nft_range in ranges_to_check:
-            found_any = False
-            for nft_id in nft_range:
-                try:
-                    cw721.contract.query({'nft_info': {'token_id': str(nft_id)}})
-                    highest_nft_id = max(highest_nft_id, nft_id)
-                    found_any = True
-                except:
-                    continue  # NFT doesn't exist, continue checking
 
-            # If no NFTs found in this range, stop checking higher ranges
-            if not found_any:
-                break
+def _get_highest_nft_id_on_chain(known_nft_id: int) -> int:
+    # IDs are allocated sequentially, so the tokens above the known ID are searched
+    # for with exponentially growing steps and then bisection, in O(log n) queries.
+    low = max(known_nft_id, cw721.num_tokens())
+    step = 1
+    while cw721.token_exists(str(low + step)):
+        low += step
+        step *= 2
 
-        # Also check database to avoid conflicts
-        last_id_in_db = Tree.objects.aggregate(models.Max("nft_id"))["nft_id__max"] or 0
+    high = low + step
+    while high - low > 1:
+        middle = (low + high) // 2
+        if cw721.token_exists(str(middle)):
+            low = middle
+        else:
+            high = middle
+    return low
 
-        # Use the maximum of both to ensure no conflicts
-        last_id = max(highest_nft_id, last_id_in_db)
 
-        logger.info(f"NFT ID generation: highest_on_chain={highest_nft_id}, db={last_id_in_db}, using={last_id}")
+def _generate_nft_id(trees: Sequence[Tree]):
+    to_update = [tree for tree in trees if not tree.nft_id]
+    if not to_update:
+        return
 
-    except Exception as e:
-        logger.warning(f"Could not query blockchain for NFT IDs, using database only: {e}")
-        last_id = Tree.objects.aggregate(models.Max("nft_id"))["nft_id__max"] or 0
+    for tree, nft_id in zip(to_update, NftIdCounter.objects.allocate(len(to_update))):
+        tree.nft_id = nft_id
 
-    to_update: list[Tree] = []
-    for tree in trees:
-        if tree.nft_id:
-            continue
-        last_id += 1
-        tree.nft_id = last_id
-        to_update.append(tree)
+    # IDs allocated to trees whose lease expired are left unused.
+    with transaction.atomic():
+        Tree.objects.bulk_update(_lock_leased(to_update), ["nft_id"])
 
-    Tree.objects.bulk_update(to_update, ["nft_id"])
 
+def _make_image_pool() -> futures.ProcessPoolExecutor:
+    """Pool of processes making NFT images, to be shared by all upload batches.
+
+    Images are made in processes while the upload threads wait for the network.
+    The processes are spawned, forking a process running threads isn't safe, and
+    every spawned process imports Django and Pillow again, so they're reused.
+    """
+    return futures.ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
 
-def _upload_images(trees: Sequence[Tree]) -> None:
-    for tree in trees:
-        assert tree.nft_id
-        assert tree.image.file
-        original_stream = io.BytesIO(tree.image.file.read())
-        image = Image.open(original_stream)
-        image.thumbnail(THUMBNAIL_SIZE)
-
-        stream = io.BytesIO()
-        image.save(stream, "PNG")
-        stream.seek(0)
-
-        # TODO: Make it async to speed up the process.
-        uploaded_file_summary = filebase.upload_file(
-            dto=filebase.FileDto(
-                file_name=f"{tree.nft_id}.png",
-                content=stream,
-            )
-        )
-        tree.image_cid = uploaded_file_summary.cid
 
-    Tree.objects.bulk_update(trees, ["image_cid"])
+def _upload_images(trees: Sequence[Tree], pool: futures.Executor) -> None:
+    _upload_files(
+        trees,
+        get_file=functools.partial(_get_nft_image, pool=pool),
+        cid_field="image_cid",
+        update_fields=["image_content_type"],
+    )
+
+
+def _get_nft_image(tree: Tree, pool: futures.Executor) -> filebase.FileDto:
+    """Make the NFT image of a tree, or take it from the cache if it was made before.
+
+    Images are cached by the content of the tree image, so retried uploads don't
+    decode the same image again.
+    """
+    assert tree.nft_id
+    with tree.image.open("rb") as file:
+        source = file.read()
+
+    image_name = nft_images.get_nft_image_name(source, NFT_IMAGE_FORMAT)
+    cached_name = f"{NFT_IMAGES_DIR}/{image_name}"
+    if default_storage.exists(cached_name):
+        with default_storage.open(cached_name, "rb") as cached:
+            content = cached.read()
+    else:
+        content = pool.submit(
+            nft_images.make_nft_image, source, NFT_IMAGE_FORMAT
+        ).result()
+        default_storage.save(cached_name, ContentFile(content))
+
+    tree.image_content_type = NFT_IMAGE_FORMAT.content_type
+    return filebase.FileDto(
+        file_name=f"{tree.nft_id}.{NFT_IMAGE_FORMAT.extension}",
+        content=io.BytesIO(content),
+    )
 
 
 def _upload_metadatas(trees: Sequence[Tree]):
+    # Metadata are built upfront as they need related objects from the database.
+    contents: dict[Tree, bytes] = {}
     for tree in trees:
         assert tree.nft_id
-        metadata = _get_nft_metadata(tree)
-        stream = io.BytesIO(json.dumps(metadata).encode())
+        contents[tree] = json.dumps(_get_nft_metadata(tree)).encode()
 
-        # TODO: Make it async to speed up the process.
-        uploaded_file_summary = filebase.upload_file(
-            dto=filebase.FileDto(file_name=f"{tree.nft_id}.json", content=stream),
+    if env.NFT_METADATA_AS_DIRECTORY:
+        _upload_metadata_directory(contents)
+        return
+
+    _upload_files(
+        trees,
+        get_file=lambda tree: filebase.FileDto(
+            file_name=f"{tree.nft_id}.json", content=io.BytesIO(contents[tree])
+        ),
+        cid_field="metadata_cid",
+    )
+
+
+def _upload_metadata_directory(contents: dict[Tree, bytes]):
+    """Upload and pin metadata of trees at once, as files of an IPFS directory.
+
+    The metadata CID of a tree is then the path of its file, `<dirCID>/<nft_id>.json`.
+    """
+    file_names = {tree: f"{tree.nft_id}.json" for tree in contents}
+    directory_cid, car = ipfs_car.make_directory_car(
+        {file_names[tree]: content for tree, content in contents.items()}
+    )
+    uploaded = filebase.upload_file(
+        dto=filebase.FileDto(
+            file_name=f"{directory_cid}.car",
+            content=io.BytesIO(car),
+            metadata={"import": "car"},
         )
-        tree.metadata_cid = uploaded_file_summary.cid
+    )
 
-    Tree.objects.bulk_update(trees, ["metadata_cid"])
+    for tree in contents:
+        tree.metadata_cid = f"{uploaded.cid}/{file_names[tree]}"
+    with transaction.atomic():
+        Tree.objects.bulk_update(_lock_leased(list(contents)), ["metadata_cid"])
+
+
+def _upload_files(
+    trees: Sequence[Tree],
+    get_file: Callable[[Tree], filebase.FileDto],
+    cid_field: str,
+    update_fields: Sequence[str] = (),
+):
+    """Upload a file of each tree concurrently and save the CIDs.
+
+    `get_file` runs in the upload threads, so it must not query the database, it
+    can set `update_fields` of the tree which are saved with the CID. CIDs of the
+    uploaded files are saved even if some uploads fail, the trees whose upload
+    failed are then reported with `UploadError`.
+    """
+
+    def upload(tree: Tree) -> filebase.UploadedFileSummary:
+        return filebase.upload_file(dto=get_file(tree))
+
+    uploaded: list[Tree] = []
+    errors: dict[Tree, Exception] = {}
+    with futures.ThreadPoolExecutor(
+        max_workers=env.FILE_UPLOAD_CONCURRENCY
+    ) as executor:
+        uploads = {executor.submit(upload, tree): tree for tree in trees}
+        for future in futures.as_completed(uploads):
+            tree = uploads[future]
+            try:
+                setattr(tree, cid_field, future.result().cid)
+                uploaded.append(tree)
+            except Exception as err:
+                errors[tree] = err
+
+    with transaction.atomic():
+        Tree.objects.bulk_update(_lock_leased(uploaded), [cid_field, *update_fields])
+    if errors:
+        raise UploadError(errors)
 
 
 def _get_nft_metadata(tree: Tree):
@@ -249,6 +627,15 @@ def _get_nft_metadata(tree: Tree):
         "name": tree.species.common_name,
         "description": "https://replantworld.io",
         "image": tree.ipfs_image_url,
+        "properties": {
+            "category": "image",
+            "files": [
+                {
+                    "uri": tree.ipfs_image_url,
+                    "type": tree.image_content_type or "image/png",
+                }
+            ],
+        },
         "attributes": [
             {"trait_type": "Botanical Name", "value": tree.species.botanical_name},
             {
@@ -277,7 +664,7 @@ def _get_nft_metadata(tree: Tree):
     }
 
 
-def _mint_nfts(trees: Sequence[Tree]) -> tuple[str, Sequence[Tree]]:
+def _mint_nfts(trees: Sequence[Tree]) -> SubmittedTx:
     # Can only set 1 owner when using multi-mint.
     assert len(set(tree.sponsor for tree in trees)) == 1
 
@@ -298,15 +685,4 @@ def _mint_nfts(trees: Sequence[Tree]) -> tuple[str, Sequence[Tree]]:
         tokens=tokens,
     )
     logger.info(f"NFTs minted. TX: {tx.tx_hash}")
-
-    tree_ids = [tree.pk for tree in trees]
-    Tree.objects.filter(id__in=tree_ids).update(
-        minting_state=Tree.MintingState.MINTED,
-        nft_mint_tx=tx.tx_hash,
-        minted_at=timezone.now(),
-    )
-
-    # Wait for account sequence to update.
-    time.sleep(1)
-
-    return tx.tx_hash, trees
+    return tx
@@ -0,0 +1,89 @@
+"""NFT images made from the tree images.
+
+The functions run in worker processes, so the module must not depend on Django.
+"""
+
+import hashlib
+import io
+from dataclasses import dataclass
+
+from PIL import Image
+
+THUMBNAIL_SIZE = (512, 1024)
+
+# Lossy images over the byte budget are encoded again with lower quality.
+QUALITY_STEP = 10
+MIN_QUALITY = 40
+
+
+@dataclass(frozen=True)
+class ImageFormat:
+    """Encoding of NFT images."""
+
+    # Pillow format: PNG, WEBP or AVIF (AVIF needs a Pillow build supporting it).
+    name: str
+    quality: int = 80
+    # Largest size of lossy images in bytes, 0 for no limit.
+    max_bytes: int = 0
+
+    @property
+    def extension(self) -> str:
+        return self.name.lower()
+
+    @property
+    def content_type(self) -> str:
+        return f"image/{self.extension}"
+
+    @property
+    def is_lossy(self) -> bool:
+        return self.name != "PNG"
+
+
+def check_image_format(image_format: ImageFormat) -> None:
+    """Raise ValueError when the installed Pillow can't encode the format."""
+    try:
+        _encode(Image.new("RGB", (1, 1)), image_format.name)
+    except (KeyError, OSError, ValueError) as err:
+        raise ValueError(
+            f"NFT images can't be encoded as {image_format.name!r}, "
+            f"Pillow failed with {err!r}"
+        ) from err
+
+
+def get_nft_image_name(source: bytes, image_format: ImageFormat) -> str:
+    """Name of the NFT image made from the source image, given by its content."""
+    digest = hashlib.sha256(source).hexdigest()
+    width, height = THUMBNAIL_SIZE
+    if not image_format.is_lossy:
+        return f"{digest}_{width}x{height}.{image_format.extension}"
+    return (
+        f"{digest}_{width}x{height}_q{image_format.quality}"
+        f"_{image_format.max_bytes}.{image_format.extension}"
+    )
+
+
+def make_nft_image(source: bytes, image_format: ImageFormat) -> bytes:
+    image = Image.open(io.BytesIO(source))
+    # JPEGs are decoded right at a reduced scale instead of at the full size.
+    image.draft("RGB", THUMBNAIL_SIZE)
+    image.thumbnail(THUMBNAIL_SIZE)
+
+    if not image_format.is_lossy:
+        return _encode(image, image_format.name)
+
+    quality = image_format.quality
+    content = _encode(image, image_format.name, quality=quality)
+    while (
+        image_format.max_bytes
+        and len(content) > image_format.max_bytes
+        and quality > MIN_QUALITY
+    ):
+        quality = max(quality - QUALITY_STEP, MIN_QUALITY)
+        content = _encode(image, image_format.name, quality=quality)
+    return content
+
+
+def _encode(image: Image.Image, format_name: str, **params) -> bytes:
+    stream = io.BytesIO()
+    image.save(stream, format_name, **params)
+    return stream.getvalue()
@@ -0,0 +1,155 @@
+"""Background generation of admin reports, see `ReportJob`."""
+
+import csv
+import io
+import logging
+import tempfile
+from datetime import timedelta
+from typing import IO, Iterable, Iterator
+
+import openpyxl
+from django.core.files import File
+from django.utils import timezone
+
+import env
+from replant.admin_api import report, tree
+from replant.models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+# Progress of a job is saved, and the job kept claimed, every this many rows.
+PROGRESS_ROWS = 1000
+
+FILE_NAMES = {
+    ReportJob.Kind.DASHBOARD: "tree_full_report",
+    ReportJob.Kind.TREES: "trees_report",
+}
+
+
+class NoDataError(Exception):
+    pass
+
+
+class ClaimLostError(Exception):
+    """The job was claimed again by another worker, it seemed to be abandoned."""
+
+
+def run_next_report_job() -> bool:
+    """Generate the oldest queued report. Returns whether there was one."""
+    job = ReportJob.objects.claim_next(
+        timeout=timedelta(seconds=env.REPORT_JOB_TIMEOUT_SECONDS),
+        max_attempts=env.REPORT_JOB_MAX_ATTEMPTS,
+    )
+    if not job:
+        return False
+    run_report_job(job)
+    return True
+
+
+def run_report_job(job: ReportJob):
+    logger.info(f"Generating {job}...")
+    try:
+        lines = _get_report_lines(job)
+        with tempfile.TemporaryFile() as file:
+            _write_report(job, _track_progress(job, lines), file)
+            file.seek(0)
+            file_name = f"{FILE_NAMES[job.kind]}.{job.format.lower()}"
+            job.file.save(file_name, File(file), save=False)
+    except ClaimLostError:
+        logger.warning(f"{job} was claimed by another worker, stopping")
+        return
+    except NoDataError as err:
+        job.state = ReportJob.State.FAILED
+        job.error = str(err)
+    except Exception as err:
+        logger.exception(err)
+        job.state = ReportJob.State.FAILED
+        job.error = f"Generating the report failed: {err}"
+    else:
+        job.state = ReportJob.State.FINISHED
+    job.finished_at = timezone.now()
+    if not job.save_claimed(["state", "rows_written", "file", "error", "finished_at"]):
+        logger.warning(f"{job} was claimed by another worker, dropping the result")
+        if job.file:
+            job.file.delete(save=False)
+        return
+    logger.info(f"{job} {job.state.lower()}: {job.rows_written} rows")
+
+
+def delete_expired_report_jobs() -> int:
+    """Delete jobs finished more than `REPORT_JOB_RETENTION_DAYS` ago with their files.
+
+    Returns the number of deleted jobs.
+    """
+    expired_jobs = ReportJob.objects.filter(
+        state__in=[ReportJob.State.FINISHED, ReportJob.State.FAILED],
+        finished_at__lt=timezone.now() - timedelta(days=env.REPORT_JOB_RETENTION_DAYS),
+    )
+    deleted = 0
+    for job in expired_jobs.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        deleted += 1
+    if deleted:
+        logger.info(f"Deleted {deleted} expired report jobs")
+    return deleted
+
+
+def _get_report_lines(job: ReportJob) -> Iterator[list]:
+    match job.kind:
+        case ReportJob.Kind.DASHBOARD:
+            trees = report.filter_report_trees(job.params)
+            summary = report.get_report_summary(trees)
+            if not summary["total_planted"]:
+                raise NoDataError("No data found to generate report")
+            # Header, summary and a row per species.
+            _set_total_rows(job, summary["species_count"] + 2)
+            return report.iter_report_lines(trees, summary)
+        case ReportJob.Kind.TREES:
+            _, trees = tree.filter_listing_trees(job.params)
+            total_trees = trees.count()
+            if not total_trees:
+                raise NoDataError("No data found to generate report")
+            _set_total_rows(job, total_trees + 1)
+            tree_type = job.params.get("type", "all").lower()
+            rows = tree.iter_report_rows(
+                job.base_url, trees, tree_type, with_iucn_status=True
+            )
+            return tree.iter_report_lines(rows)
+        case _:
+            raise ValueError(f"Unknown report kind {job.kind}")
+
+
+def _set_total_rows(job: ReportJob, total_rows: int):
+    job.total_rows = total_rows
+    if not job.save_claimed(["total_rows"]):
+        raise ClaimLostError()
+
+
+def _track_progress(job: ReportJob, lines: Iterable[list]) -> Iterator[list]:
+    for line in lines:
+        yield line
+        job.rows_written += 1
+        if job.rows_written % PROGRESS_ROWS == 0 and not job.save_claimed(
+            ["rows_written"]
+        ):
+            raise ClaimLostError()
+
+
+def _write_report(job: ReportJob, lines: Iterable[list], file: IO[bytes]):
+    match job.format:
+        case ReportJob.Format.CSV:
+            text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+            csv.writer(text).writerows(lines)
+            # Keep the underlying file open for the upload.
+            text.detach()
+        case ReportJob.Format.XLSX:
+            # Write-only workbooks keep only the current row in memory.
+            workbook = openpyxl.Workbook(write_only=True)
+            sheet = workbook.create_sheet("Report")
+            for line in lines:
+                sheet.append(line)
+            workbook.save(file)
+        case _:
+            raise ValueError(f"Unknown report format {job.format}")
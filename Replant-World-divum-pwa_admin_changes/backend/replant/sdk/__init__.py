@@ -1,2 +1,2 @@
-from .cw721 import CW721Client, MintInfo
+from .cw721 import CW721Client, MintInfo, is_out_of_gas, is_sequence_mismatch
 from .scripts import deploy_nft_contract, get_sei_client, validate_sei_address
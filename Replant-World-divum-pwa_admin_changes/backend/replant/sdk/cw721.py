@@ -1,18 +1,24 @@
-from typing import NotRequired, TypedDict
+from typing import Any, NotRequired, TypedDict
 import json
+import math
+import threading
 import time
 import requests
 
-from cosmpy.aerial.client import LedgerClient, SubmittedTx, Wallet, prepare_and_broadcast_basic_transaction
+from cosmpy.aerial.client import Account, LedgerClient, SubmittedTx, Wallet, prepare_and_broadcast_basic_transaction
 from cosmpy.aerial.contract import LedgerContract
-from cosmpy.aerial.contract.cosmwasm import create_cosmwasm_instantiate_msg
-from cosmpy.aerial.tx import Transaction
+from cosmpy.aerial.contract.cosmwasm import create_cosmwasm_execute_msg, create_cosmwasm_instantiate_msg
+from cosmpy.aerial.exceptions import BroadcastError
+from cosmpy.aerial.tx import SigningCfg, Transaction
 from cosmpy.crypto.address import Address
 
 from replant.sdk.patch import patch_ParseDict
 
 patch_ParseDict()
 
+# Margin over the simulated gas, gas used varies e.g. with lengths of token URIs.
+GAS_ADJUSTMENT = 1.3
+
 
 class MintInfo(TypedDict):
     """Minted NFT metadata"""
@@ -107,15 +113,52 @@ def extract_contract_address_from_tx_response(tx_hash: str, rpc_url: str) -> str
     raise RuntimeError(f"Could not extract contract address from transaction {tx_hash} after {max_attempts} attempts")
 
 
+def is_sequence_mismatch(err: Exception) -> bool:
+    """If a transaction was rejected because it was signed with a stale account sequence"""
+    return isinstance(err, BroadcastError) and "account sequence mismatch" in str(err)
+
+
+def is_out_of_gas(err: Exception) -> bool:
+    """If a transaction failed because it ran out of gas, by the log of the node"""
+    return isinstance(err, BroadcastError) and "out of gas" in str(err)
+
+
+def _multi_mint_msg(owner: str, tokens: list[MintInfo]) -> dict:
+    return {
+        "extension": {"msg": {"multi_mint": {"owner": owner, "messages": tokens}}}
+    }
+
+
 class CW721Client:
-    """CW721-multi client"""
+    """CW721-multi client
+
+    Account numbers and sequences of the senders are kept locally and incremented
+    with every broadcast transaction, so transactions can be broadcast back-to-back
+    without waiting for the previous ones to be included in a block. They are
+    queried again when the chain rejects a transaction with a stale sequence.
 
-    def __init__(self, client: LedgerClient, address: str | Address):
+    Gas of minting is estimated as the base gas of a transaction plus gas per
+    token. Unless they're given, they're simulated with the first batch of more
+    than one minted token and with its first token alone, and used for all the
+    following transactions.
+    """
+
+    def __init__(
+        self,
+        client: LedgerClient,
+        address: str | Address,
+        gas_per_token: int | None = None,
+        base_gas: int = 0,
+    ):
         if not isinstance(address, Address):
             address = Address(str(address).strip())
 
         self.contract = LedgerContract(path=None, client=client, address=address)
         self.client = client
+        self.gas_per_token = gas_per_token
+        self.base_gas = base_gas
+        self._accounts: dict[str, Account] = {}
+        self._accounts_lock = threading.Lock()
 
     @staticmethod
     def instantate(
@@ -173,29 +216,72 @@ class CW721Client:
             print("Error instantiating CW721 contract:", e)
             raise
 
+    def num_tokens(self) -> int:
+        """Number of minted tokens"""
+        return int(self.contract.query({"num_tokens": {}})["count"])
+
+    def token_exists(self, token_id: str) -> bool:
+        """
+        Args:
+            token_id: ID of the NFT
+        """
+        try:
+            self.contract.query({"nft_info": {"token_id": token_id}})
+        except Exception:
+            # The query fails for tokens that don't exist.
+            return False
+        return True
+
     def multi_mint(
-        self, admin: Wallet, owner: str, tokens: list[MintInfo]
+        self,
+        admin: Wallet,
+        owner: str,
+        tokens: list[MintInfo],
+        gas_limit: int | None = None,
     ) -> SubmittedTx:
         """
         Args:
             admin: admin account
             owner: Address to mint to
             tokens: list of NFTs to mint
+            gas_limit: transaction gas limit, estimated from the base gas and gas per
+                token if not given
         """
-        from cosmpy.aerial.tx import Transaction
+        msg = _multi_mint_msg(owner, tokens)
+        if gas_limit is None:
+            gas_limit = self._estimate_multi_mint_gas(admin, owner, tokens)
 
-        # Use a fixed gas limit to avoid gas estimation issues
-        gas_limit = 300000 * len(tokens)  # 300k gas per token
+        return self._execute(msg, admin, gas_limit=gas_limit)
 
-        return self.contract.execute(
-            {
-                "extension": {
-                    "msg": {"multi_mint": {"owner": owner, "messages": tokens}}
-                }
-            },
-            admin,
-            gas_limit=gas_limit,
-        )
+    def max_multi_mint_tokens(self, gas_limit: int) -> int | None:
+        """
+        Args:
+            gas_limit: Gas limit of the transaction, e.g. the block gas limit
+
+        Returns:
+            Number of tokens that can be minted by one transaction, None until
+            the gas per token is known
+        """
+        if self.gas_per_token is None:
+            return None
+        return max((gas_limit - self.base_gas) // self.gas_per_token, 1)
+
+    def raise_gas_estimate(self, gas_wanted: int, gas_used: int):
+        """Raise the gas estimate of minting after a transaction ran out of gas.
+
+        Gas used by a transaction that ran out of gas is only a lower bound of the
+        gas it needs, so the estimate is raised by `GAS_ADJUSTMENT` over it at
+        least. Until the estimate is simulated, every transaction is simulated.
+
+        Args:
+            gas_wanted: gas limit of the transaction
+            gas_used: gas used by the transaction until it ran out of gas
+        """
+        if self.gas_per_token is None:
+            return
+        factor = max(gas_used / gas_wanted if gas_wanted else 0, 1) * GAS_ADJUSTMENT
+        self.base_gas = math.ceil(self.base_gas * factor)
+        self.gas_per_token = math.ceil(self.gas_per_token * factor)
 
     def multi_transfer(
         self, sender: Wallet, recipient: str, tokens: list[str]
@@ -206,7 +292,7 @@ class CW721Client:
             recipient: Address to transfer to
             tokens: list of NFTs to transfer
         """
-        return self.contract.execute(
+        return self._execute(
             {
                 "extension": {
                     "msg": {
@@ -215,4 +301,96 @@ class CW721Client:
                 }
             },
             sender,
-        )
\ No newline at end of file
+        )
+
+    def _execute(
+        self, args: Any, sender: Wallet, gas_limit: int | None = None
+    ) -> SubmittedTx:
+        """Execute the contract signing with the locally tracked account sequence.
+
+        Args:
+            args: execute message
+            sender: account to sign the transaction
+            gas_limit: transaction gas limit, simulated if not given
+        """
+        tx = self._build_tx(args, sender)
+
+        # Broadcasts of a sender are serialized, each of them takes the next sequence.
+        with self._accounts_lock:
+            try:
+                return self._broadcast(tx, sender, gas_limit)
+            except Exception as err:
+                if not is_sequence_mismatch(err):
+                    raise
+            # Other transactions were signed by the account, e.g. by another process.
+            self._accounts.pop(str(sender.address()), None)
+            return self._broadcast(tx, sender, gas_limit)
+
+    def _estimate_multi_mint_gas(
+        self, admin: Wallet, owner: str, tokens: list[MintInfo]
+    ) -> int:
+        """Gas limit of minting tokens by one transaction.
+
+        Gas of a transaction doesn't grow in proportion to its tokens, so the base
+        gas and gas per token are simulated with two sizes of the batch. A batch
+        of one token is simulated alone until then.
+        """
+        if self.gas_per_token is None:
+            gas_used = self._simulate(_multi_mint_msg(owner, tokens), admin)
+            if len(tokens) == 1:
+                return math.ceil(gas_used * GAS_ADJUSTMENT)
+            single_gas_used = self._simulate(_multi_mint_msg(owner, tokens[:1]), admin)
+            gas_per_token = max((gas_used - single_gas_used) / (len(tokens) - 1), 1)
+            self.base_gas = math.ceil(
+                max(single_gas_used - gas_per_token, 0) * GAS_ADJUSTMENT
+            )
+            self.gas_per_token = math.ceil(gas_per_token * GAS_ADJUSTMENT)
+        return self.base_gas + self.gas_per_token * len(tokens)
+
+    def _simulate(self, args: Any, sender: Wallet) -> int:
+        """Gas used by executing the contract"""
+        tx = self._build_tx(args, sender)
+        with self._accounts_lock:
+            account = self._get_account(sender)
+        tx.seal(
+            SigningCfg.direct(sender.public_key(), account.sequence),
+            fee="",
+            gas_limit=0,
+        )
+        tx.sign(sender.signer(), self.client.network_config.chain_id, account.number)
+        tx.complete()
+        return self.client.simulate_tx(tx)
+
+    def _build_tx(self, args: Any, sender: Wallet) -> Transaction:
+        tx = Transaction()
+        tx.add_message(
+            create_cosmwasm_execute_msg(sender.address(), self.contract.address, args)
+        )
+        return tx
+
+    def _get_account(self, sender: Wallet) -> Account:
+        address = str(sender.address())
+        if address not in self._accounts:
+            self._accounts[address] = self.client.query_account(sender.address())
+        return self._accounts[address]
+
+    def _broadcast(
+        self, tx: Transaction, sender: Wallet, gas_limit: int | None
+    ) -> SubmittedTx:
+        address = str(sender.address())
+        account = self._get_account(sender)
+
+        try:
+            submitted_tx = prepare_and_broadcast_basic_transaction(
+                self.client, tx, sender, account=account, gas_limit=gas_limit
+            )
+        except BroadcastError:
+            # The node rejected the transaction, its sequence wasn't used.
+            raise
+        except Exception:
+            # It's unknown if the transaction was accepted, query the sequence again.
+            del self._accounts[address]
+            raise
+
+        account.sequence += 1
+        return submitted_tx
\ No newline at end of file
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Iterable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CONCURRENCY = 16
+
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_maxsize=CONCURRENCY))
+session.mount("http://", HTTPAdapter(pool_maxsize=CONCURRENCY))
+
+
+@dataclass(frozen=True)
+class TxReceipt:
+    """Result of a transaction included in a block"""
+
+    tx_hash: str
+    code: int
+    raw_log: str
+    gas_wanted: int = 0
+    gas_used: int = 0
+
+    @property
+    def succeeded(self) -> bool:
+        return self.code == 0
+
+
+def get_rest_url(rpc_url: str) -> str:
+    """
+    Args:
+        rpc_url: RPC URL as given to cosmpy, e.g. "rest+https://..."
+    """
+    return rpc_url.removeprefix("rest+")
+
+
+def get_tx_receipts(
+    rest_url: str, tx_hashes: Iterable[str]
+) -> dict[str, TxReceipt | None]:
+    """Query receipts of transactions concurrently.
+
+    Args:
+        rest_url: REST API URL of a node
+        tx_hashes: hashes of the transactions
+
+    Returns:
+        Receipts by hashes, None for transactions that aren't in a block (yet).
+        Transactions whose query failed are left out.
+    """
+    return asyncio.run(_get_tx_receipts(rest_url, list(tx_hashes)))
+
+
+async def _get_tx_receipts(
+    rest_url: str, tx_hashes: list[str]
+) -> dict[str, TxReceipt | None]:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def get_tx_receipt(tx_hash: str) -> TxReceipt | None:
+        async with semaphore:
+            # Requests of the shared session are sent from threads of the loop.
+            response = await asyncio.to_thread(
+                session.get, f"{rest_url}/cosmos/tx/v1beta1/txs/{tx_hash}", timeout=10
+            )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        tx_response = response.json()["tx_response"]
+        return TxReceipt(
+            tx_hash=tx_hash,
+            code=int(tx_response.get("code", 0)),
+            raw_log=tx_response.get("raw_log", ""),
+            gas_wanted=int(tx_response.get("gas_wanted", 0)),
+            gas_used=int(tx_response.get("gas_used", 0)),
+        )
+
+    results = await asyncio.gather(
+        *(get_tx_receipt(tx_hash) for tx_hash in tx_hashes), return_exceptions=True
+    )
+    receipts: dict[str, TxReceipt | None] = {}
+    for tx_hash, result in zip(tx_hashes, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"Querying transaction {tx_hash} failed: {result!r}")
+            continue
+        receipts[tx_hash] = result
+    return receipts
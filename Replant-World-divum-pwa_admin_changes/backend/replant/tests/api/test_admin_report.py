@@ -0,0 +1,145 @@
+from decimal import Decimal
+
+import pytest
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APIClient
+
+import env
+from replant.admin_api.report import ReportGenerationView
+from replant.models import ReportJob, Species, Tree, User
+
+HEADER = (
+    "PLANTED,PENDING,APPROVED,REJECTED,VALUE,% NATIVE,% NON NATIVE,NO. OF SPECIES,"
+    "% DATA DEFICIENT (DD),% LEAST CONCERN (LC),% NEAR THREATENED (NT),"
+    "% VULNERABLE (VU),% ENDANGERED (EN),% CRITICALLY ENDANGERED (CR),"
+    "COMMON NAME,BOTANICAL NAME,NATIVE / NON NATIVE,IUCN STATUS,COST,TOTAL VERIFIED"
+)
+
+
+@pytest.fixture
+def species() -> dict[str, Species]:
+    return {
+        "oak": baker.make(
+            Species, common_name="Oak", botanical_name="Quercus robur", iucn_status="LC"
+        ),
+        "pine": baker.make(
+            Species,
+            common_name="Pine",
+            botanical_name="Pinus sylvestris",
+            iucn_status="EN",
+        ),
+    }
+
+
+@pytest.fixture
+def planters() -> list[User]:
+    return baker.make(User, role=User.Role.PLANTER, _quantity=2)
+
+
+@pytest.fixture
+def trees(species: dict[str, Species], planters: list[User]) -> list[Tree]:
+    return [
+        baker.make(
+            Tree,
+            species=species[name],
+            created_by=planter,
+            review_state=review_state,
+            is_native=is_native,
+            planting_cost_usd=Decimal(cost),
+        )
+        for name, planter, review_state, is_native, cost in [
+            ("oak", planters[0], Tree.ReviewState.APPROVED, True, "2.50"),
+            ("pine", planters[1], Tree.ReviewState.REJECTED, False, "1.25"),
+            ("oak", planters[0], Tree.ReviewState.APPROVED, True, "2.50"),
+            ("oak", planters[1], Tree.ReviewState.PENDING, False, "3.00"),
+        ]
+    ]
+
+
+def _read_csv(response: StreamingHttpResponse) -> list[str]:
+    assert response["Content-Type"] == "text/csv"
+    assert (
+        response["Content-Disposition"] == "attachment; filename=tree_full_report.csv"
+    )
+    return b"".join(response.streaming_content).decode().split("\r\n")
+
+
+def test_report(trees: list[Tree]):
+    response = ReportGenerationView.as_view()(RequestFactory().get("/"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert _read_csv(response) == [
+        HEADER,
+        "4,1,2,1,9.25,50.0,50.0,2,0.0,75.0,0.0,0.0,25.0,0.0,,,,,,",
+        ",,,,,,,,,,,,,,Oak,Quercus robur,Native,Least Concern,8.00,2",
+        ",,,,,,,,,,,,,,Pine,Pinus sylvestris,Non Native,Endangered,1.25,0",
+        "",
+    ]
+
+
+def test_report_no_trees():
+    response = ReportGenerationView.as_view()(RequestFactory().get("/"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert _read_csv(response) == [
+        HEADER,
+        "0,0,0,0,0,0,0,0,0,0,0,0,0,0,,,,,,",
+        "",
+    ]
+
+
+def test_dashboard_report_filtered(
+    api_client: APIClient, trees: list[Tree], planters: list[User]
+):
+    response = api_client.get("/api/v1/admin/report", {"planted_by": planters[1].pk})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert _read_csv(response) == [
+        HEADER,
+        "2,1,0,1,4.25,0.0,100.0,2,0.0,50.0,0.0,0.0,50.0,0.0,,,,,,",
+        ",,,,,,,,,,,,,,Pine,Pinus sylvestris,Non Native,Endangered,1.25,0",
+        ",,,,,,,,,,,,,,Oak,Quercus robur,Non Native,Least Concern,3.00,0",
+        "",
+    ]
+
+
+def test_dashboard_report_no_data(
+    api_client: APIClient, trees: list[Tree], species: dict[str, Species]
+):
+    response = api_client.get(
+        "/api/v1/admin/report",
+        {"species_id": species["pine"].pk, "minted_status": "minted"},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {
+        "message": "No data found to generate report",
+        "error_code": 400,
+    }
+
+
+def test_large_dashboard_report_is_queued(
+    api_client: APIClient,
+    trees: list[Tree],
+    planters: list[User],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(env, "REPORT_SYNC_MAX_TREES", 2)
+
+    response = api_client.get("/api/v1/admin/report", {"planted_by": planters[1].pk})
+    assert response.status_code == status.HTTP_200_OK
+
+    response = api_client.get("/api/v1/admin/report")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert not ReportJob.objects.exists()
+
+    api_client.force_login(baker.make(User, is_staff=True))
+    response = api_client.get("/api/v1/admin/report", {"planted_from": "2023-12-01"})
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = ReportJob.objects.get()
+    assert response.json()["content"]["id"] == job.pk
+    assert job.kind == ReportJob.Kind.DASHBOARD
+    assert job.params == {"planted_from": "2023-12-01"}
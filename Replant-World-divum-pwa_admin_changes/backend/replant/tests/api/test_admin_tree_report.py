@@ -0,0 +1,140 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import StreamingHttpResponse
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APIClient
+
+import env
+from replant.models import PlantingOrganization, ReportJob, Species, Sponsor, Tree, User
+
+URL = "/api/v1/admin/trees"
+
+
+@pytest.fixture
+def planter() -> User:
+    return baker.make(User, username="planter", role=User.Role.PLANTER)
+
+
+@pytest.fixture
+def admin_client(api_client: APIClient) -> APIClient:
+    api_client.force_login(baker.make(User, is_staff=True))
+    return api_client
+
+
+@pytest.fixture
+def trees(planter: User, simple_uploaded_file: SimpleUploadedFile) -> list[Tree]:
+    species = baker.make(
+        Species, common_name="Oak", botanical_name="Quercus robur", iucn_status="LC"
+    )
+    organization = baker.make(PlantingOrganization, name="Green World")
+    common = dict(
+        species=species,
+        planting_organization=organization,
+        created_by=planter,
+        latitude="10.500000",
+        longitude="20.250000",
+    )
+    return [
+        baker.make(
+            Tree,
+            review_state=Tree.ReviewState.PENDING,
+            image=simple_uploaded_file,
+            **common,
+        ),
+        baker.make(Tree, review_state=Tree.ReviewState.PENDING, image="", **common),
+        baker.make(
+            Tree,
+            review_state=Tree.ReviewState.APPROVED,
+            sponsor=baker.make(Sponsor, name="Sponsor"),
+            nft_id=7,
+            **common,
+        ),
+    ]
+
+
+def _read_csv(response: StreamingHttpResponse) -> list[str]:
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "text/csv"
+    assert response["Content-Disposition"] == 'attachment; filename="trees_report.csv"'
+    return b"".join(response.streaming_content).decode().split("\r\n")
+
+
+def test_pending_trees_report(
+    admin_client: APIClient, trees: list[Tree], planter: User
+):
+    response = admin_client.get(URL, {"type": "pending", "report": "1"})
+
+    with_image, without_image, _ = trees
+    common = (
+        f"Oak,Quercus robur,Green World,planter,{planter.pk},"
+        "2024-01-01T00:00:00+00:00,pending,pending,,,LC"
+    )
+    assert _read_csv(response) == [
+        "TREE ID,SPECIES NAME,BOTANICAL NAME,ORGANISATION NAME,PLANTED BY,USER ID,"
+        "PLANTED ON,MINTING STATE,REVIEW STATE,NFT ID,SPONSOR,IUCN STATUS,"
+        "IMAGE URL,LOCATION",
+        f"{with_image.pk},{common},http://testserver/django-files/{with_image.image.name},"
+        '"10.500000, 20.250000"',
+        f'{without_image.pk},{common},,"10.500000, 20.250000"',
+        "",
+    ]
+
+
+def test_approved_trees_report(admin_client: APIClient, trees: list[Tree]):
+    response = admin_client.get(URL, {"type": "approved", "report": "1"})
+
+    lines = _read_csv(response)
+    assert lines[0] == (
+        "TREE ID,SPECIES NAME,BOTANICAL NAME,ORGANISATION NAME,PLANTED BY,USER ID,"
+        "PLANTED ON,MINTING STATE,REVIEW STATE,NFT ID,SPONSOR,IUCN STATUS,"
+        "APPROVED ON,COMMENTS,IMAGE URL"
+    )
+    assert lines[1].startswith(f"{trees[2].pk},Oak,")
+    assert lines[1].endswith(
+        "pending,2024-01-01T00:00:00+00:00,7,Sponsor,LC,2024-01-01T00:00:00+00:00,,"
+    )
+    assert lines[2:] == [""]
+
+
+def test_trees_report_filters(
+    admin_client: APIClient, trees: list[Tree], planter: User
+):
+    response = admin_client.get(
+        URL, {"report": "1", "minted_status": "pending", "sponsor_id": "0"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["message"] == "No data found to generate report"
+
+    response = admin_client.get(
+        URL, {"report": "1", "planted_by": planter.pk, "organisation_name": "green"}
+    )
+    tree_ids = {int(line.split(",")[0]) for line in _read_csv(response)[1:-1]}
+    assert tree_ids == {tree.pk for tree in trees}
+
+    response = admin_client.get(URL, {"report": "1", "organisation_name": "other"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = admin_client.get(URL, {"report": "1", "type": "unknown"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["message"] == "Invalid tree type parameter"
+
+
+def test_large_trees_report_is_queued(
+    admin_client: APIClient, trees: list[Tree], monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(env, "REPORT_SYNC_MAX_TREES", 2)
+
+    response = admin_client.get(URL, {"type": "pending", "report": "1"})
+    assert response.status_code == status.HTTP_200_OK
+
+    response = admin_client.get(
+        URL, {"report": "1", "page": "2", "organisation_name": "green"}
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = ReportJob.objects.get()
+    assert response.json()["content"]["id"] == job.pk
+    assert response.json()["content"]["state"] == ReportJob.State.QUEUED
+    assert job.kind == ReportJob.Kind.TREES
+    assert job.params == {"organisation_name": "green"}
+    assert job.base_url == "http://testserver/"
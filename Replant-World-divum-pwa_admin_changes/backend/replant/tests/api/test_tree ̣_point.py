@@ -2,34 +2,41 @@ from model_bakery import baker
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from replant import clustering
 from replant.models import Tree
 from replant.tests import matchers
 
 
+def _tile_index(grid_index: int):
+    return clustering.get_tile_index_from_grid_index(
+        grid_index, zoom=clustering.TREE_ZOOM
+    )
+
+
 def test_listing_tree_points(user_client: APIClient):
     baker.make(
         Tree,
         minting_state=Tree.MintingState.MINTED,
         nft_id=1,
-        tile_index=1000,
+        tile_index=_tile_index(1000),
     )
     baker.make(
         Tree,
         minting_state=Tree.MintingState.MINTED,
         nft_id=2,
-        tile_index=1000,
+        tile_index=_tile_index(1000),
     )
     baker.make(
         Tree,
         minting_state=Tree.MintingState.PENDING,
         nft_id=3,
-        tile_index=1000,
+        tile_index=_tile_index(1000),
     )
     baker.make(
         Tree,
         minting_state=Tree.MintingState.MINTED,
         nft_id=4,
-        tile_index=1001,
+        tile_index=_tile_index(1001),
     )
 
     response = user_client.get("/api/tree-points")
@@ -54,3 +61,7 @@ def test_listing_tree_points(user_client: APIClient):
             "nft_id": 2,
         },
     ]
+
+    response = user_client.get("/api/tree-points?index=-1")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == ["index is outside of the tile grid of zoom 9"]
@@ -0,0 +1,121 @@
+import gzip
+
+import numpy as np
+import pytest
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from replant import clustering, tree_tiles
+from replant.api import tree_tile
+from replant.models import Tree, TreesCluster
+
+
+def test_getting_cluster_tile(api_client: APIClient):
+    baker.make(
+        TreesCluster,
+        latitude=10.5,
+        longitude=20.25,
+        tile_index=clustering.get_tile_index_from_grid_index(1000, zoom=4),
+        zoom=4,
+        number_of_trees=100,
+    )
+    baker.make(
+        TreesCluster,
+        tile_index=clustering.get_tile_index_from_grid_index(1000, zoom=5),
+        zoom=5,
+        number_of_trees=300,
+    )
+    tree_tiles.rebuild_cluster_tiles()
+
+    response = api_client.get(
+        "/api/tree-tiles/clusters/4/1000", HTTP_ACCEPT_ENCODING="gzip"
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/octet-stream"
+    assert response["Content-Encoding"] == "gzip"
+    assert "max-age=3600" in response["Cache-Control"]
+    records = np.frombuffer(gzip.decompress(response.content), tree_tiles.RECORD)
+    assert records.tolist() == [(10.5, 20.25, 100)]
+
+    assert response["ETag"].endswith('-gz"')
+    assert "Accept-Encoding" in response["Vary"]
+
+    gzip_etag = response["ETag"]
+    response = api_client.get(
+        "/api/tree-tiles/clusters/4/1000",
+        HTTP_ACCEPT_ENCODING="gzip",
+        HTTP_IF_NONE_MATCH=gzip_etag,
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # The uncompressed tile is another representation.
+    response = api_client.get(
+        "/api/tree-tiles/clusters/4/1000",
+        HTTP_ACCEPT_ENCODING="gzip;q=0, identity",
+        HTTP_IF_NONE_MATCH=gzip_etag,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert "Content-Encoding" not in response
+    assert response["ETag"] == gzip_etag.replace('-gz"', '"')
+
+    response = api_client.get("/api/tree-tiles/clusters/5/1000")
+    assert response.status_code == status.HTTP_200_OK
+    assert "Content-Encoding" not in response
+    assert np.frombuffer(response.content, tree_tiles.RECORD)["value"].tolist() == [300]
+
+    response = api_client.get("/api/tree-tiles/clusters/4/2112")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_getting_point_tile(api_client: APIClient):
+    tile_index = clustering.get_tile_index_from_grid_index(
+        1000, zoom=clustering.TREE_ZOOM
+    )
+    baker.make(
+        Tree,
+        minting_state=Tree.MintingState.MINTED,
+        latitude=iter([1, 2]),
+        longitude=iter([3, 4]),
+        nft_id=iter([2, 1]),
+        tile_index=tile_index,
+        _quantity=2,
+    )
+    baker.make(
+        Tree, minting_state=Tree.MintingState.PENDING, nft_id=3, tile_index=tile_index
+    )
+    tree_tiles.rebuild_point_tiles(zoom=clustering.TREE_ZOOM)
+
+    response = api_client.get(f"/api/tree-tiles/points/{clustering.TREE_ZOOM}/1000")
+    assert response.status_code == status.HTTP_200_OK
+    records = np.frombuffer(response.content, tree_tiles.RECORD)
+    assert records.tolist() == [(2, 4, 1), (1, 3, 2)]
+
+
+def test_getting_empty_tile(api_client: APIClient):
+    response = api_client.get("/api/tree-tiles/clusters/4/1000")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b""
+    assert "ETag" not in response
+
+    response = api_client.get("/api/tree-tiles/trees/1/1000")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("", False),
+        ("gzip", True),
+        ("deflate, gzip;q=0.5", True),
+        ("GZIP", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.0, identity", False),
+        ("*", True),
+        ("*;q=0", False),
+        ("gzip;q=0, *", False),
+        ("br", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding: str, expected: bool):
+    assert tree_tile.accepts_gzip(accept_encoding) == expected
@@ -0,0 +1,86 @@
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from replant import clustering
+from replant.models import Tree
+
+
+def _make_cluster(latitude: float, longitude: float, zoom: int, number_of_trees=1):
+    cluster = clustering._make_cluster(
+        (latitude, longitude), count=number_of_trees, zoom=zoom
+    )
+    cluster.save()
+    return cluster
+
+
+def test_getting_viewport_clusters(api_client: APIClient):
+    _make_cluster(10, 10, zoom=3, number_of_trees=1)
+    _make_cluster(15, 25, zoom=3, number_of_trees=2)
+    _make_cluster(10, 170, zoom=3, number_of_trees=3)
+    _make_cluster(10, -170, zoom=3, number_of_trees=4)
+    _make_cluster(40, 10, zoom=3, number_of_trees=5)
+    _make_cluster(10, 10, zoom=4, number_of_trees=6)
+
+    response = api_client.get(
+        "/api/tree-viewport?zoom=3&south=0&west=0&north=20&east=30"
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert sorted(c["number_of_trees"] for c in data["clusters"]) == [1, 2]
+    assert data["points"] == []
+
+    # Crossing the antimeridian.
+    response = api_client.get(
+        "/api/tree-viewport?zoom=3&south=0&west=160&north=20&east=-160"
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert sorted(c["number_of_trees"] for c in data["clusters"]) == [3, 4]
+
+
+def test_getting_viewport_points(api_client: APIClient):
+    for nft_id, (latitude, longitude) in enumerate([(10, 10), (10.01, 10.01)], 1):
+        baker.make(
+            Tree,
+            minting_state=Tree.MintingState.MINTED,
+            nft_id=nft_id,
+            latitude=latitude,
+            longitude=longitude,
+            tile_index=clustering.get_tree_tile_index(latitude, longitude),
+        )
+    baker.make(
+        Tree,
+        minting_state=Tree.MintingState.MINTED,
+        nft_id=3,
+        latitude=11,
+        longitude=10,
+        tile_index=clustering.get_tree_tile_index(11, 10),
+    )
+
+    response = api_client.get(
+        f"/api/tree-viewport?zoom={clustering.TREE_ZOOM}"
+        "&south=9.95&west=9.95&north=10.05&east=10.05"
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["clusters"] == []
+    assert sorted(p["nft_id"] for p in data["points"]) == [1, 2]
+
+
+def test_getting_viewport_validation(api_client: APIClient):
+    response = api_client.get("/api/tree-viewport?zoom=3")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = api_client.get(
+        "/api/tree-viewport?zoom=3&south=20&west=0&north=10&east=30"
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"non_field_errors": ["south must not be above north"]}
+
+    response = api_client.get(
+        f"/api/tree-viewport?zoom={clustering.TREE_ZOOM}"
+        "&south=-90&west=-180&north=90&east=180"
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == ["Too many tiles, zoom in"]
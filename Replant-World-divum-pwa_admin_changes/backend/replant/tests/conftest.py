@@ -9,6 +9,7 @@ from PIL import Image
 from rest_framework.test import APIClient
 from time_machine import travel
 
+from replant.integrations import filebase
 from replant.models import Country, PlantingOrganization, User
 
 baker.generators.add(
@@ -30,6 +31,12 @@ def _use_in_memory_storage_backend(settings):
     }
 
 
+@pytest.fixture(autouse=True)
+def _reset_s3_client():
+    """The S3 client is created once, tests mocking `boto3.client` need a new one."""
+    filebase._s3_client = None
+
+
 @pytest.fixture(autouse=True)
 def time():
     with travel("2024-01-01", tick=False) as ft:
@@ -57,6 +57,27 @@ def test_filebase_upload(
     )
 
 
+@mock.patch("boto3.client")
+def test_filebase_upload_reuses_client(
+    mock_boto_client: mock.MagicMock,
+    image_to_upload: io.BytesIO,
+) -> None:
+    # mocks
+    mock_s3 = mock.MagicMock()
+    mock_boto_client.return_value = mock_s3
+    mock_s3.put_object.return_value = SUCCESS_FILEBASE_UPLOAD_IMAGE_RESPONSE
+
+    # when
+    for file_name in ["1.png", "2.png"]:
+        filebase.upload_to_bucket(
+            dto=filebase.FileDto(file_name=file_name, content=image_to_upload)
+        )
+
+    # then
+    mock_boto_client.assert_called_once()
+    assert mock_s3.put_object.call_count == 2
+
+
 @responses.activate
 def test_pin_file_to_ipfs() -> None:
     # given
@@ -0,0 +1,59 @@
+import pytest
+
+from replant.integrations import ipfs_car
+
+
+def _read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, offset
+
+
+def _read_sections(car: bytes) -> list[bytes]:
+    sections = []
+    offset = 0
+    while offset < len(car):
+        length, offset = _read_varint(car, offset)
+        sections.append(car[offset : offset + length])  # noqa:E203
+        offset += length
+    return sections
+
+
+def test_make_directory_car_empty() -> None:
+    # when
+    cid, car = ipfs_car.make_directory_car({})
+
+    # then
+    # CID of an empty UnixFS directory.
+    assert cid == "bafybeiczsscdsbs7ffqz55asqdf3smv6klcw3gofszvwlyarci47bgf354"
+    header, directory = _read_sections(car)
+    assert header.startswith(b"\xa2\x65roots")
+    assert directory.endswith(b"\x0a\x02\x08\x01")
+
+
+def test_make_directory_car() -> None:
+    # when
+    cid, car = ipfs_car.make_directory_car({"2.json": b"{}", "1.json": b"hello"})
+
+    # then
+    header, directory, first, second = _read_sections(car)
+    directory_cid = directory[:36]
+    assert ipfs_car.encode_cid(directory_cid) == cid
+    assert directory_cid in header
+    # Files are raw blocks ordered by name.
+    assert ipfs_car.encode_cid(first[:36]) == (
+        "bafkreibm6jg3ux5qumhcn2b3flc3tyu6dmlb4xa7u5bf44yegnrjhc4yeq"
+    )
+    assert first[36:] == b"hello"
+    assert second[36:] == b"{}"
+    assert directory.index(b"1.json") < directory.index(b"2.json")
+
+
+def test_make_directory_car_too_large_file() -> None:
+    with pytest.raises(ValueError, match="File big.json is larger"):
+        ipfs_car.make_directory_car({"big.json": bytes(ipfs_car.MAX_FILE_SIZE + 1)})
@@ -0,0 +1,27 @@
+import pytest
+
+from replant.models import NftIdCounter
+
+
+def test_allocate_ok():
+    NftIdCounter.objects.reconcile(10)
+
+    assert NftIdCounter.objects.allocate(3) == range(11, 14)
+    assert NftIdCounter.objects.allocate(1) == range(14, 15)
+    assert NftIdCounter.objects.get().last_nft_id == 14
+
+
+def test_allocate_without_counter():
+    NftIdCounter.objects.all().delete()
+
+    with pytest.raises(NftIdCounter.DoesNotExist, match="counter is missing"):
+        NftIdCounter.objects.allocate(1)
+
+
+def test_reconcile_ok():
+    NftIdCounter.objects.reconcile(10)
+    NftIdCounter.objects.reconcile(5)
+
+    counter = NftIdCounter.objects.get()
+    assert counter.last_nft_id == 10
+    assert str(counter.reconciled_at) == "2024-01-01 00:00:00+00:00"
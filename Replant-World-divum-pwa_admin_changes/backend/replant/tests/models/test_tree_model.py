@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from model_bakery import baker
 
 from replant.consts import FILEBASE_IPFS_STORAGE_URL, NFT_STORAGE_URL
@@ -63,3 +65,46 @@ def test_ipfs_filebase_url() -> None:
     # when & then
     assert ipfs_filebase_url(cid) == f"https://ipfs.filebase.io/ipfs/{cid}"
     assert ipfs_filebase_url(None) == ""
+
+
+def test_get_statistics() -> None:
+    # given
+    baker.make(Tree, review_state=Tree.ReviewState.PENDING)
+    baker.make(Tree, review_state=Tree.ReviewState.REJECTED)
+    baker.make(
+        Tree,
+        review_state=Tree.ReviewState.APPROVED,
+        minting_state=Tree.MintingState.TO_BE_MINTED,
+        sponsor=baker.make("replant.Sponsor"),
+        planting_cost_usd=Decimal("3.00"),
+    )
+    baker.make(
+        Tree,
+        review_state=Tree.ReviewState.APPROVED,
+        minting_state=Tree.MintingState.MINTED,
+        sponsor=baker.make("replant.Sponsor"),
+        planting_cost_usd=Decimal("5.50"),
+        _quantity=2,
+    )
+
+    # when & then
+    assert Tree.objects.get_statistics() == {
+        "total": 5,
+        "pending": 1,
+        "approved": 3,
+        "rejected": 1,
+        "sponsored": 3,
+        "minted": 2,
+        "minted_cost_usd": Decimal("11.00"),
+    }
+    assert Tree.objects.filter(
+        review_state=Tree.ReviewState.PENDING
+    ).get_statistics() == {
+        "total": 1,
+        "pending": 1,
+        "approved": 0,
+        "rejected": 0,
+        "sponsored": 0,
+        "minted": 0,
+        "minted_cost_usd": None,
+    }
@@ -0,0 +1,276 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from time_machine import TimeMachineFixture
+
+from replant.models import PlantingOrganization, Species, Sponsor, Tree, TreeStats
+
+
+@pytest.fixture
+def organization() -> PlantingOrganization:
+    return baker.make(PlantingOrganization)
+
+
+@pytest.fixture
+def species() -> Species:
+    return baker.make(Species)
+
+
+def make_trees(
+    organization: PlantingOrganization, species: Species, quantity: int, **kwargs
+) -> list[Tree]:
+    return baker.make(
+        Tree,
+        planting_organization=organization,
+        species=species,
+        planting_cost_usd=Decimal("2.50"),
+        _quantity=quantity,
+        **kwargs,
+    )
+
+
+def get_rows() -> list[tuple]:
+    return sorted(
+        TreeStats.objects.values_list(
+            "day",
+            "sponsor_id",
+            "review_state",
+            "minting_state",
+            "number_of_trees",
+            "planting_cost_usd",
+        ),
+        key=str,
+    )
+
+
+def assert_same_as_rebuilt():
+    rows = get_rows()
+    TreeStats.objects.rebuild()
+    assert get_rows() == rows
+
+
+def test_create(
+    organization: PlantingOrganization, species: Species, time: TimeMachineFixture
+) -> None:
+    # when
+    make_trees(organization, species, 2)
+    time.move_to("2024-01-02")
+    make_trees(organization, species, 1)
+
+    # then
+    assert get_rows() == [
+        (date(2024, 1, 1), None, "PENDING", "PENDING", 2, Decimal("5.00")),
+        (date(2024, 1, 2), None, "PENDING", "PENDING", 1, Decimal("2.50")),
+    ]
+    assert_same_as_rebuilt()
+
+
+def test_bulk_create(organization: PlantingOrganization, species: Species) -> None:
+    # given
+    trees = baker.prepare(
+        Tree,
+        planting_organization=organization,
+        species=species,
+        planting_cost_usd=Decimal("2.50"),
+        created_by=baker.make("replant.User"),
+        country=baker.make("replant.Country"),
+        _quantity=3,
+    )
+
+    # when
+    Tree.objects.bulk_create(trees)
+
+    # then
+    assert get_rows() == [
+        (date(2024, 1, 1), None, "PENDING", "PENDING", 3, Decimal("7.50")),
+    ]
+
+
+def test_save(organization: PlantingOrganization, species: Species) -> None:
+    # given
+    tree, _ = make_trees(organization, species, 2)
+
+    # when
+    tree.review_state = Tree.ReviewState.APPROVED
+    tree.save()
+    tree.rejection_reason = "ignored"
+    tree.save(update_fields=["rejection_reason"])
+
+    # then
+    assert get_rows() == [
+        (date(2024, 1, 1), None, "APPROVED", "PENDING", 1, Decimal("2.50")),
+        (date(2024, 1, 1), None, "PENDING", "PENDING", 1, Decimal("2.50")),
+    ]
+    assert_same_as_rebuilt()
+
+
+def test_save_rounds_planting_cost(
+    organization: PlantingOrganization, species: Species
+) -> None:
+    # given
+    tree, _ = make_trees(organization, species, 2)
+
+    # when
+    tree.rejection_reason = "no change of the rollup"
+    tree.save()
+    tree.review_state = Tree.ReviewState.APPROVED
+    tree.planting_cost_usd = Decimal("3.004")
+    tree.save()
+
+    # then
+    assert get_rows() == [
+        (date(2024, 1, 1), None, "APPROVED", "PENDING", 1, Decimal("3.00")),
+        (date(2024, 1, 1), None, "PENDING", "PENDING", 1, Decimal("2.50")),
+    ]
+    assert_same_as_rebuilt()
+
+
+def test_save_tree_changed_since_loaded(
+    organization: PlantingOrganization, species: Species
+) -> None:
+    # given
+    make_trees(organization, species, 2)
+    stale = Tree.objects.first()
+    Tree.objects.filter(pk=stale.pk).update(minting_state=Tree.MintingState.MINTED)
+
+    # when
+    stale.rejection_reason = "saves the loaded minting state back"
+    stale.save()
+
+    # then
+    assert get_rows() == [
+        (date(2024, 1, 1), None, "PENDING", "PENDING", 2, Decimal("5.00")),
+    ]
+    assert_same_as_rebuilt()
+
+
+def test_save_with_deferred_fields(
+    organization: PlantingOrganization, species: Species
+) -> None:
+    # given
+    make_trees(organization, species, 2)
+    tree = Tree.objects.only("id", "review_state").first()
+
+    # when
+    tree.review_state = Tree.ReviewState.REJECTED
+    tree.save()
+
+    # then
+    assert get_rows() == [
+        (date(2024, 1, 1), None, "PENDING", "PENDING", 1, Decimal("2.50")),
+        (date(2024, 1, 1), None, "REJECTED", "PENDING", 1, Decimal("2.50")),
+    ]
+    assert_same_as_rebuilt()
+
+
+def test_update(organization: PlantingOrganization, species: Species) -> None:
+    # given
+    sponsor = baker.make(Sponsor)
+    make_trees(organization, species, 3, review_state=Tree.ReviewState.APPROVED)
+
+    # when
+    tree_ids = Tree.objects.values_list("id", flat=True)[:2]
+    Tree.objects.filter(id__in=list(tree_ids)).update(sponsor=sponsor)
+    Tree.objects.filter(sponsor=sponsor).update(minting_state=Tree.MintingState.MINTED)
+
+    # then
+    assert get_rows() == [
+        (date(2024, 1, 1), sponsor.pk, "APPROVED", "MINTED", 2, Decimal("5.00")),
+        (date(2024, 1, 1), None, "APPROVED", "PENDING", 1, Decimal("2.50")),
+    ]
+    assert TreeStats.objects.get_statistics() == {
+        "total": 3,
+        "pending": 0,
+        "approved": 3,
+        "rejected": 0,
+        "sponsored": 2,
+        "minted": 2,
+        "minted_cost_usd": Decimal("5.00"),
+    }
+    assert_same_as_rebuilt()
+
+
+def test_update_counts_trees_by_queryset(
+    organization: PlantingOrganization, species: Species
+) -> None:
+    # given
+    make_trees(organization, species, 3)
+
+    # when
+    with CaptureQueriesContext(connection) as queries:
+        Tree.objects.filter(review_state=Tree.ReviewState.PENDING).update(
+            review_state=Tree.ReviewState.APPROVED, planting_cost_usd=Decimal("1.01")
+        )
+
+    # then
+    # IDs of the updated trees aren't queried.
+    assert not any(" IN (" in query["sql"] for query in queries.captured_queries)
+    assert get_rows() == [
+        (date(2024, 1, 1), None, "APPROVED", "PENDING", 3, Decimal("3.03")),
+    ]
+    assert_same_as_rebuilt()
+
+
+def test_update_by_expression(
+    organization: PlantingOrganization, species: Species
+) -> None:
+    # given
+    make_trees(organization, species, 2)
+
+    # when
+    Tree.objects.update(planting_cost_usd=F("planting_cost_usd") * 2)
+
+    # then
+    assert get_rows() == [
+        (date(2024, 1, 1), None, "PENDING", "PENDING", 2, Decimal("10.00")),
+    ]
+    assert_same_as_rebuilt()
+
+
+def test_update_missing_row(
+    organization: PlantingOrganization, species: Species
+) -> None:
+    # given
+    make_trees(organization, species, 1)
+    TreeStats.objects.all().delete()
+
+    # when & then
+    with pytest.raises(TreeStats.DoesNotExist):
+        Tree.objects.update(review_state=Tree.ReviewState.APPROVED)
+    assert Tree.objects.get().review_state == Tree.ReviewState.PENDING
+
+
+def test_bulk_update(organization: PlantingOrganization, species: Species) -> None:
+    # given
+    trees = make_trees(organization, species, 2)
+
+    # when
+    for tree in trees:
+        tree.planting_cost_usd = Decimal("4.00")
+    Tree.objects.bulk_update(trees, ["planting_cost_usd"])
+
+    # then
+    assert get_rows() == [
+        (date(2024, 1, 1), None, "PENDING", "PENDING", 2, Decimal("8.00")),
+    ]
+
+
+def test_delete(organization: PlantingOrganization, species: Species) -> None:
+    # given
+    trees = make_trees(organization, species, 3)
+
+    # when
+    trees[0].delete()
+    Tree.objects.filter(id=trees[1].pk).delete()
+
+    # then
+    assert get_rows() == [
+        (date(2024, 1, 1), None, "PENDING", "PENDING", 1, Decimal("2.50")),
+    ]
+    Tree.objects.all().delete()
+    assert not TreeStats.objects.exists()
@@ -0,0 +1,149 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+import responses
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
+from model_bakery import baker
+
+import env
+from replant import nft
+from replant.models import History, NftIdCounter, Sponsor, Tree
+from replant.sdk import tx_receipts
+from replant.tests.consts import PIN_FILE_SUCCESS_RESPONSE
+from replant.tests.integrations.consts import (
+    IMAGE_CID,
+    SUCCESS_FILEBASE_UPLOAD_IMAGE_RESPONSE,
+)
+
+
+@pytest.fixture
+def mock_storage():
+    with mock.patch("boto3.client") as mock_boto_client, responses.RequestsMock() as r:
+        mock_s3 = mock.MagicMock()
+        mock_boto_client.return_value = mock_s3
+        mock_s3.put_object.return_value = SUCCESS_FILEBASE_UPLOAD_IMAGE_RESPONSE
+        r.add(
+            method="POST",
+            url=env.IPFS_PINNING_SERVICE_URL,
+            json=PIN_FILE_SUCCESS_RESPONSE,
+        )
+        yield mock_s3
+
+
+@pytest.fixture
+def mock_multi_mint():
+    with mock.patch.object(nft.cw721, "multi_mint") as multi_mint:
+        yield multi_mint
+
+
+@pytest.fixture
+def mock_tx_receipts():
+    with mock.patch.object(nft.tx_receipts, "get_tx_receipts") as get_tx_receipts:
+        get_tx_receipts.side_effect = lambda url, txs: {
+            tx_hash: tx_receipts.TxReceipt(tx_hash=tx_hash, code=0, raw_log="")
+            for tx_hash in txs
+        }
+        yield get_tx_receipts
+
+
+@pytest.fixture(autouse=True)
+def _no_nft_ids_on_chain():
+    with mock.patch.object(nft, "_get_highest_nft_id_on_chain", return_value=0):
+        yield
+
+
+def test_auto_mint_skips_trees_leased_by_other_process(
+    mock_storage: mock.MagicMock,
+    mock_multi_mint: mock.MagicMock,
+    mock_tx_receipts: mock.MagicMock,
+    simple_uploaded_file: SimpleUploadedFile,
+) -> None:
+    # mocks
+    mock_multi_mint.return_value = mock.Mock(tx_hash="TX")
+
+    # given
+    NftIdCounter.objects.reconcile(100)
+    sponsor = baker.make(Sponsor, wallet_address="sei1")
+    tree = baker.make(
+        Tree,
+        sponsor=sponsor,
+        review_state=Tree.ReviewState.APPROVED,
+        minting_state=Tree.MintingState.PENDING,
+        nft_id=None,
+        image=simple_uploaded_file,
+    )
+    leased_token = "5d5b3a1c-5f3e-4a55-8c3b-2f1f4a8c0d11"
+    leased_tree = baker.make(
+        Tree,
+        sponsor=sponsor,
+        review_state=Tree.ReviewState.APPROVED,
+        minting_state=Tree.MintingState.TO_BE_MINTED,
+        nft_id=None,
+        minting_lease_token=leased_token,
+        minting_lease_expires_at=timezone.now() + timedelta(minutes=1),
+    )
+
+    # when
+    call_command("auto_mint", "--all")
+
+    # then
+    tree.refresh_from_db()
+    assert tree.nft_id == 101
+    assert tree.metadata_cid == IMAGE_CID
+    assert tree.nft_mint_tx == "TX"
+    assert tree.minting_lease_token is None
+    mock_multi_mint.assert_called_once()
+    leased_tree.refresh_from_db()
+    assert leased_tree.minting_state == Tree.MintingState.TO_BE_MINTED
+    assert leased_tree.nft_id is None
+    assert str(leased_tree.minting_lease_token) == leased_token
+
+
+def test_auto_mint_confirms_batches(
+    mock_storage: mock.MagicMock,
+    mock_multi_mint: mock.MagicMock,
+    mock_tx_receipts: mock.MagicMock,
+    simple_uploaded_file: SimpleUploadedFile,
+) -> None:
+    # mocks
+    mock_multi_mint.side_effect = lambda owner, **kwargs: mock.Mock(
+        tx_hash=f"TX_{owner}"
+    )
+    mock_tx_receipts.side_effect = lambda url, txs: {
+        "TX_sei1": tx_receipts.TxReceipt(tx_hash="TX_sei1", code=0, raw_log=""),
+        "TX_sei2": tx_receipts.TxReceipt(
+            tx_hash="TX_sei2", code=5, raw_log="insufficient funds"
+        ),
+    }
+
+    # given
+    sponsors = baker.make(Sponsor, wallet_address=iter(["sei1", "sei2"]), _quantity=2)
+    for sponsor in sponsors:
+        baker.make(
+            Tree,
+            sponsor=sponsor,
+            review_state=Tree.ReviewState.APPROVED,
+            minting_state=Tree.MintingState.PENDING,
+            image=simple_uploaded_file,
+            _quantity=2,
+        )
+
+    # when
+    call_command("auto_mint", "--all")
+
+    # then
+    # One transaction per sponsor.
+    assert [
+        (call.kwargs["owner"], len(call.kwargs["tokens"]))
+        for call in mock_multi_mint.call_args_list
+    ] == [("sei1", 2), ("sei2", 2)]
+    assert set(
+        Tree.objects.values_list("sponsor__wallet_address", "minting_state")
+    ) == {("sei1", Tree.MintingState.MINTED), ("sei2", Tree.MintingState.FAILED)}
+    assert History.objects.filter(
+        event_type=History.EventType.MINTING_FAILED,
+        message__endswith=": insufficient funds",
+    ).exists()
@@ -1,26 +1,301 @@
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+import pytest
 from django.core import management
+from django.db.models import Sum
 from django.test import override_settings
+from django.utils import timezone
+from model_bakery import baker
 
-from replant import clustering
-from replant.models import Tree, TreesCluster
+from replant import clustering, nft, tree_tiles
+from replant.models import ClusteringRun, Tree, TreesCluster, TreesTile
+from replant.sdk import tx_receipts
 
 
-@override_settings(DEBUG=True)
-def test_clustering():
-    management.call_command("loaddata", "fixtures.json")
+def _generate_minted_trees(quantity: int):
     management.call_command(
         "generate_fake_data",
         planters=2,
         organizations=2,
         sponsors=2,
-        trees=100,
+        trees=quantity,
         planting_areas=10,
         minting_state=Tree.MintingState.MINTED,
     )
+
+
+def _trees_per_tiles():
+    totals: dict[int, int] = defaultdict(int)
+    for tile in TreesTile.objects.filter(kind=TreesTile.Kind.CLUSTERS):
+        totals[tile.zoom] += int(tree_tiles.unpack_tile(tile.data)["value"].sum())
+    return dict(totals)
+
+
+def _points_in_tiles():
+    return sum(
+        len(tree_tiles.unpack_tile(tile.data))
+        for tile in TreesTile.objects.filter(kind=TreesTile.Kind.POINTS)
+    )
+
+
+def _trees_per_zoom():
+    return dict(
+        TreesCluster.objects.values("zoom")
+        .annotate(total=Sum("number_of_trees"))
+        .values_list("zoom", "total")
+    )
+
+
+@override_settings(DEBUG=True)
+def test_clustering():
+    management.call_command("loaddata", "fixtures.json")
+    _generate_minted_trees(100)
     clustering.cluster_trees()
     assert TreesCluster.objects.count() > 0
+    assert _trees_per_tiles() == _trees_per_zoom()
+    assert _points_in_tiles() == 100
+
+
+@override_settings(DEBUG=True)
+def test_clustering_parallel():
+    management.call_command("loaddata", "fixtures.json")
+    _generate_minted_trees(100)
+    clustering.cluster_trees(max_zoom=4, workers=2)
+    assert _trees_per_zoom() == {1: 100, 2: 100, 3: 100, 4: 100}
 
 
 def test_clustering_no_trees():
     clustering.cluster_trees()
     assert TreesCluster.objects.count() == 0
+
+
+@override_settings(DEBUG=True)
+def test_clustering_incremental(time):
+    management.call_command("loaddata", "fixtures.json")
+    _generate_minted_trees(100)
+    clustering.cluster_trees(max_zoom=4)
+    assert _trees_per_zoom() == {1: 100, 2: 100, 3: 100, 4: 100}
+    cluster_ids = set(TreesCluster.objects.values_list("id", flat=True))
+
+    time.shift(timedelta(hours=1))
+    near = Tree.objects.first()
+    baker.make(
+        Tree,
+        minting_state=Tree.MintingState.MINTED,
+        latitude=near.latitude,
+        longitude=near.longitude,
+        tile_index=near.tile_index,
+        minted_at=timezone.now(),
+    )
+    baker.make(
+        Tree,
+        minting_state=Tree.MintingState.MINTED,
+        latitude=-80,
+        longitude=170,
+        tile_index=clustering.get_tree_tile_index(-80, 170),
+        minted_at=timezone.now(),
+    )
+    time.shift(timedelta(hours=1))
+
+    clustering.cluster_trees(max_zoom=4, incremental=True)
+
+    assert _trees_per_zoom() == {1: 102, 2: 102, 3: 102, 4: 102}
+    assert _trees_per_tiles() == _trees_per_zoom()
+    assert _points_in_tiles() == 102
+    # The far away tree gets its own cluster on every zoom.
+    assert (
+        TreesCluster.objects.filter(
+            latitude=-80, longitude=170, number_of_trees=1
+        ).count()
+        == 4
+    )
+    # Clusters are updated in place.
+    assert cluster_ids <= set(TreesCluster.objects.values_list("id", flat=True))
+
+    last_run = ClusteringRun.objects.get_last_finished()
+    assert last_run.is_incremental
+    assert last_run.number_of_trees == 2
+
+
+def test_clustering_incremental_without_previous_run():
+    baker.make(
+        Tree,
+        minting_state=Tree.MintingState.MINTED,
+        latitude=10,
+        longitude=10,
+        minted_at=timezone.now(),
+    )
+
+    clustering.cluster_trees(max_zoom=2, incremental=True)
+
+    assert _trees_per_zoom() == {1: 1, 2: 1}
+    assert not ClusteringRun.objects.get().is_incremental
+
+
+def test_clustering_incremental_submitted_before_run(time):
+    sponsor = baker.make("replant.Sponsor")
+    tree = baker.make(
+        Tree,
+        sponsor=sponsor,
+        minting_state=Tree.MintingState.SUBMITTED,
+        nft_mint_tx="TX",
+        latitude=10,
+        longitude=10,
+        tile_index=clustering.get_tree_tile_index(10, 10),
+        minted_at=timezone.now(),
+    )
+    time.shift(timedelta(hours=1))
+    clustering.cluster_trees(max_zoom=2)
+    assert _trees_per_zoom() == {}
+
+    time.shift(timedelta(hours=1))
+    nft._save_tx_receipt("TX", tx_receipts.TxReceipt(tx_hash="TX", code=0, raw_log=""))
+    time.shift(timedelta(hours=1))
+    clustering.cluster_trees(max_zoom=2, incremental=True)
+
+    tree.refresh_from_db()
+    assert tree.minting_state == Tree.MintingState.MINTED
+    assert _trees_per_zoom() == {1: 1, 2: 1}
+    assert _points_in_tiles() == 1
+
+
+def test_clustering_tree_minted_during_full_run(time):
+    baker.make(
+        Tree,
+        minting_state=Tree.MintingState.MINTED,
+        latitude=10,
+        longitude=10,
+        minted_at=iter([timezone.now(), timezone.now() + timedelta(minutes=1)]),
+        _quantity=2,
+    )
+    clustering.cluster_trees(max_zoom=2)
+    assert _trees_per_zoom() == {1: 1, 2: 1}
+
+    time.shift(timedelta(hours=1))
+    clustering.cluster_trees(max_zoom=2, incremental=True)
+
+    assert _trees_per_zoom() == {1: 2, 2: 2}
+
+
+def test_merge_close_clusters():
+    clusters, labels, counter = clustering._merge_close_clusters(
+        [(0, 0), (0, 1), (10, 10), (10, 10.5)],
+        [0, 0, 1, 3, 3, 3],
+        [2, 1, 0, 3],
+        min_distance=2,
+    )
+
+    assert clusters == [(10.0, 10.5), (0.0, 1 / 3)]
+    assert labels.tolist() == [-2, -2, -2, -1, -1, -1]
+    assert counter == {0: 3, 1: 3}
+
+
+def test_fetch_points():
+    baker.make(
+        Tree,
+        minting_state=Tree.MintingState.MINTED,
+        latitude=iter([10, 20, 30]),
+        longitude=iter([-10, -20, -30]),
+        _quantity=3,
+    )
+    baker.make(Tree, minting_state=Tree.MintingState.PENDING)
+
+    points = clustering._fetch_points(clustering.fetch_trees_data().order_by("id"))
+
+    assert points.dtype == np.float64
+    assert points.tolist() == [[10, -10], [20, -20], [30, -30]]
+
+
+def test_split_items_by_label():
+    items = np.array([[0, 0], [1, 1], [2, 2], [3, 3]], dtype=float)
+
+    groups = clustering._split_items_by_label(items, np.array([-2, -1, -2, -1]), 2)
+
+    assert [group.tolist() for group in groups] == [
+        [[1, 1], [3, 3]],
+        [[0, 0], [2, 2]],
+    ]
+    assert all(np.shares_memory(group, items) for group in groups)
+
+
+def test_is_within_distance():
+    square = np.array([[0, 0], [0, 3], [3, 0], [3, 3], [1, 2]], dtype=float)
+    line = np.array([[0, 0], [1, 1], [2, 2]], dtype=float)
+
+    assert clustering._is_within_distance(square[:1], 0.1)
+    assert clustering._is_within_distance(square, 4.25)
+    assert not clustering._is_within_distance(square, 4.24)
+    assert not clustering._is_within_distance(square, 3)
+    assert clustering._is_within_distance(line, 2.83)
+    assert not clustering._is_within_distance(line, 2.82)
+
+
+def test_tile_index():
+    assert clustering._get_tile_index_from_xy(0, 0) == 0
+    assert clustering._get_tile_index_from_xy(1, 0) == 1
+    assert clustering._get_tile_index_from_xy(0, 1) == 2
+    assert clustering._get_tile_index_from_xy(3, 5) == 0b100111
+    assert clustering.get_tile_index_from_grid_index(5 * 16 + 3, zoom=3) == 0b100111
+
+    # Tiles of the next zoom inside a tile form one contiguous range.
+    parent = clustering._get_tile_index(-20, 40, zoom=3)
+    children = {
+        clustering._get_tile_index(-20 + lat / 2, 40 + lon / 2, zoom=4)
+        for lat in range(-50, 50)
+        for lon in range(-50, 50)
+        if clustering._get_tile_index(-20 + lat / 2, 40 + lon / 2, zoom=3) == parent
+    }
+    assert children == set(range(16 * parent, 16 * parent + 16))
+
+    # Zooms above the 32 bit range work.
+    assert clustering._get_tile_index(90, 180, zoom=16) > 2**32
+
+
+def test_tile_grid_bounds():
+    # Rows of the north pole tiles are the last ones of the grid.
+    assert clustering.get_tile_index_from_grid_index(
+        4 * 2 + 3, zoom=2
+    ) == clustering._get_tile_index(90, 179, zoom=2)
+    for grid_index, zoom in [
+        (-1, 2),
+        (4 * 3, 2),
+        (0, 0),
+        (0, clustering.TREE_ZOOM + 1),
+    ]:
+        with pytest.raises(ValueError):
+            clustering.get_tile_index_from_grid_index(grid_index, zoom=zoom)
+
+    # Tiles around the north pole are only the ones below it.
+    assert sorted(clustering._get_tile_neighbourhood(90, 0, zoom=2)) == sorted(
+        clustering._get_tile_index_from_xy(x, y) for x in (1, 2, 3) for y in (1, 2)
+    )
+
+
+def test_get_tile_index_ranges():
+    # A whole tile of the previous zoom is a single range.
+    ranges = clustering.get_tile_index_ranges(
+        -22.4, 0.1, -0.1, 22.4, zoom=4, max_tiles=1000
+    )
+    parent = clustering._get_tile_index(-11, 11, zoom=3)
+    assert ranges == [(16 * parent, 16 * parent + 15)]
+
+    with pytest.raises(ValueError):
+        clustering.get_tile_index_ranges(-90, -180, 90, 180, zoom=4, max_tiles=1000)
+
+
+def test_clustering_skipped_while_another_run_holds_lock(monkeypatch):
+    baker.make(
+        Tree,
+        minting_state=Tree.MintingState.MINTED,
+        latitude=10,
+        longitude=10,
+        minted_at=timezone.now(),
+    )
+    monkeypatch.setattr(clustering, "_lock_clustering", lambda wait: wait)
+
+    clustering.cluster_trees(max_zoom=2, incremental=True)
+
+    assert not ClusteringRun.objects.exists()
+    assert not TreesCluster.objects.exists()
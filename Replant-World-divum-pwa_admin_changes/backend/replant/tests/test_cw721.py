@@ -0,0 +1,165 @@
+from unittest import mock
+
+import pytest
+from cosmpy.aerial.client import Account
+from cosmpy.aerial.exceptions import BroadcastError
+from cosmpy.aerial.wallet import LocalWallet
+
+from replant.sdk.cw721 import CW721Client
+
+CONTRACT_ADDRESS = "sei13hxtue98v4vzs25r8j5l0n3wukj6h05k73syguy8gs49jexhx2hqxslrx6"
+
+
+@pytest.fixture
+def admin() -> LocalWallet:
+    return LocalWallet.generate(prefix="sei")
+
+
+@pytest.fixture
+def ledger_client() -> mock.MagicMock:
+    client = mock.MagicMock()
+    client.network_config.chain_id = "atlantic-2"
+    # The sequence on chain grows by 10 with every query.
+    client.query_account.side_effect = lambda address: Account(
+        address=address, number=7, sequence=client.query_account.call_count * 10
+    )
+    return client
+
+
+def _mock_broadcast(errors: list[Exception | None]):
+    """Mock broadcasting, the n-th broadcast raises the n-th error if it's given.
+
+    Returns the patch and the sequences the transactions were signed with.
+    """
+    sequences: list[int] = []
+
+    def broadcast(client, tx, sender, account: Account, gas_limit: int):
+        sequences.append(account.sequence)
+        if len(sequences) <= len(errors) and errors[len(sequences) - 1]:
+            raise errors[len(sequences) - 1]
+        return mock.Mock(tx_hash=f"TX{len(sequences)}")
+
+    return (
+        mock.patch(
+            "replant.sdk.cw721.prepare_and_broadcast_basic_transaction",
+            side_effect=broadcast,
+        ),
+        sequences,
+    )
+
+
+def test_multi_mint_increments_sequence(
+    admin: LocalWallet, ledger_client: mock.MagicMock
+) -> None:
+    # given
+    cw721 = CW721Client(ledger_client, CONTRACT_ADDRESS)
+    patch, sequences = _mock_broadcast(errors=[])
+
+    # when
+    with patch:
+        for token_id in ["1", "2", "3"]:
+            cw721.multi_mint(admin, owner="sei1", tokens=[{"token_id": token_id}])
+
+    # then
+    assert sequences == [10, 11, 12]
+    assert ledger_client.query_account.call_count == 1
+
+
+def test_multi_mint_resyncs_sequence_on_mismatch(
+    admin: LocalWallet, ledger_client: mock.MagicMock
+) -> None:
+    # given
+    cw721 = CW721Client(ledger_client, CONTRACT_ADDRESS)
+    mismatch = BroadcastError("HASH", "account sequence mismatch, expected 20, got 11")
+    patch, sequences = _mock_broadcast(errors=[None, mismatch])
+
+    # when
+    with patch:
+        cw721.multi_mint(admin, owner="sei1", tokens=[{"token_id": "1"}])
+        tx = cw721.multi_mint(admin, owner="sei1", tokens=[{"token_id": "2"}])
+
+    # then
+    assert tx.tx_hash == "TX3"
+    assert sequences == [10, 11, 20]
+
+
+def test_multi_mint_keeps_sequence_when_rejected(
+    admin: LocalWallet, ledger_client: mock.MagicMock
+) -> None:
+    # given
+    cw721 = CW721Client(ledger_client, CONTRACT_ADDRESS)
+    patch, sequences = _mock_broadcast(errors=[BroadcastError("HASH", "out of gas")])
+
+    # when
+    with patch:
+        with pytest.raises(BroadcastError):
+            cw721.multi_mint(admin, owner="sei1", tokens=[{"token_id": "1"}])
+        cw721.multi_mint(admin, owner="sei1", tokens=[{"token_id": "1"}])
+
+    # then
+    assert sequences == [10, 10]
+
+
+def test_multi_mint_simulates_gas_per_token(
+    admin: LocalWallet, ledger_client: mock.MagicMock
+) -> None:
+    # given
+    # Gas used by minting 2 tokens and then the first of them.
+    ledger_client.simulate_tx.side_effect = [1000, 700]
+    cw721 = CW721Client(ledger_client, CONTRACT_ADDRESS)
+    patch, _ = _mock_broadcast(errors=[])
+
+    # when
+    with patch as broadcast:
+        cw721.multi_mint(admin, "sei1", tokens=[{"token_id": "1"}, {"token_id": "2"}])
+        cw721.multi_mint(admin, "sei1", tokens=[{"token_id": str(i)} for i in range(3)])
+        cw721.multi_mint(admin, "sei1", tokens=[{"token_id": "4"}])
+
+    # then
+    assert ledger_client.simulate_tx.call_count == 2
+    assert (cw721.base_gas, cw721.gas_per_token) == (520, 390)
+    # A single token needs the base gas of a transaction too.
+    assert [call.kwargs["gas_limit"] for call in broadcast.call_args_list] == [
+        1300,
+        1690,
+        910,
+    ]
+    assert cw721.max_multi_mint_tokens(10_000) == 24
+
+
+def test_multi_mint_simulates_single_tokens(
+    admin: LocalWallet, ledger_client: mock.MagicMock
+) -> None:
+    # given
+    ledger_client.simulate_tx.side_effect = [700, 710]
+    cw721 = CW721Client(ledger_client, CONTRACT_ADDRESS)
+    patch, _ = _mock_broadcast(errors=[])
+
+    # when
+    with patch as broadcast:
+        cw721.multi_mint(admin, "sei1", tokens=[{"token_id": "1"}])
+        cw721.multi_mint(admin, "sei1", tokens=[{"token_id": "2"}])
+
+    # then
+    assert cw721.gas_per_token is None
+    assert cw721.max_multi_mint_tokens(10_000) is None
+    assert [call.kwargs["gas_limit"] for call in broadcast.call_args_list] == [
+        910,
+        923,
+    ]
+
+
+def test_multi_mint_fixed_gas_per_token(
+    admin: LocalWallet, ledger_client: mock.MagicMock
+) -> None:
+    # given
+    cw721 = CW721Client(ledger_client, CONTRACT_ADDRESS, gas_per_token=300_000)
+    patch, _ = _mock_broadcast(errors=[])
+
+    # when
+    with patch as broadcast:
+        cw721.multi_mint(admin, "sei1", tokens=[{"token_id": "1"}, {"token_id": "2"}])
+
+    # then
+    ledger_client.simulate_tx.assert_not_called()
+    assert broadcast.call_args.kwargs["gas_limit"] == 600_000
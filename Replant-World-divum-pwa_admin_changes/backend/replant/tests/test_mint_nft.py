@@ -0,0 +1,352 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+import responses
+from cosmpy.aerial.exceptions import BroadcastError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from model_bakery import baker
+from time_machine import TimeMachineFixture
+
+import env
+from replant import nft
+from replant.models import History, NftIdCounter, Sponsor, Tree
+from replant.sdk import MintInfo, tx_receipts
+from replant.tests.consts import PIN_FILE_SUCCESS_RESPONSE
+from replant.tests.integrations.consts import (
+    IMAGE_CID,
+    SUCCESS_FILEBASE_UPLOAD_IMAGE_RESPONSE,
+)
+
+
+@pytest.fixture
+def mock_storage():
+    with mock.patch("boto3.client") as mock_boto_client, responses.RequestsMock() as r:
+        mock_s3 = mock.MagicMock()
+        mock_boto_client.return_value = mock_s3
+        mock_s3.put_object.return_value = SUCCESS_FILEBASE_UPLOAD_IMAGE_RESPONSE
+        r.add(
+            method="POST",
+            url=env.IPFS_PINNING_SERVICE_URL,
+            json=PIN_FILE_SUCCESS_RESPONSE,
+        )
+        yield mock_s3
+
+
+@pytest.fixture
+def mock_multi_mint():
+    with mock.patch.object(nft.cw721, "multi_mint") as multi_mint:
+        yield multi_mint
+
+
+def _make_trees_to_mint(
+    sponsor: Sponsor, simple_uploaded_file: SimpleUploadedFile, quantity: int
+) -> list[Tree]:
+    return baker.make(
+        Tree,
+        sponsor=sponsor,
+        nft_id=None,
+        image=simple_uploaded_file,
+        minting_state=Tree.MintingState.TO_BE_MINTED,
+        _quantity=quantity,
+    )
+
+
+def test_mint_scheduled_nfts(
+    mock_storage: mock.MagicMock,
+    mock_multi_mint: mock.MagicMock,
+    simple_uploaded_file: SimpleUploadedFile,
+) -> None:
+    # mocks
+    mock_multi_mint.side_effect = lambda **kwargs: mock.Mock(
+        tx_hash=f"TX{mock_multi_mint.call_count}"
+    )
+
+    # given
+    NftIdCounter.objects.reconcile(100)
+    sponsors = baker.make(Sponsor, wallet_address=iter(["sei1", "sei2"]), _quantity=2)
+    _make_trees_to_mint(sponsors[0], simple_uploaded_file, quantity=nft.SIZE_PER_ROUND)
+    _make_trees_to_mint(sponsors[1], simple_uploaded_file, quantity=10)
+    baker.make(Tree, minting_state=Tree.MintingState.PENDING)
+
+    # when
+    nft.mint_scheduled_nfts()
+
+    # then
+    submitted = Tree.objects.filter(minting_state=Tree.MintingState.SUBMITTED)
+    assert submitted.count() == nft.SIZE_PER_ROUND + 10
+    assert set(submitted.values_list("nft_id", flat=True)) == set(
+        range(101, 101 + nft.SIZE_PER_ROUND + 10)
+    )
+    assert set(submitted.values_list("metadata_cid", flat=True)) == {IMAGE_CID}
+    assert set(submitted.values_list("nft_mint_tx", flat=True)) == {"TX1", "TX2"}
+    assert set(submitted.values_list("minted_at", flat=True)) == {timezone.now()}
+    assert not submitted.filter(minting_lease_token__isnull=False).exists()
+    # A round of trees of the first sponsor, then the rest.
+    assert [call.kwargs["owner"] for call in mock_multi_mint.call_args_list] == [
+        "sei1",
+        "sei2",
+    ]
+    # Minting is finished once the transactions are confirmed.
+    assert not History.objects.filter(
+        event_type=History.EventType.MINTING_SUCCEED
+    ).exists()
+
+
+def test_mint_scheduled_nfts_minting_failed(
+    mock_storage: mock.MagicMock,
+    mock_multi_mint: mock.MagicMock,
+    simple_uploaded_file: SimpleUploadedFile,
+) -> None:
+    # given
+    sponsors = baker.make(Sponsor, wallet_address=iter(["sei1", "sei2"]), _quantity=2)
+    failing_trees = _make_trees_to_mint(sponsors[0], simple_uploaded_file, quantity=2)
+    trees = _make_trees_to_mint(sponsors[1], simple_uploaded_file, quantity=2)
+
+    # mocks
+    def multi_mint(owner: str, **kwargs):
+        if owner == "sei1":
+            raise RuntimeError("Out of funds")
+        return mock.Mock(tx_hash="TX")
+
+    mock_multi_mint.side_effect = multi_mint
+
+    # when
+    nft.mint_scheduled_nfts()
+
+    # then
+    for tree in failing_trees:
+        tree.refresh_from_db()
+        assert tree.minting_state == Tree.MintingState.FAILED
+        assert tree.metadata_cid == IMAGE_CID
+    for tree in trees:
+        tree.refresh_from_db()
+        assert tree.minting_state == Tree.MintingState.SUBMITTED
+    failure = History.objects.get(event_type=History.EventType.MINTING_FAILED)
+    assert failure.message == f"Minting for sponsor {sponsors[0].name} (2 trees)"
+    assert "Out of funds" in failure.details
+
+
+def test_mint_scheduled_nfts_splits_rejected_batch(
+    mock_storage: mock.MagicMock,
+    mock_multi_mint: mock.MagicMock,
+    simple_uploaded_file: SimpleUploadedFile,
+) -> None:
+    # given
+    NftIdCounter.objects.reconcile(100)
+    sponsor = baker.make(Sponsor, wallet_address="sei1")
+    _make_trees_to_mint(sponsor, simple_uploaded_file, quantity=4)
+
+    # mocks
+    def multi_mint(tokens: list[MintInfo], **kwargs):
+        if {"token_id": "103", "token_uri": mock.ANY} in tokens:
+            raise BroadcastError("HASH", "token_id already claimed")
+        return mock.Mock(tx_hash=f"TX{tokens[0]['token_id']}")
+
+    mock_multi_mint.side_effect = multi_mint
+
+    # when
+    nft.mint_scheduled_nfts()
+
+    # then
+    assert dict(Tree.objects.values_list("nft_id", "nft_mint_tx")) == {
+        101: "TX101",
+        102: "TX101",
+        103: "",
+        104: "TX104",
+    }
+    assert Tree.objects.get(nft_id=103).minting_state == Tree.MintingState.FAILED
+    failure = History.objects.get(event_type=History.EventType.MINTING_FAILED)
+    assert failure.message == (
+        f"Minting for sponsor {sponsor.name} (1 trees): token_id already claimed"
+    )
+    assert [len(call.kwargs["tokens"]) for call in mock_multi_mint.call_args_list] == [
+        4,
+        2,
+        2,
+        1,
+        1,
+    ]
+
+
+def test_confirm_submitted_nfts(time: TimeMachineFixture) -> None:
+    # given
+    sponsor = baker.make(Sponsor, name="Sponsor")
+    for tx_hash in ["MINTED", "FAILED", "PENDING", "DROPPED"]:
+        baker.make(
+            Tree,
+            sponsor=sponsor,
+            minting_state=Tree.MintingState.SUBMITTED,
+            nft_mint_tx=tx_hash,
+            minted_at=timezone.now(),
+            _quantity=2,
+        )
+    time.shift(timedelta(seconds=env.MINT_RECEIPT_TIMEOUT_SECONDS + 1))
+    Tree.objects.filter(nft_mint_tx="PENDING").update(minted_at=timezone.now())
+
+    # mocks
+    txs_url = f"{tx_receipts.get_rest_url(env.SEI_RPC)}/cosmos/tx/v1beta1/txs"
+    with responses.RequestsMock() as r:
+        r.get(f"{txs_url}/MINTED", json={"tx_response": {"code": 0, "raw_log": ""}})
+        r.get(
+            f"{txs_url}/FAILED",
+            json={"tx_response": {"code": 5, "raw_log": "insufficient funds"}},
+        )
+        r.get(f"{txs_url}/PENDING", status=404)
+        r.get(f"{txs_url}/DROPPED", status=404)
+
+        # when
+        pending = nft.confirm_submitted_nfts()
+
+    # then
+    assert pending == 1
+    assert dict(
+        Tree.objects.values_list("nft_mint_tx", "minting_state").distinct()
+    ) == {
+        "MINTED": Tree.MintingState.MINTED,
+        "FAILED": Tree.MintingState.FAILED,
+        "PENDING": Tree.MintingState.SUBMITTED,
+        "DROPPED": Tree.MintingState.FAILED,
+    }
+    success = History.objects.get(event_type=History.EventType.MINTING_SUCCEED)
+    assert success.message == "Minted 2 NFTs"
+    failures = History.objects.filter(event_type=History.EventType.MINTING_FAILED)
+    assert {failure.message for failure in failures} == {
+        "Minting for sponsor Sponsor (2 trees): insufficient funds",
+        "Minting for sponsor Sponsor (2 trees)",
+    }
+    assert failures.filter(details__contains="wasn't included in a block").exists()
+
+
+@mock.patch.object(nft.cw721, "base_gas", 500)
+@mock.patch.object(nft.cw721, "gas_per_token", 100)
+def test_confirm_submitted_nfts_out_of_gas() -> None:
+    # given
+    sponsor = baker.make(Sponsor, name="Sponsor")
+    for tx_hash in ["OUT_OF_GAS", "OUT_OF_BLOCK_GAS"]:
+        baker.make(
+            Tree,
+            sponsor=sponsor,
+            minting_state=Tree.MintingState.SUBMITTED,
+            nft_mint_tx=tx_hash,
+            minted_at=timezone.now(),
+            metadata_cid="CID",
+            _quantity=2,
+        )
+
+    # mocks
+    txs_url = f"{tx_receipts.get_rest_url(env.SEI_RPC)}/cosmos/tx/v1beta1/txs"
+    with responses.RequestsMock() as r:
+        r.get(
+            f"{txs_url}/OUT_OF_GAS",
+            json={
+                "tx_response": {
+                    "code": 11,
+                    "raw_log": "out of gas",
+                    "gas_wanted": "700",
+                    "gas_used": "770",
+                }
+            },
+        )
+        r.get(
+            f"{txs_url}/OUT_OF_BLOCK_GAS",
+            json={
+                "tx_response": {
+                    "code": 11,
+                    "raw_log": "out of gas",
+                    "gas_wanted": str(env.SEI_BLOCK_GAS_LIMIT),
+                    "gas_used": str(env.SEI_BLOCK_GAS_LIMIT + 1),
+                }
+            },
+        )
+
+        # when
+        pending = nft.confirm_submitted_nfts()
+
+    # then
+    assert pending == 0
+    # Trees are minted again with more gas.
+    assert set(
+        Tree.objects.values_list("minting_state", "nft_mint_tx", "minted_at")
+    ) == {
+        (Tree.MintingState.TO_BE_MINTED, "", None),
+        (Tree.MintingState.FAILED, "OUT_OF_BLOCK_GAS", timezone.now()),
+    }
+    # By `GAS_ADJUSTMENT` over the gas used at least.
+    assert nft.cw721.base_gas >= 500 * 770 / 700 * 1.3
+    assert nft.cw721.gas_per_token >= 100 * 770 / 700 * 1.3
+    assert nft._claim_trees(metadata_cid__gt="")
+    failure = History.objects.get(event_type=History.EventType.MINTING_FAILED)
+    assert failure.message == "Minting for sponsor Sponsor (2 trees) (out of gas)"
+
+
+def test_claim_trees_skips_leased_trees(time: TimeMachineFixture) -> None:
+    # given
+    trees = baker.make(
+        Tree, minting_state=Tree.MintingState.TO_BE_MINTED, nft_id=None, _quantity=3
+    )
+    first_round = nft._claim_trees(nft_id__isnull=True)
+
+    # when
+    second_round = nft._claim_trees(nft_id__isnull=True)
+
+    # then
+    assert {tree.id for tree in first_round} == {tree.id for tree in trees}
+    assert second_round == []
+    for tree in trees:
+        tree.refresh_from_db()
+        assert tree.minting_lease_token == first_round[0].minting_lease_token
+        assert tree.minting_lease_expires_at == timezone.now() + timedelta(
+            seconds=env.MINT_LEASE_SECONDS
+        )
+
+
+def test_claim_trees_reclaims_expired_leases(time: TimeMachineFixture) -> None:
+    # given
+    tree = baker.make(Tree, minting_state=Tree.MintingState.TO_BE_MINTED, nft_id=None)
+    [stale] = nft._claim_trees(nft_id__isnull=True)
+    time.shift(timedelta(seconds=env.MINT_LEASE_SECONDS))
+
+    # when
+    [reclaimed] = nft._claim_trees(nft_id__isnull=True)
+
+    # then
+    assert reclaimed.id == tree.id
+    assert reclaimed.minting_lease_token != stale.minting_lease_token
+    # The process that lost the lease doesn't release the new one.
+    nft._release_trees([stale])
+    tree.refresh_from_db()
+    assert tree.minting_lease_token == reclaimed.minting_lease_token
+    nft._release_trees([reclaimed])
+    tree.refresh_from_db()
+    assert tree.minting_lease_token is None
+    assert tree.minting_lease_expires_at is None
+
+
+def test_lease_expired_mid_round(time: TimeMachineFixture) -> None:
+    # given
+    baker.make(
+        Tree,
+        minting_state=Tree.MintingState.TO_BE_MINTED,
+        metadata_cid="CID",
+        _quantity=2,
+    )
+    stale_round = nft._claim_trees(metadata_cid__gt="")
+    time.shift(timedelta(seconds=env.MINT_LEASE_SECONDS))
+    reclaimed = nft._claim_trees(metadata_cid__gt="")
+
+    # when
+    nft._save_minting_results(
+        [
+            ("Minting", stale_round[:1], mock.Mock(tx_hash="TX")),
+            ("Minting", stale_round[1:], RuntimeError("Out of funds")),
+        ]
+    )
+    nft._release_trees(stale_round)
+
+    # then
+    assert set(
+        Tree.objects.values_list("minting_state", "nft_mint_tx", "minting_lease_token")
+    ) == {(Tree.MintingState.TO_BE_MINTED, "", reclaimed[0].minting_lease_token)}
+    assert not History.objects.exists()
@@ -0,0 +1,68 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+from model_bakery import baker
+
+import env
+from replant import mint_notifications
+from replant.models import Tree
+
+
+@pytest.fixture
+def mock_clock():
+    """Make sleeping in the polling loop only move a fake monotonic clock."""
+    now = 0.0
+
+    def sleep(seconds: float):
+        nonlocal now
+        now += seconds
+
+    with mock.patch.object(mint_notifications, "time") as mock_time:
+        mock_time.monotonic.side_effect = lambda: now
+        mock_time.sleep.side_effect = sleep
+        yield mock_time
+
+
+def test_wait_for_trees_to_mint_timeout(mock_clock: mock.MagicMock) -> None:
+    # given
+    baker.make(Tree, minting_state=Tree.MintingState.MINTED)
+
+    # when
+    scheduled = mint_notifications.wait_for_trees_to_mint(timeout=12)
+
+    # then
+    assert scheduled is False
+    assert [call.args[0] for call in mock_clock.sleep.call_args_list] == [
+        env.MINT_FOREVER_POLL_INTERVAL_SECONDS,
+        env.MINT_FOREVER_POLL_INTERVAL_SECONDS,
+        12 - 2 * env.MINT_FOREVER_POLL_INTERVAL_SECONDS,
+    ]
+
+
+def test_wait_for_trees_to_mint_scheduled(mock_clock: mock.MagicMock) -> None:
+    # given
+    baker.make(Tree, minting_state=Tree.MintingState.TO_BE_MINTED)
+
+    # when
+    scheduled = mint_notifications.wait_for_trees_to_mint(timeout=60)
+
+    # then
+    assert scheduled is True
+    assert mock_clock.sleep.call_count == 1
+
+
+def test_wait_for_trees_to_mint_leased(mock_clock: mock.MagicMock) -> None:
+    # given
+    baker.make(
+        Tree,
+        minting_state=Tree.MintingState.TO_BE_MINTED,
+        minting_lease_expires_at=timezone.now() + timedelta(minutes=5),
+    )
+
+    # when
+    scheduled = mint_notifications.wait_for_trees_to_mint(timeout=12)
+
+    # then
+    assert scheduled is False
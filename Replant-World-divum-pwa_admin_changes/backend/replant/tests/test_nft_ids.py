@@ -0,0 +1,60 @@
+from unittest import mock
+
+from model_bakery import baker
+
+from replant import nft
+from replant.models import NftIdCounter, Tree
+
+
+@mock.patch.object(nft.cw721, "token_exists")
+@mock.patch.object(nft.cw721, "num_tokens")
+def test_reconcile_nft_ids(
+    mock_num_tokens: mock.MagicMock, mock_token_exists: mock.MagicMock
+) -> None:
+    # mocks
+    mock_num_tokens.return_value = 20
+    mock_token_exists.side_effect = lambda token_id: int(token_id) <= 37
+
+    # given
+    baker.make(Tree, nft_id=30)
+
+    # when
+    nft.reconcile_nft_ids()
+
+    # then
+    assert NftIdCounter.objects.get().last_nft_id == 37
+    assert mock_token_exists.call_count < 10
+
+
+@mock.patch.object(nft.cw721, "num_tokens")
+def test_reconcile_nft_ids_chain_unavailable(mock_num_tokens: mock.MagicMock) -> None:
+    # mocks
+    mock_num_tokens.side_effect = ConnectionError
+
+    # given
+    baker.make(Tree, nft_id=30)
+
+    # when
+    nft.reconcile_nft_ids()
+
+    # then
+    assert NftIdCounter.objects.get().last_nft_id == 30
+
+
+def test_generate_nft_id() -> None:
+    # given
+    NftIdCounter.objects.reconcile(5)
+    baker.make(
+        Tree,
+        nft_id=iter([None, 3, None]),
+        minting_state=Tree.MintingState.TO_BE_MINTED,
+        _quantity=3,
+    )
+    trees = nft._claim_trees()
+
+    # when
+    nft._generate_nft_id(trees)
+
+    # then
+    assert [tree.nft_id for tree in trees] == [6, 3, 7]
+    assert sorted(Tree.objects.values_list("nft_id", flat=True)) == [3, 6, 7]
@@ -0,0 +1,95 @@
+import io
+
+import numpy as np
+import pytest
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from PIL import Image
+
+import env
+from replant import nft_images
+from replant.nft_images import ImageFormat
+
+
+def _make_photo(width: int, height: int, format_name: str = "JPEG") -> bytes:
+    # Noise is hard to compress, like details of photos.
+    pixels = np.random.default_rng(0).integers(0, 256, (height, width, 3), np.uint8)
+    stream = io.BytesIO()
+    Image.fromarray(pixels).save(stream, format_name)
+    return stream.getvalue()
+
+
+@pytest.mark.parametrize("name", ["PNG", "WEBP"])
+def test_make_nft_image(name: str) -> None:
+    # given
+    source = _make_photo(2048, 1536)
+
+    # when
+    content = nft_images.make_nft_image(source, ImageFormat(name=name))
+
+    # then
+    image = Image.open(io.BytesIO(content))
+    assert image.format == name
+    assert image.size == (512, 384)
+
+
+def test_make_nft_image_max_bytes() -> None:
+    # given
+    source = _make_photo(512, 512, "PNG")
+    lower_quality = nft_images.make_nft_image(
+        source, ImageFormat(name="WEBP", quality=60)
+    )
+    image_format = ImageFormat(name="WEBP", quality=80, max_bytes=len(lower_quality))
+
+    # when
+    content = nft_images.make_nft_image(source, image_format)
+
+    # then
+    assert content == lower_quality
+
+
+def test_make_nft_image_max_bytes_min_quality() -> None:
+    # given
+    source = _make_photo(512, 512, "PNG")
+    min_quality = nft_images.make_nft_image(
+        source, ImageFormat(name="WEBP", quality=nft_images.MIN_QUALITY)
+    )
+
+    # when
+    content = nft_images.make_nft_image(source, ImageFormat(name="WEBP", max_bytes=1))
+
+    # then
+    assert content == min_quality
+
+
+def test_get_nft_image_name() -> None:
+    # given
+    source = b"image"
+
+    # when & then
+    assert nft_images.get_nft_image_name(source, ImageFormat(name="PNG")) == (
+        "6105d6cc76af400325e94d588ce511be5bfdbb73b437dc51eca43917d7a43e3d_512x1024.png"
+    )
+    assert nft_images.get_nft_image_name(
+        source, ImageFormat(name="WEBP", quality=70, max_bytes=1000)
+    ) == (
+        "6105d6cc76af400325e94d588ce511be5bfdbb73b437dc51eca43917d7a43e3d"
+        "_512x1024_q70_1000.webp"
+    )
+
+
+def test_check_image_format() -> None:
+    nft_images.check_image_format(ImageFormat(name="WEBP"))
+    with pytest.raises(ValueError, match="can't be encoded as 'WEPB'"):
+        nft_images.check_image_format(ImageFormat(name="WEPB"))
+
+
+def test_unsupported_image_format_fails_startup(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # given
+    monkeypatch.setattr(env, "NFT_IMAGE_FORMAT", "WEPB")
+
+    # when & then
+    with pytest.raises(ImproperlyConfigured, match="'WEPB'"):
+        apps.get_app_config("replant").ready()
@@ -0,0 +1,203 @@
+import io
+from datetime import timedelta
+
+import openpyxl
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+from model_bakery import baker
+from time_machine import TimeMachineFixture
+
+from replant import reports
+from replant.models import ReportJob, Species, Tree, User
+
+BASE_URL = "http://testserver/"
+MAX_ATTEMPTS = 3
+
+
+def make_job(**kwargs) -> ReportJob:
+    return baker.make(ReportJob, base_url=BASE_URL, **kwargs)
+
+
+def test_dashboard_report() -> None:
+    # given
+    species = baker.make(Species, common_name="Oak", iucn_status="LC")
+    baker.make(Tree, species=species, review_state="APPROVED", _quantity=3)
+    baker.make(Tree, review_state="PENDING")
+    job = make_job(kind=ReportJob.Kind.DASHBOARD, params={"species_id": species.pk})
+
+    # when
+    reports.run_report_job(job)
+
+    # then
+    job.refresh_from_db()
+    assert job.state == ReportJob.State.FINISHED
+    assert job.rows_written == job.total_rows == 3
+    assert job.progress == 100
+    assert job.file.name.endswith("/tree_full_report.csv")
+    lines = job.file.read().decode().splitlines()
+    assert lines[0].startswith("PLANTED,PENDING,APPROVED")
+    assert lines[1].startswith("3,0,3,0,")
+    assert ",Oak," in lines[2]
+
+
+def test_trees_report_xlsx() -> None:
+    # given
+    baker.make(Tree, review_state="PENDING", _quantity=2)
+    baker.make(Tree, review_state="APPROVED")
+    job = make_job(
+        kind=ReportJob.Kind.TREES,
+        format=ReportJob.Format.XLSX,
+        params={"type": "pending"},
+    )
+
+    # when
+    reports.run_report_job(job)
+
+    # then
+    job.refresh_from_db()
+    assert job.state == ReportJob.State.FINISHED
+    assert job.rows_written == job.total_rows == 3
+    assert job.file.name.endswith("/trees_report.xlsx")
+    sheet = openpyxl.load_workbook(io.BytesIO(job.file.read())).active
+    rows = list(sheet.values)
+    assert rows[0][:2] == ("TREE ID", "SPECIES NAME")
+    assert "IMAGE URL" in rows[0]
+    assert len(rows) == 3
+
+
+def test_report_no_data() -> None:
+    # given
+    job = make_job(kind=ReportJob.Kind.TREES, params={"species_id": "1"})
+
+    # when
+    reports.run_report_job(job)
+
+    # then
+    job.refresh_from_db()
+    assert job.state == ReportJob.State.FAILED
+    assert job.error == "No data found to generate report"
+    assert not job.file
+
+
+def test_claim_next(time: TimeMachineFixture) -> None:
+    # given
+    user = baker.make(User)
+    timeout = timedelta(minutes=15)
+    running = make_job(state=ReportJob.State.RUNNING, created_by=user)
+    time.shift(timedelta(minutes=1))
+    first = make_job(created_by=user)
+    time.shift(timedelta(minutes=1))
+    second = make_job(created_by=user)
+    make_job(state=ReportJob.State.FINISHED, created_by=user)
+
+    # when & then
+    assert ReportJob.objects.claim_next(timeout, MAX_ATTEMPTS) == first
+    assert ReportJob.objects.claim_next(timeout, MAX_ATTEMPTS) == second
+    assert ReportJob.objects.claim_next(timeout, MAX_ATTEMPTS) is None
+
+    # Running job not making progress is claimed again.
+    time.shift(timeout)
+    assert ReportJob.objects.claim_next(timeout, MAX_ATTEMPTS) == running
+    assert ReportJob.objects.claim_next(timeout, MAX_ATTEMPTS) is None
+
+
+def test_claim_next_fails_job_abandoned_too_often(time: TimeMachineFixture) -> None:
+    # given
+    timeout = timedelta(minutes=15)
+    job = make_job()
+
+    # when & then
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        assert ReportJob.objects.claim_next(timeout, MAX_ATTEMPTS) == job
+        job.refresh_from_db()
+        assert job.attempt == attempt
+        time.shift(timeout + timedelta(seconds=1))
+    assert ReportJob.objects.claim_next(timeout, MAX_ATTEMPTS) is None
+    job.refresh_from_db()
+    assert job.state == ReportJob.State.FAILED
+    assert job.error == "Generating the report was abandoned 3 times"
+    assert job.finished_at is not None
+
+
+def test_report_job_claimed_again(time: TimeMachineFixture, monkeypatch) -> None:
+    # given
+    baker.make(Tree)
+    make_job(kind=ReportJob.Kind.TREES)
+    timeout = timedelta(minutes=15)
+    stale = ReportJob.objects.claim_next(timeout, MAX_ATTEMPTS)
+    write_report = reports._write_report
+
+    def write_report_slowly(*args):
+        time.shift(timeout + timedelta(seconds=1))
+        ReportJob.objects.claim_next(timeout, MAX_ATTEMPTS)
+        write_report(*args)
+
+    monkeypatch.setattr(reports, "_write_report", write_report_slowly)
+
+    # when
+    reports.run_report_job(stale)
+
+    # then
+    job = ReportJob.objects.get()
+    assert job.attempt == 2
+    assert job.state == ReportJob.State.RUNNING
+    assert not job.file
+    # The result of the stale worker is dropped.
+    assert not stale.file
+    directories, _ = default_storage.listdir("reports")
+    assert not any(default_storage.listdir(f"reports/{d}")[1] for d in directories)
+
+
+def test_report_job_claimed_again_before_running(time: TimeMachineFixture) -> None:
+    # given
+    baker.make(Tree)
+    make_job(kind=ReportJob.Kind.TREES)
+    timeout = timedelta(minutes=15)
+    stale = ReportJob.objects.claim_next(timeout, MAX_ATTEMPTS)
+    time.shift(timeout + timedelta(seconds=1))
+    ReportJob.objects.claim_next(timeout, MAX_ATTEMPTS)
+
+    # when
+    reports.run_report_job(stale)
+
+    # then
+    job = ReportJob.objects.get()
+    assert job.state == ReportJob.State.RUNNING
+    assert job.total_rows is None
+    assert not job.file
+
+
+def test_run_report_jobs_once() -> None:
+    # given
+    baker.make(Tree)
+    jobs = [make_job(kind=ReportJob.Kind.TREES) for _ in range(2)]
+
+    # when
+    call_command("run_report_jobs", "--once")
+
+    # then
+    for job in jobs:
+        job.refresh_from_db()
+        assert job.state == ReportJob.State.FINISHED
+
+
+def test_delete_expired_report_jobs(time: TimeMachineFixture) -> None:
+    # given
+    baker.make(Tree)
+    expired = make_job(kind=ReportJob.Kind.TREES)
+    reports.run_report_job(expired)
+    expired.refresh_from_db()
+    failed = make_job(state=ReportJob.State.FAILED, finished_at=timezone.now())
+    running = make_job(state=ReportJob.State.RUNNING)
+    time.shift(timedelta(days=7, seconds=1))
+    recent = make_job(state=ReportJob.State.FINISHED, finished_at=timezone.now())
+
+    # when
+    deleted = reports.delete_expired_report_jobs()
+
+    # then
+    assert deleted == 2
+    assert set(ReportJob.objects.all()) == {running, recent}
+    assert not default_storage.exists(expired.file.name)
+    assert not ReportJob.objects.filter(pk=failed.pk).exists()
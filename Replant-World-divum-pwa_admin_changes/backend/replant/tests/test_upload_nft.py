@@ -1,12 +1,25 @@
+import functools
+import json
+from concurrent import futures
+from typing import Iterator
 from unittest import mock
 
+import pytest
 import responses
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
 from model_bakery import baker
 
 import env
+from replant.models.history import History
 from replant.models.sponsor import Sponsor
 from replant.models.tree import Tree
+from replant.nft import NFT_IMAGE_FORMAT, NFT_IMAGES_DIR
+from replant.nft import _batch_operation as batch_operation
+from replant.nft import _claim_trees as claim_trees
+from replant.nft import _get_nft_metadata
+from replant.nft import _make_image_pool as make_image_pool
 from replant.nft import _upload_images as upload_images
 from replant.nft import _upload_metadatas as upload_metadatas
 from replant.tests.consts import PIN_FILE_SUCCESS_RESPONSE
@@ -18,10 +31,18 @@ from replant.tests.integrations.consts import (
 )
 
 
+@pytest.fixture
+def image_pool() -> Iterator[futures.Executor]:
+    with make_image_pool() as pool:
+        yield pool
+
+
 @mock.patch("boto3.client")
 @responses.activate
 def test_upload_images(
-    mock_boto_client: mock.MagicMock, simple_uploaded_file: SimpleUploadedFile
+    mock_boto_client: mock.MagicMock,
+    simple_uploaded_file: SimpleUploadedFile,
+    image_pool: futures.Executor,
 ) -> None:
     # mocks
     mock_s3 = mock.MagicMock()
@@ -44,11 +65,72 @@ def test_upload_images(
     )
 
     # when
-    upload_images(trees=[tree_to_upload])
+    upload_images(trees=claim_trees(), pool=image_pool)
 
     # then
     tree_to_upload.refresh_from_db()
     assert tree_to_upload.image_cid == IMAGE_CID
+    assert tree_to_upload.image_content_type == NFT_IMAGE_FORMAT.content_type
+    assert mock_s3.put_object.call_args.kwargs["Key"] == (
+        f"1.{NFT_IMAGE_FORMAT.extension}"
+    )
+
+
+@mock.patch("boto3.client")
+@responses.activate
+def test_upload_images_partially_failed(
+    mock_boto_client: mock.MagicMock,
+    simple_uploaded_file: SimpleUploadedFile,
+    image_pool: futures.Executor,
+) -> None:
+    # mocks
+    mock_s3 = mock.MagicMock()
+    mock_boto_client.return_value = mock_s3
+    mock_s3.put_object.return_value = SUCCESS_FILEBASE_UPLOAD_IMAGE_RESPONSE
+
+    responses.add(
+        method="POST",
+        url=env.IPFS_PINNING_SERVICE_URL,
+        json=PIN_FILE_SUCCESS_RESPONSE,
+    )
+
+    # given
+    tree_to_upload = baker.make(
+        Tree,
+        nft_id=1,
+        image_cid="",
+        image=simple_uploaded_file,
+        minting_state=Tree.MintingState.TO_BE_MINTED,
+    )
+    broken_tree = baker.make(
+        Tree,
+        nft_id=2,
+        image_cid="",
+        image=SimpleUploadedFile("broken.png", b"not an image"),
+        minting_state=Tree.MintingState.TO_BE_MINTED,
+    )
+    trees = claim_trees()
+
+    # when
+    batch_operation(
+        action="Uploading images",
+        func=functools.partial(upload_images, pool=image_pool),
+        trees_to_batch=list(trees),
+        all_trees=trees,
+        batch_size=100,
+    )
+
+    # then
+    assert [tree.id for tree in trees] == [tree_to_upload.id]
+    tree_to_upload.refresh_from_db()
+    assert tree_to_upload.image_cid == IMAGE_CID
+    assert tree_to_upload.minting_state == Tree.MintingState.TO_BE_MINTED
+    broken_tree.refresh_from_db()
+    assert broken_tree.image_cid == ""
+    assert broken_tree.minting_state == Tree.MintingState.FAILED
+    history = History.objects.get()
+    assert history.event_type == History.EventType.MINTING_FAILED
+    assert history.message == "Uploading images (1 trees)"
 
 
 @mock.patch("boto3.client")
@@ -78,11 +160,102 @@ def test_upload_metadata(
         image=simple_uploaded_file,
         minting_state=Tree.MintingState.TO_BE_MINTED,
     )
-    tree_to_upload.refresh_from_db()
 
     # when
-    upload_metadatas(trees=[tree_to_upload])
+    upload_metadatas(trees=claim_trees())
 
     # then
     tree_to_upload.refresh_from_db()
     assert tree_to_upload.metadata_cid == METADATA_CID
+
+
+@mock.patch("boto3.client")
+@responses.activate
+def test_upload_images_cached(
+    mock_boto_client: mock.MagicMock,
+    simple_uploaded_file: SimpleUploadedFile,
+    image_pool: futures.Executor,
+) -> None:
+    # mocks
+    mock_s3 = mock.MagicMock()
+    mock_boto_client.return_value = mock_s3
+    mock_s3.put_object.return_value = SUCCESS_FILEBASE_UPLOAD_IMAGE_RESPONSE
+
+    responses.add(
+        method="POST",
+        url=env.IPFS_PINNING_SERVICE_URL,
+        json=PIN_FILE_SUCCESS_RESPONSE,
+    )
+
+    # given
+    baker.make(
+        Tree,
+        nft_id=1,
+        image_cid="",
+        image=simple_uploaded_file,
+        minting_state=Tree.MintingState.TO_BE_MINTED,
+    )
+    upload_images(trees=claim_trees(), pool=image_pool)
+    [cached_name] = default_storage.listdir(NFT_IMAGES_DIR)[1]
+    default_storage.delete(f"{NFT_IMAGES_DIR}/{cached_name}")
+    default_storage.save(f"{NFT_IMAGES_DIR}/{cached_name}", ContentFile(b"cached"))
+    simple_uploaded_file.seek(0)
+    baker.make(
+        Tree,
+        nft_id=2,
+        image_cid="",
+        image=simple_uploaded_file,
+        minting_state=Tree.MintingState.TO_BE_MINTED,
+    )
+
+    # when
+    upload_images(trees=claim_trees(nft_id=2), pool=image_pool)
+
+    # then
+    assert mock_s3.put_object.call_args.kwargs["Body"].read() == b"cached"
+    assert default_storage.listdir(NFT_IMAGES_DIR)[1] == [cached_name]
+
+
+@mock.patch.object(env, "NFT_METADATA_AS_DIRECTORY", True)
+@mock.patch("boto3.client")
+@responses.activate
+def test_upload_metadata_directory(
+    mock_boto_client: mock.MagicMock, simple_uploaded_file: SimpleUploadedFile
+) -> None:
+    # mocks
+    mock_s3 = mock.MagicMock()
+    mock_boto_client.return_value = mock_s3
+    mock_s3.put_object.return_value = SUCCESS_FILEBASE_UPLOAD_METADATA_RESPONSE
+
+    responses.add(
+        method="POST",
+        url=env.IPFS_PINNING_SERVICE_URL,
+        json=PIN_FILE_SUCCESS_RESPONSE,
+    )
+
+    # given
+    sponsor = baker.make(Sponsor)
+    baker.make(
+        Tree,
+        sponsor=sponsor,
+        nft_id=iter([1, 2]),
+        metadata_cid="",
+        image=simple_uploaded_file,
+        minting_state=Tree.MintingState.TO_BE_MINTED,
+        _quantity=2,
+    )
+    trees = claim_trees()
+
+    # when
+    upload_metadatas(trees=trees)
+
+    # then
+    assert mock_s3.put_object.call_count == 1
+    upload = mock_s3.put_object.call_args.kwargs
+    assert upload["Metadata"] == {"import": "car"}
+    assert upload["Key"].endswith(".car")
+    car = upload["Body"].read()
+    for tree in trees:
+        assert json.dumps(_get_nft_metadata(tree)).encode() in car
+        tree.refresh_from_db()
+        assert tree.metadata_cid == f"{METADATA_CID}/{tree.nft_id}.json"
@@ -0,0 +1,108 @@
+"""Precomputed binary tiles of the trees map.
+
+A tile is a gzip compressed array of little-endian records of three 4 byte fields:
+latitude (float32), longitude (float32) and a value (uint32), which is the number of
+trees of a cluster or the NFT ID of a point (0 if it has none yet). Tiles are built when trees are
+clustered, so serving them costs neither a query over the trees nor serialization.
+"""
+
+import gzip
+import hashlib
+import itertools
+from typing import Iterable, Iterator
+
+import numpy as np
+from django.db import models, transaction
+
+from replant.models import Nft, TreesCluster, TreesTile
+
+RECORD = np.dtype([("latitude", "<f4"), ("longitude", "<f4"), ("value", "<u4")])
+
+BULK_SIZE = 1000
+
+FETCH_CHUNK_SIZE = 10000
+
+# (zoom, tile_index, latitude, longitude, value) ordered by zoom and tile_index.
+Row = tuple[int, int, float, float, int]
+
+
+def rebuild_cluster_tiles(
+    zoom: int | None = None, tile_indexes: Iterable[int] | None = None
+):
+    """Rebuild cluster tiles, either all of them or only the given ones of a zoom."""
+    clusters = TreesCluster.objects.all()
+    tiles = TreesTile.objects.filter(kind=TreesTile.Kind.CLUSTERS)
+    if zoom is not None:
+        clusters = clusters.filter(zoom=zoom)
+        tiles = tiles.filter(zoom=zoom)
+    if tile_indexes is not None:
+        tile_indexes = list(tile_indexes)
+        clusters = clusters.filter(tile_index__in=tile_indexes)
+        tiles = tiles.filter(tile_index__in=tile_indexes)
+
+    rows = clusters.order_by("zoom", "tile_index").values_list(
+        "zoom", "tile_index", "latitude", "longitude", "number_of_trees"
+    )
+    _replace_tiles(TreesTile.Kind.CLUSTERS, tiles, rows)
+
+
+def rebuild_point_tiles(zoom: int, tile_indexes: Iterable[int] | None = None):
+    """Rebuild point tiles, either all of them or only the given ones.
+
+    Points are stored at the `zoom` of `Tree.tile_index`.
+    """
+    nfts = Nft.objects.all()
+    tiles = TreesTile.objects.filter(kind=TreesTile.Kind.POINTS)
+    if tile_indexes is not None:
+        tile_indexes = list(tile_indexes)
+        nfts = nfts.filter(tile_index__in=tile_indexes)
+        tiles = tiles.filter(tile_index__in=tile_indexes)
+
+    rows = (
+        nfts.annotate(
+            zoom=models.Value(zoom),
+            lat_float=models.functions.Cast(
+                "latitude", output_field=models.FloatField()
+            ),
+            lon_float=models.functions.Cast(
+                "longitude", output_field=models.FloatField()
+            ),
+            nft_id_or_zero=models.functions.Coalesce("nft_id", 0),
+        )
+        .order_by("tile_index", "nft_id")
+        .values_list("zoom", "tile_index", "lat_float", "lon_float", "nft_id_or_zero")
+    )
+    _replace_tiles(TreesTile.Kind.POINTS, tiles, rows)
+
+
+def pack_tile(records: list[tuple[float, float, int]]) -> bytes:
+    # mtime is fixed so that the same records always give the same bytes and ETag.
+    return gzip.compress(np.array(records, dtype=RECORD).tobytes(), mtime=0)
+
+
+def unpack_tile(data: bytes) -> np.ndarray:
+    return np.frombuffer(gzip.decompress(data), dtype=RECORD)
+
+
+def _replace_tiles(
+    kind: TreesTile.Kind, old_tiles: models.QuerySet[TreesTile], rows: models.QuerySet
+):
+    with transaction.atomic():
+        old_tiles.delete()
+        for batch in itertools.batched(_build_tiles(kind, rows), BULK_SIZE):
+            TreesTile.objects.bulk_create(batch)
+
+
+def _build_tiles(kind: TreesTile.Kind, rows: models.QuerySet) -> Iterator[TreesTile]:
+    grouped = itertools.groupby(
+        rows.iterator(chunk_size=FETCH_CHUNK_SIZE), key=lambda row: row[:2]
+    )
+    for (zoom, tile_index), tile_rows in grouped:
+        data = pack_tile([row[2:] for row in tile_rows])
+        yield TreesTile(
+            kind=kind,
+            zoom=zoom,
+            tile_index=tile_index,
+            data=data,
+            etag=hashlib.blake2b(data, digest_size=16).hexdigest(),
+        )